@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Persistent database connections are disabled under ASGI (see CONN_MAX_AGE in config/settings.py)
+os.environ['DJANGO_ASGI'] = 'True'
 
 application = get_asgi_application()
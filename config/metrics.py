@@ -0,0 +1,131 @@
+import hmac
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .query_observers import observe_queries
+
+# Границы корзин гистограмм в секундах: для HTTP-запросов — от 5 мс до 10 с, для SQL-запросов — от 0,5 мс до 1 с.
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Метка представления для запросов, не сопоставленных ни с одним URL-шаблоном (404), чтобы не плодить метки по путям.
+UNMATCHED_VIEW = '<unmatched>'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса по URL-шаблону',
+    ('view', 'method', 'status'), buckets=REQUEST_BUCKETS,
+)
+QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'Время выполнения SQL-запроса по псевдониму базы данных',
+    ('alias',), buckets=QUERY_BUCKETS,
+)
+
+
+def get_view_label(request):
+    """
+    Возвращает метку представления запроса: имя URL-шаблона (например, 'supply_chain:networkentity-list'
+    для маршрутов роутера) или сам шаблон, если у него нет имени.
+
+    Аргументы:
+    request: HttpRequest после сопоставления URL.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_VIEW
+    return match.view_name or match.route
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL-запросов (см. observe_queries), записывающая их длительность
+    в гистограмму QUERY_LATENCY с меткой псевдонима базы данных.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        QUERY_LATENCY.labels(context['connection'].alias).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    Middleware, записывающее длительность каждого запроса в гистограмму по URL-шаблону, HTTP-методу и статусу
+    и длительность SQL-запросов в гистограмму по псевдониму базы данных.
+
+    Гистограммы хранятся в памяти процесса (prometheus_client). Под сервером с несколькими процессами
+    (gunicorn, uWSGI) задается переменная окружения PROMETHEUS_MULTIPROC_DIR: каждый процесс пишет значения
+    в свои файлы в этом каталоге, а metrics_view суммирует их. Отключается настройкой METRICS_ENABLED.
+    Работает и под WSGI, и под ASGI без переключения обработки запроса между потоком и циклом событий.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with observe_queries(time_query):
+            response = self.get_response(request)
+        self.observe_request(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with observe_queries(time_query):
+            response = await self.get_response(request)
+        self.observe_request(request, response, started)
+        return response
+
+    def observe_request(self, request, response, started):
+        REQUEST_LATENCY.labels(get_view_label(request), request.method, response.status_code).observe(
+            time.perf_counter() - started
+        )
+
+
+def get_registry():
+    """
+    Возвращает реестр метрик для экспорта: в многопроцессном режиме — реестр, собирающий значения
+    всех процессов из PROMETHEUS_MULTIPROC_DIR, иначе — реестр текущего процесса.
+    """
+    if not settings.PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+    return registry
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Отдает метрики в текстовом формате Prometheus.
+    Если задан METRICS_TOKEN, запрос должен содержать заголовок 'Authorization: Bearer <METRICS_TOKEN>'.
+
+    Аргументы:
+    request: HttpRequest.
+
+    Возвращает:
+    HttpResponse с метриками или 403, если токен не совпадает.
+
+    Raises:
+        Http404: Если сбор метрик выключен (METRICS_ENABLED).
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {settings.METRICS_TOKEN}'.encode()
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
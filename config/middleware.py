@@ -0,0 +1,362 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+from functools import partial
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .query_budget import QueryBudgetExceeded, QueryRecorder, get_view_budget
+from .query_observers import observe_queries
+from .timing import RequestTimings
+
+db_logger = logging.getLogger('config.db')
+timing_logger = logging.getLogger('config.timing')
+profile_logger = logging.getLogger('config.profile')
+budget_logger = logging.getLogger('config.query_budget')
+
+# Заголовок запроса, которым сотрудник запрашивает профилирование запроса (см. RequestTimingMiddleware).
+PROFILE_HEADER = 'X-Profile'
+# Количество функций в сводке профиля, которая пишется в лог.
+PROFILE_STATS_LIMIT = 30
+
+
+@receiver(connection_created)
+def track_connection(sender, connection, **kwargs):
+    """
+    Запоминает момент открытия соединения с базой данных.
+
+    Аргументы:
+        sender: Класс обертки соединения.
+        connection: Открытое соединение (DatabaseWrapper).
+    """
+    connection.connected_at = time.monotonic()
+
+
+class ConnectionCheckout:
+    """
+    Обертка выполнения SQL-запросов (см. observe_queries), запоминающая соединения с базой данных,
+    через которые выполнялись SQL-запросы одного HTTP-запроса.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.connections = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        self.connections.setdefault(connection.alias, connection)
+        return execute(sql, params, many, context)
+
+    def metrics(self):
+        """
+        Возвращает метрики выдачи соединения: переиспользовано ли открытое ранее соединение,
+        сколько соединений открыто во время запроса и сколько секунд живет соединение 'default'.
+        """
+        opened = sum(
+            1 for connection in self.connections.values()
+            if getattr(connection, 'connected_at', 0.0) >= self.started
+        )
+        connection = self.connections.get(DEFAULT_DB_ALIAS)
+        connected_at = getattr(connection, 'connected_at', None)
+        alive = connection is not None and connection.connection is not None
+        return {
+            'reused': bool(self.connections) and not opened,
+            'opened': opened,
+            'connection_age': time.monotonic() - connected_at if alive and connected_at else 0.0,
+        }
+
+
+class DatabaseCheckoutMiddleware:
+    """
+    Middleware, собирающее метрики выдачи соединения с базой данных на каждый запрос.
+
+    Для каждого запроса, выполнявшего SQL-запросы, определяет, было ли переиспользовано постоянное соединение
+    (CONN_MAX_AGE) или открыто новое, сколько соединений было открыто и сколько секунд живет текущее соединение.
+    Метрики сохраняются в request.db_checkout и пишутся в лог config.db на уровне INFO.
+
+    Работает и под WSGI, и под ASGI: в асинхронной цепочке вызывается __acall__, и Django
+    не переключает обработку запроса между потоком и циклом событий ради этого middleware.
+    Соединения отслеживаются через observe_queries, поэтому под ASGI учитываются соединения потока,
+    в котором sync_to_async выполняет запросы к базе данных, а не цикла событий.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        checkout = ConnectionCheckout()
+        with observe_queries(checkout):
+            response = self.get_response(request)
+        self.report_checkout(request, checkout)
+        return response
+
+    async def __acall__(self, request):
+        checkout = ConnectionCheckout()
+        with observe_queries(checkout):
+            response = await self.get_response(request)
+        self.report_checkout(request, checkout)
+        return response
+
+    def report_checkout(self, request, checkout):
+        """
+        Сохраняет метрики выдачи соединения в request.db_checkout и пишет их в лог.
+        """
+        request.db_checkout = checkout.metrics()
+        db_logger.info(
+            'db checkout %s %s reused=%s opened=%d connection_age=%.1fs',
+            request.method, request.path, request.db_checkout['reused'], request.db_checkout['opened'],
+            request.db_checkout['connection_age'],
+        )
+
+
+class RequestTimingMiddleware:
+    """
+    Middleware, собирающее длительности этапов обработки запроса и профилирующее запросы по требованию.
+
+    При REQUEST_TIMING_ENABLED для каждого запроса считаются число и время SQL-запросов ('db'),
+    время аутентификации ('auth', см. TimedAuthenticationMixin), сериализации ('serialize', см. timed),
+    рендеринга ответа ('render') и всей обработки ('total'). Длительности отдаются в заголовке ответа
+    Server-Timing и пишутся в лог config.timing на уровне INFO, словарь с ними доступен в request.timings.
+    Этапы могут пересекаться: например, вложенные списки загружаются из базы данных во время сериализации.
+
+    При REQUEST_PROFILING_ENABLED запрос сотрудника с заголовком X-Profile выполняется под cProfile
+    с вероятностью REQUEST_PROFILING_SAMPLE_RATE. Сводка по самым затратным функциям пишется в лог config.profile,
+    а при заданном REQUEST_PROFILING_DIR профиль сохраняется в файл, имя которого возвращается в заголовке X-Profile.
+    Права сотрудника проверяются до начала профилирования, поэтому заголовок от других пользователей
+    не замедляет обработку.
+
+    Если обе возможности выключены, middleware исключается из цепочки и не добавляет накладных расходов.
+    Под ASGI вызывается __acall__; cProfile при этом видит только код, выполняемый в цикле событий,
+    а синхронные представления, работающие в отдельном потоке, в профиль не попадают.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED and not settings.REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django вызывает синхронные обработчики в асинхронной цепочке через sync_to_async.
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if settings.REQUEST_PROFILING_ENABLED and PROFILE_HEADER in request.headers and self.should_profile(request):
+            return self.profile(request)
+        if settings.REQUEST_TIMING_ENABLED:
+            return self.time(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if (settings.REQUEST_PROFILING_ENABLED and PROFILE_HEADER in request.headers
+                and await sync_to_async(self.should_profile)(request)):
+            return await self.aprofile(request)
+        if settings.REQUEST_TIMING_ENABLED:
+            return await self.atime(request)
+        return await self.get_response(request)
+
+    def time(self, request):
+        """
+        Обрабатывает запрос со сбором длительностей этапов.
+        """
+        timings = request.timings = RequestTimings()
+        started = time.perf_counter()
+        with observe_queries(partial(self.time_query, timings)):
+            response = self.get_response(request)
+        return self.report_timings(request, response, started)
+
+    async def atime(self, request):
+        """
+        Асинхронный вариант time.
+        """
+        timings = request.timings = RequestTimings()
+        started = time.perf_counter()
+        with observe_queries(partial(self.time_query, timings)):
+            response = await self.get_response(request)
+        return self.report_timings(request, response, started)
+
+    @staticmethod
+    def time_query(timings, execute, sql, params, many, context):
+        """
+        Обертка выполнения SQL-запросов (см. observe_queries), замеряющая их как этап 'db'.
+        """
+        with timings.measure('db'):
+            return execute(sql, params, many, context)
+
+    def report_timings(self, request, response, started):
+        """
+        Добавляет длительность всей обработки, выводит длительности этапов в заголовок Server-Timing и лог.
+        """
+        timings = request.timings
+        timings.add('total', time.perf_counter() - started)
+
+        queries = timings.spans.get('db', (0.0, 0))[1]
+        metrics = {name: round(duration * 1000, 2) for name, (duration, _) in timings.spans.items()}
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration}' + (f';desc="{queries} queries"' if name == 'db' else '')
+            for name, duration in metrics.items()
+        )
+        timing_logger.info(
+            'request timing method=%s path=%s status=%d queries=%d %s',
+            request.method, request.path, response.status_code, queries,
+            ' '.join(f'{name}_ms={duration}' for name, duration in metrics.items()),
+            extra={'timing': {'method': request.method, 'path': request.path, 'status': response.status_code,
+                              'queries': queries, **{f'{name}_ms': value for name, value in metrics.items()}}},
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Отмечает начало рендеринга ответа: Response DRF и TemplateResponse рендерятся после возврата из представления.
+        """
+        return self.measure_render(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        """
+        Асинхронный вариант process_template_response.
+        """
+        return self.measure_render(request, response)
+
+    @staticmethod
+    def measure_render(request, response):
+        timings = getattr(request, 'timings', None)
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.add('render', time.perf_counter() - started))
+        return response
+
+    def should_profile(self, request):
+        """
+        Проверяет, что запрос с заголовком X-Profile выполняет сотрудник, и применяет выборку по
+        REQUEST_PROFILING_SAMPLE_RATE. Если пользователь не аутентифицирован сессией, он определяется
+        классами аутентификации DRF по умолчанию (JWT).
+        """
+        if random.random() >= settings.REQUEST_PROFILING_SAMPLE_RATE:
+            return False
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+            drf_request = Request(request, authenticators=authenticators)
+            try:
+                user = drf_request.user
+            except exceptions.APIException:
+                return False
+        return bool(user and user.is_staff)
+
+    def profile(self, request):
+        """
+        Обрабатывает запрос под cProfile и сохраняет результат.
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.time(request) if settings.REQUEST_TIMING_ENABLED else self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.save_profile(request, response, profiler)
+
+    async def aprofile(self, request):
+        """
+        Асинхронный вариант profile.
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            if settings.REQUEST_TIMING_ENABLED:
+                response = await self.atime(request)
+            else:
+                response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.save_profile(request, response, profiler)
+
+    def save_profile(self, request, response, profiler):
+        """
+        Пишет сводку профиля в лог config.profile и сохраняет профиль в REQUEST_PROFILING_DIR, если он задан.
+        """
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_STATS_LIMIT)
+        profile_logger.info('profile %s %s\n%s', request.method, request.path, stream.getvalue())
+        if settings.REQUEST_PROFILING_DIR:
+            directory = Path(settings.REQUEST_PROFILING_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            name = f'{time.time_ns()}-{request.method.lower()}.prof'
+            profiler.dump_stats(directory / name)
+            response[PROFILE_HEADER] = name
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware, проверяющее бюджет SQL-запросов представления (см. config.query_budget.query_budget)
+    и повторяющиеся запросы внутри одного запроса (признак N+1).
+
+    Запросы считаются по отпечаткам (см. fingerprint): если представление выполнило больше запросов,
+    чем объявлено для его действия, или один запрос выполнен больше QUERY_BUDGET_MAX_REPEATS раз,
+    в лог config.query_budget пишется предупреждение, а при QUERY_BUDGET_RAISE выбрасывается
+    QueryBudgetExceeded (так работают тесты с QueryBudgetTestMixin).
+
+    Запросы потоковых ответов выполняются при отдаче клиенту и не учитываются.
+    Включается настройкой QUERY_BUDGET_ENABLED (например, на тестовом стенде), иначе исключается из цепочки.
+    Работает и под WSGI, и под ASGI: запросы считаются через observe_queries, а представление
+    определяется по request.resolver_match после обработки запроса.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with observe_queries(recorder):
+            response = self.get_response(request)
+        self.check_budget(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        with observe_queries(recorder):
+            response = await self.get_response(request)
+        self.check_budget(request, recorder)
+        return response
+
+    def check_budget(self, request, recorder):
+        """
+        Сравнивает выполненные запросы с бюджетом представления и сообщает о нарушениях.
+        """
+        match = getattr(request, 'resolver_match', None)
+        budget = get_view_budget(match.func, request.method) if match is not None else None
+        problems = recorder.violations(budget, settings.QUERY_BUDGET_MAX_REPEATS)
+        if problems:
+            message = f"{request.method} {request.path}: {'; '.join(problems)}"
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            budget_logger.warning('query budget exceeded %s', message)
@@ -0,0 +1,147 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SAVEPOINT = re.compile(r'\b(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\s+"?\w+"?', re.IGNORECASE)
+_PLACEHOLDERS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+# Управление транзакциями повторяется в пределах запроса закономерно и в поиске повторов не учитывается.
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def fingerprint(sql):
+    """
+    Приводит SQL-запрос к виду, общему для запросов, отличающихся только значениями:
+    строки и числа заменяются на '?', списки параметров IN (...) сворачиваются, имена точек сохранения
+    убираются, пробелы нормализуются. Запросы к одной таблице для разных строк (N+1) получают
+    одинаковый отпечаток.
+
+    Аргументы:
+    sql: Текст запроса с параметрами %s или с подставленными значениями.
+
+    Возвращает:
+    str: Отпечаток запроса.
+    """
+    sql = _SAVEPOINT.sub(r'\1 ?', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Представление выполнило больше SQL-запросов, чем объявлено в его бюджете,
+    или повторило один и тот же запрос больше QUERY_BUDGET_MAX_REPEATS раз.
+    """
+
+
+class QueryRecorder:
+    """
+    Счетчик SQL-запросов соединения по отпечаткам (см. fingerprint), подключаемый через connection.execute_wrapper.
+    """
+
+    def __init__(self):
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.fingerprints[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.fingerprints.values())
+
+    def repeated(self, max_repeats):
+        """
+        Возвращает отпечатки запросов, выполненных больше max_repeats раз, с числом выполнений.
+        Команды управления транзакциями не учитываются.
+        """
+        return [(sql, count) for sql, count in self.fingerprints.most_common()
+                if count > max_repeats and not sql.upper().startswith(TRANSACTION_STATEMENTS)]
+
+    def violations(self, budget, max_repeats):
+        """
+        Возвращает описания нарушений бюджета: превышение числа запросов и повторяющиеся запросы.
+
+        Аргументы:
+        budget: Наибольшее допустимое число запросов или None, если оно не ограничено.
+        max_repeats: Наибольшее допустимое число выполнений одного запроса.
+
+        Возвращает:
+        list[str]: Описания нарушений, пустой список, если их нет.
+        """
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f'{self.count} запросов при бюджете {budget}')
+        for sql, count in self.repeated(max_repeats):
+            problems.append(f'запрос выполнен {count} раз: {sql[:300]}')
+        return problems
+
+
+def query_budget(budget):
+    """
+    Декоратор, объявляющий бюджет SQL-запросов функции-представления или класса представления.
+    Для ViewSet бюджет задается словарем {действие: число запросов}; действия без записи не ограничиваются.
+    Бюджет проверяет QueryBudgetMiddleware.
+
+    Аргументы:
+    budget: Число запросов или словарь по действиям.
+    """
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def get_view_budget(view_func, method):
+    """
+    Возвращает бюджет запросов, объявленный для представления и HTTP-метода, или None.
+
+    Аргументы:
+    view_func: Функция представления из URLconf (в том числе результат as_view()).
+    method: HTTP-метод запроса.
+    """
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+        budget = budget.get(action)
+    return budget
+
+
+class QueryBudgetTestMixin:
+    """
+    Примесь для тестов, включающая проверку бюджетов запросов для всех запросов тестового клиента:
+    превышение объявленного бюджета или повторяющийся запрос завершает тест ошибкой QueryBudgetExceeded.
+    Для кода вне представлений есть assertQueryBudget.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        budget_settings = override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+        budget_settings.enable()
+        cls.addClassCleanup(budget_settings.disable)
+
+    @contextmanager
+    def assertQueryBudget(self, budget=None, max_repeats=None):
+        """
+        Проверяет, что блок выполняет не больше budget запросов и не повторяет один запрос
+        больше max_repeats раз (по умолчанию QUERY_BUDGET_MAX_REPEATS).
+        """
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            yield recorder
+        problems = recorder.violations(
+            budget, settings.QUERY_BUDGET_MAX_REPEATS if max_repeats is None else max_repeats
+        )
+        if problems:
+            raise QueryBudgetExceeded('; '.join(problems))
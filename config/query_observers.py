@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+# Обертки выполнения SQL-запросов, подключенные для текущего запроса (см. observe_queries).
+_observers = ContextVar('query_observers', default=())
+
+
+def dispatch_queries(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL-запросов (connection.execute_wrapper), передающая запрос оберткам,
+    подключенным через observe_queries в текущем контексте.
+    """
+    for observer in reversed(_observers.get()):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(request_started)
+def install_query_dispatcher(sender, **kwargs):
+    """
+    Подключает dispatch_queries к соединениям с базой данных потока, в котором выполняются запросы к ним.
+
+    Соединения Django принадлежат потоку. Под ASGI синхронный код запроса (ORM, синхронные представления)
+    выполняется через sync_to_async в отдельном потоке, поэтому обертка, подключенная middleware
+    в цикле событий через connection.execute_wrapper, не видит запросов к базе данных. Сигнал request_started
+    Django отправляет синхронным получателям в том же потоке, что и остальной синхронный код запроса.
+    """
+    for connection in connections.all():
+        if dispatch_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, dispatch_queries)
+
+
+@contextmanager
+def observe_queries(observer):
+    """
+    Подключает обертку выполнения SQL-запросов (с сигнатурой как у connection.execute_wrapper)
+    ко всем запросам к базе данных, выполняемым при обработке текущего запроса, в том числе в потоках
+    sync_to_async под ASGI: обертки хранятся в contextvars и передаются вместе с контекстом.
+
+    Аргументы:
+    observer: Вызываемый объект (execute, sql, params, many, context); соединение доступно в context['connection'].
+    """
+    token = _observers.set((*_observers.get(), observer))
+    try:
+        yield
+    finally:
+        _observers.reset(token)
@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from functools import cached_property, lru_cache, wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+API_INFO = openapi.Info(
+    title="Snippets API",
+    default_version='v1',
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+# Каталоги с исходным кодом проекта, от которого зависит схема.
+SOURCE_DIRS = ('config', 'supply_chain', 'user')
+SCHEMA_FILE_PREFIX = 'openapi-'
+
+
+@dataclass(frozen=True)
+class SchemaArtifact:
+    """
+    Сгенерированная схема OpenAPI для одной версии кода: JSON, его сжатая копия и сильные ETag обоих вариантов.
+    """
+    version: str
+    content: bytes
+    gzipped: bytes
+
+    @cached_property
+    def etag(self):
+        return f'"{hashlib.sha256(self.content).hexdigest()[:32]}"'
+
+    @cached_property
+    def gzip_etag(self):
+        return f'{self.etag[:-1]}-gzip"'
+
+
+@lru_cache(maxsize=None)
+def _source_version():
+    digest = hashlib.sha1()
+    for directory in SOURCE_DIRS:
+        for path in sorted(Path(settings.BASE_DIR, directory).rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def get_code_version():
+    """
+    Возвращает версию кода, от которой зависит схема: CODE_VERSION, если она задана
+    (например, коммит при сборке образа), иначе хеш исходных файлов проекта, вычисляемый один раз на процесс.
+    """
+    return settings.CODE_VERSION or _source_version()
+
+
+def generate_schema():
+    """
+    Генерирует схему OpenAPI всех эндпоинтов без учета прав пользователя и адреса сервера
+    (клиент подставляет адрес, с которого загружена документация).
+
+    Возвращает:
+    bytes: Схема в формате JSON.
+    """
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def get_schema_path(version):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f'{SCHEMA_FILE_PREFIX}{version}.json'
+
+
+def write_schema(version, content):
+    """
+    Атомарно записывает схему версии version в OPENAPI_SCHEMA_DIR и удаляет файлы других версий.
+
+    Возвращает:
+    Path: Путь к записанному файлу.
+    """
+    path = get_schema_path(version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix='.tmp-', delete=False) as file:
+        file.write(content)
+    os.replace(file.name, path)
+    for stale in path.parent.glob(f'{SCHEMA_FILE_PREFIX}*.json'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+_artifacts = {}
+_artifacts_lock = threading.Lock()
+
+
+def get_schema_artifact():
+    """
+    Возвращает схему для текущей версии кода.
+
+    Схема хранится в памяти процесса. При первом обращении она читается из файла, записанного командой
+    generate_schema или другим процессом, а если файла нет — генерируется и записывается в файл
+    (ошибка записи не мешает отдать схему из памяти).
+    """
+    version = get_code_version()
+    artifact = _artifacts.get(version)
+    if artifact is not None:
+        return artifact
+    with _artifacts_lock:
+        if version not in _artifacts:
+            path = get_schema_path(version)
+            try:
+                content = path.read_bytes()
+            except FileNotFoundError:
+                content = generate_schema()
+                try:
+                    write_schema(version, content)
+                except OSError:
+                    pass
+            _artifacts.clear()
+            _artifacts[version] = SchemaArtifact(version, content, gzip.compress(content, compresslevel=9, mtime=0))
+        return _artifacts[version]
+
+
+def schema_response(request):
+    """
+    Отдает схему с сильным ETag: 304 при совпадении If-None-Match, сжатый вариант (gzip), если клиент его принимает.
+    Кэш браузера должен перепроверять схему при каждом открытии документации (no-cache).
+    """
+    artifact = get_schema_artifact()
+    compressed = 'gzip' in request.headers.get('Accept-Encoding', '')
+    etag = artifact.gzip_etag if compressed else artifact.etag
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(artifact.gzipped if compressed else artifact.content, content_type='application/json')
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def with_cached_schema(ui_view):
+    """
+    Оборачивает представление документации drf_yasg: запрос схемы (?format=openapi), которую загружает
+    интерфейс Swagger UI и ReDoc, обслуживается готовой схемой (см. schema_response),
+    а страница интерфейса — самим drf_yasg.
+    """
+    @wraps(ui_view)
+    def view(request, *args, **kwargs):
+        if request.method == 'GET' and request.GET.get('format') == 'openapi':
+            return schema_response(request)
+        return ui_view(request, *args, **kwargs)
+    return view
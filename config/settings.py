@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_yasg',
     'rest_framework',
     'corsheaders',
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -58,6 +60,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.middleware.DatabaseCheckoutMiddleware',
+    'config.middleware.RequestTimingMiddleware',
+    'config.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -84,15 +89,92 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Set by config/asgi.py before the settings are loaded
+RUNNING_ASGI = os.getenv('DJANGO_ASGI', 'False') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB'),
         'USER': os.getenv('POSTGRES_USER'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD')
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
+        'HOST': os.getenv('POSTGRES_HOST', ''),
+        'PORT': os.getenv('POSTGRES_PORT', ''),
+        # Keep connections open between requests instead of reconnecting on every call (WSGI only).
+        # Always 0 under ASGI: there each request runs its sync code in a thread of its own and persistent
+        # connections would leak, pool them with pgbouncer instead (see pgbouncer.ini.sample).
+        'CONN_MAX_AGE': 0 if RUNNING_ASGI else int(os.getenv('POSTGRES_CONN_MAX_AGE', 60)),
+        # Ping a reused connection once per request so a dropped one is replaced before the view runs
+        'CONN_HEALTH_CHECKS': os.getenv('POSTGRES_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # Required behind pgbouncer in transaction pooling mode (.iterator() uses named cursors)
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('POSTGRES_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('POSTGRES_CONNECT_TIMEOUT', 5)),
+        },
+    }
+}
+
+# Upper bound of server connections to the database from its user, i.e. pgbouncer's pool size
+# (or workers x threads without a pooler), enforced by the check_db_connections command
+POSTGRES_MAX_CONNECTIONS = int(os.getenv('POSTGRES_MAX_CONNECTIONS', 20))
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# For several worker processes use a shared backend (e.g. django.core.cache.backends.redis.RedisCache),
+# otherwise cache invalidation only reaches the process that changed the data.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Lifetime of cached network_entity list/retrieve responses in seconds, 0 disables the cache
+NETWORK_ENTITY_CACHE_TIMEOUT = int(os.getenv('NETWORK_ENTITY_CACHE_TIMEOUT', 300))
+
+# Lifetime of the cached city list in the NetworkEntity admin filter sidebar, in seconds
+ADMIN_CITY_FILTER_CACHE_TIMEOUT = int(os.getenv('ADMIN_CITY_FILTER_CACHE_TIMEOUT', 600))
+
+# Number of entities whose debt is cleared per transaction by the clear_debt admin action and command
+DEBT_CLEARING_BATCH_SIZE = int(os.getenv('DEBT_CLEARING_BATCH_SIZE', 1000))
+
+# Maximum number of matches ranked per searched table (entities, products, contacts) by network_entity/search
+NETWORK_SEARCH_MAX_MATCHES = int(os.getenv('NETWORK_SEARCH_MAX_MATCHES', 1000))
+
+# Per-request db/auth/serialize/render timings in Server-Timing headers and the config.timing log.
+# Exposes internal timings to clients, so keep it off on public deployments unless needed.
+REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', 'False') == 'True'
+# On-demand cProfile capture of staff requests sent with an X-Profile header, logged to config.profile
+REQUEST_PROFILING_ENABLED = os.getenv('REQUEST_PROFILING_ENABLED', 'False') == 'True'
+# Share of X-Profile requests that are actually profiled
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 1.0))
+# Directory for .prof files of profiled requests (empty: only the summary is logged)
+REQUEST_PROFILING_DIR = os.getenv('REQUEST_PROFILING_DIR', '')
+
+# Check views against their declared SQL query budgets and flag repeated (N+1) queries, for staging.
+# Violations are logged to config.query_budget, or raised as QueryBudgetExceeded with QUERY_BUDGET_RAISE.
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', 'False') == 'True'
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+# How many times one statement (by fingerprint) may run within a request
+QUERY_BUDGET_MAX_REPEATS = int(os.getenv('QUERY_BUDGET_MAX_REPEATS', 3))
+
+# Per-view request and per-alias SQL latency histograms exported at /metrics/ in the Prometheus text format.
+# Off by default: the endpoint exposes per-view latencies, enable it together with METRICS_TOKEN or a proxy rule.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+# Bearer token required by /metrics/ (empty: no check, restrict access at the proxy instead)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Shared directory for multi-process servers (gunicorn, uWSGI): every worker writes its metrics there and
+# /metrics/ aggregates them. Read by prometheus_client from the environment, clear it on every server start.
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+
+# Version of the deployed code (e.g. the git commit), used to version the pre-generated OpenAPI schema.
+# Empty: a hash of the project source files is used instead.
+CODE_VERSION = os.getenv('CODE_VERSION', '')
+# Directory for the pre-generated OpenAPI schema served at /docs/?format=openapi (see generate_schema).
+# An empty value also falls back to the default: write_schema removes stale schema files from this directory.
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR') or str(BASE_DIR / 'var' / 'schema')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -142,10 +224,16 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = False
 
+# Authenticate API requests from JWT claims without loading the user row on every request
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+# How long (seconds) a process trusts the cached is_active/password state when checking token revocation
+JWT_REVOCATION_CACHE_TTL = int(os.getenv('JWT_REVOCATION_CACHE_TTL', 30))
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.StatelessJWTAuthentication'
+        if JWT_STATELESS_AUTH else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
 }
 
@@ -153,3 +241,26 @@ AUTH_USER_MODEL = 'user.User'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 LOGIN_URL = 'users:login'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # config.db logs per-request connection checkout metrics at INFO,
+        # config.timing per-request timings and config.profile profiles of X-Profile requests
+        'config': {
+            'handlers': ['console'],
+            'level': os.getenv('CONFIG_LOG_LEVEL', 'WARNING'),
+        },
+        # supply_chain.benchmark reports throughput measured by tests run with RUN_BENCHMARKS=True
+        'supply_chain.benchmark': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
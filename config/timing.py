@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager
+
+
+class RequestTimings:
+    """
+    Длительности этапов обработки одного запроса для заголовка Server-Timing и лога config.timing.
+
+    Для каждого этапа хранится суммарная длительность в секундах и число замеров: этап может
+    выполняться несколько раз за запрос (например, SQL-запросы или сериализация нескольких списков).
+    Этапы заполняет RequestTimingMiddleware (db, render, total) и код представлений через timed().
+    """
+
+    def __init__(self):
+        self.spans = {}
+
+    def add(self, name, duration):
+        """
+        Добавляет длительность к этапу.
+
+        Аргументы:
+        name: Название этапа.
+        duration: Длительность в секундах.
+        """
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + duration, count + 1)
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Контекстный менеджер, добавляющий к этапу время выполнения своего блока.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+@contextmanager
+def timed(request, name):
+    """
+    Замеряет блок как этап name запроса, если для запроса включен сбор длительностей
+    (см. RequestTimingMiddleware), иначе ничего не делает.
+
+    Аргументы:
+    request: HttpRequest или Request DRF.
+    name: Название этапа, например 'serialize'.
+    """
+    timings = getattr(request, 'timings', None) if request is not None else None
+    if timings is None:
+        yield
+    else:
+        with timings.measure(name):
+            yield
+
+
+class TimedAuthenticationMixin:
+    """
+    Примесь для APIView, замеряющая аутентификацию запроса как этап 'auth'.
+    """
+
+    def perform_authentication(self, request):
+        with timed(request, 'auth'):
+            super().perform_authentication(request)
@@ -18,17 +18,12 @@ from django.contrib import admin
 from django.urls import include, path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+
+from config.metrics import metrics_view
+from config.schema import API_INFO, with_cached_schema
 
 schema_view = get_schema_view(
-    openapi.Info(
-        title="Snippets API",
-        default_version='v1',
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
+    API_INFO,
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
@@ -37,6 +32,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('supply_chain.urls')),
     path('user/', include('user.urls')),
-    path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # The schema itself (?format=openapi) is pre-generated once per code version, see config.schema
+    path('docs/', with_cached_schema(schema_view.with_ui('swagger', cache_timeout=0)), name='schema-swagger-ui'),
+    path('redoc/', with_cached_schema(schema_view.with_ui('redoc', cache_timeout=0)), name='schema-redoc'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
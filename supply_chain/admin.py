@@ -1,5 +1,13 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import NetworkEntity, Product, Contact
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models.functions import Upper
+from django.http import JsonResponse
+from django.urls import path, reverse
+from .models import NetworkEntity, Product, Contact, DebtClearingJob, DebtClearingBatch
+from .paginators import EstimatedCountPaginator
 
 
 class ProductInline(admin.TabularInline):
@@ -22,17 +30,64 @@ class ContactInline(admin.TabularInline):
     verbose_name_plural = 'Контакты'
 
 
+class CityListFilter(admin.SimpleListFilter):
+    """
+    Фильтр списка сущностей по городу контакта.
+
+    Список городов строится запросом DISTINCT по индексу contact_city_idx и кэшируется на
+    ADMIN_CITY_FILTER_CACHE_TIMEOUT секунд, поэтому боковая панель не сканирует контакты при каждом открытии списка.
+    """
+    title = 'Город'
+    parameter_name = 'city'
+    cache_key = 'supply_chain:admin:contact_cities'
+
+    def lookups(self, request, model_admin):
+        cities = cache.get(self.cache_key)
+        if cities is None:
+            cities = list(Contact.objects.order_by('city').values_list('city', flat=True).distinct())
+            cache.set(self.cache_key, cities, settings.ADMIN_CITY_FILTER_CACHE_TIMEOUT)
+        return [(city, city) for city in cities]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(contact__city=self.value())
+        return queryset
+
+
+class SupplierAutocompleteSelect(AutocompleteSelect):
+    """
+    Виджет выбора поставщика с автодополнением через NetworkEntityAdmin.supplier_autocomplete_view.
+    В отличие от стандартного AutocompleteSelect передает в запросы идентификатор редактируемой сущности,
+    чтобы эндпоинт исключил ее саму и ее потомков.
+    """
+
+    def __init__(self, field, admin_site, exclude_id=None, **kwargs):
+        super().__init__(field, admin_site, **kwargs)
+        self.exclude_id = exclude_id
+
+    def get_url(self):
+        url = reverse(f'{self.admin_site.name}:supply_chain_networkentity_supplier_autocomplete')
+        return f'{url}?exclude={self.exclude_id}' if self.exclude_id else url
+
+
 @admin.register(NetworkEntity)
 class NetworkEntityAdmin(admin.ModelAdmin):
     """
     Класс администратора для модели NetworkEntity.
 
     Определяет представление списка, фильтрацию, действия и встроенные формы для управления экземплярами NetworkEntity
-    в административной панели Django.
+    в административной панели Django. Список рассчитан на большие таблицы: поставщики присоединяются
+    через JOIN, количество строк оценивается по статистике PostgreSQL, а поставщик выбирается
+    через автодополнение вместо выпадающего списка всех сущностей.
     """
     list_display = ('name', 'supplier_link', 'level', 'debt', 'creation_time')
-    list_filter = ('contact__city',)
-    actions = ['clear_debt']
+    list_select_related = ('supplier',)
+    list_filter = (CityListFilter,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ('^name',)
+    supplier_autocomplete_page_size = 20
+    actions = ['clear_debt', 'clear_subtree_debt', 'clear_country_debt']
     inlines = [ContactInline, ProductInline]
 
     def supplier_link(self, obj):
@@ -47,7 +102,10 @@ class NetworkEntityAdmin(admin.ModelAdmin):
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         """
-        Переопределяет поле формы для внешнего ключа 'supplier', исключая текущий объект из списка выбора.
+        Переопределяет поле формы для внешнего ключа 'supplier'.
+        Варианты загружаются виджетом SupplierAutocompleteSelect из supplier_autocomplete_view, который
+        не предлагает саму сущность и ее потомков. Queryset используется только для проверки выбора,
+        цикл через потомка дополнительно отсекает NetworkEntity.clean().
         Args:
             db_field (Field): Поле, для которого создается форма.
             request (HttpRequest): Объект HTTP-запроса.
@@ -56,18 +114,174 @@ class NetworkEntityAdmin(admin.ModelAdmin):
             Field: Поле формы для внешнего ключа.
         """
         if db_field.name == "supplier":
-            kwargs["queryset"] = NetworkEntity.objects.exclude(id__exact=request.resolver_match.kwargs.get('object_id'))
+            object_id = request.resolver_match.kwargs.get('object_id')
+            kwargs["queryset"] = NetworkEntity.objects.exclude(id__exact=object_id)
+            kwargs["widget"] = SupplierAutocompleteSelect(db_field, self.admin_site, exclude_id=object_id)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
+    def get_urls(self):
+        """
+        Добавляет к URL админ-панели сущностей эндпоинт поиска поставщиков для автодополнения.
+        """
+        urls = [
+            path('supplier-autocomplete/', self.admin_site.admin_view(self.supplier_autocomplete_view),
+                 name='supply_chain_networkentity_supplier_autocomplete'),
+        ]
+        return urls + super().get_urls()
+
+    def supplier_autocomplete_view(self, request):
+        """
+        Возвращает страницу поставщиков в формате select2 для виджета SupplierAutocompleteSelect.
+
+        Поиск идет по префиксу названия без учета регистра ('term') с использованием индекса
+        network_entity_name_upper_idx, страницы ('page') по supplier_autocomplete_page_size записей.
+        Сущность из параметра 'exclude' и ее потомки исключаются условием по префиксу материализованного пути,
+        поэтому потомки не загружаются в память.
+        Args:
+            request (HttpRequest): Объект HTTP-запроса.
+        Returns:
+            JsonResponse: {'results': [{'id', 'text'}], 'pagination': {'more'}}.
+        """
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+            exclude_id = int(request.GET['exclude']) if request.GET.get('exclude') else None
+        except ValueError:
+            return JsonResponse({'error': 'Некорректные параметры запроса'}, status=400)
+
+        queryset = NetworkEntity.objects.all()
+        term = request.GET.get('term', '').strip()
+        if term:
+            queryset = queryset.filter(name__istartswith=term)
+        if exclude_id is not None:
+            excluded = NetworkEntity.objects.filter(pk=exclude_id).first()
+            queryset = queryset.exclude(pk=exclude_id)
+            if excluded is not None:
+                queryset = queryset.exclude(path__startswith=excluded.descendants_path)
+
+        page_size = self.supplier_autocomplete_page_size
+        offset = (page - 1) * page_size
+        rows = list(queryset.order_by(Upper('name'), 'pk').values_list('pk', 'name')[offset:offset + page_size + 1])
+        return JsonResponse({
+            'results': [{'id': str(pk), 'text': name} for pk, name in rows[:page_size]],
+            'pagination': {'more': len(rows) > page_size},
+        })
+
     supplier_link.short_description = 'Поставщик'
     supplier_link.admin_order_field = 'supplier'
 
-    @admin.action(description='Очистить задолженность')
+    @admin.action(description='Очистить задолженность выбранных сущностей в фоне')
     def clear_debt(self, request, queryset):
         """
-        Действие администратора для очистки задолженности у выбранных экземпляров NetworkEntity.
+        Ставит в очередь задание очистки задолженности у выбранных экземпляров NetworkEntity.
+        Задание выполняет команда clear_debt пачками в коротких транзакциях (см. DebtClearingJob.run),
+        по каждой пачке в журнал добавляется запись.
+        Args:
+            request (HttpRequest): Объект HTTP-запроса.
+            queryset (QuerySet): Набор выбранных объектов.
+        """
+        DebtClearingJob.objects.create(scope=DebtClearingJob.SCOPE_SELECTION, created_by=request.user,
+                                       entity_ids=list(queryset.values_list('pk', flat=True)),
+                                       batch_size=settings.DEBT_CLEARING_BATCH_SIZE)
+        self.message_user(request, 'Поставлено в очередь заданий: 1')
+
+    @admin.action(description='Очистить задолженность поддеревьев выбранных сущностей в фоне')
+    def clear_subtree_debt(self, request, queryset):
+        """
+        Ставит в очередь задания очистки задолженности для поддеревьев выбранных сущностей.
+        Задания выполняет команда clear_debt, прогресс виден в разделе заданий.
         Args:
             request (HttpRequest): Объект HTTP-запроса.
             queryset (QuerySet): Набор выбранных объектов.
         """
-        queryset.update(debt=0)
+        jobs = DebtClearingJob.objects.bulk_create([
+            DebtClearingJob(scope=DebtClearingJob.SCOPE_SUBTREE, root=entity, created_by=request.user,
+                            batch_size=settings.DEBT_CLEARING_BATCH_SIZE)
+            for entity in queryset
+        ])
+        self.message_user(request, f'Поставлено в очередь заданий: {len(jobs)}')
+
+    @admin.action(description='Очистить задолженность стран выбранных сущностей в фоне')
+    def clear_country_debt(self, request, queryset):
+        """
+        Ставит в очередь задания очистки задолженности для всех сущностей стран выбранных сущностей.
+        Args:
+            request (HttpRequest): Объект HTTP-запроса.
+            queryset (QuerySet): Набор выбранных объектов.
+        """
+        countries = queryset.filter(contact__isnull=False).values_list('contact__country', flat=True).distinct()
+        jobs = DebtClearingJob.objects.bulk_create([
+            DebtClearingJob(scope=DebtClearingJob.SCOPE_COUNTRY, country=country, created_by=request.user,
+                            batch_size=settings.DEBT_CLEARING_BATCH_SIZE)
+            for country in countries
+        ])
+        self.message_user(request, f'Поставлено в очередь заданий: {len(jobs)}')
+
+
+@admin.register(DebtClearingJob)
+class DebtClearingJobAdmin(admin.ModelAdmin):
+    """
+    Класс администратора для заданий очистки задолженности.
+
+    Позволяет поставить в очередь задание по стране или поддереву и следить за его прогрессом.
+    """
+    list_display = ('id', '__str__', 'status', 'progress_display', 'processed', 'total', 'debt_cleared',
+                    'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'scope')
+    list_select_related = ('root', 'created_by')
+    autocomplete_fields = ('root',)
+    exclude = ('entity_ids',)
+    readonly_fields = ('status', 'total', 'processed', 'debt_cleared', 'error', 'created_by', 'created_at',
+                       'started_at', 'finished_at')
+
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Делает параметры задания доступными только для чтения после его создания.
+        """
+        if obj is not None:
+            return ('scope', 'country', 'root', 'batch_size') + self.readonly_fields
+        return self.readonly_fields
+
+    def formfield_for_choice_field(self, db_field, request, **kwargs):
+        """
+        Оставляет для новых заданий только области, выполняемые в фоне.
+        """
+        if db_field.name == 'scope':
+            kwargs['choices'] = [choice for choice in DebtClearingJob.SCOPE_CHOICES
+                                 if choice[0] != DebtClearingJob.SCOPE_SELECTION]
+        return super().formfield_for_choice_field(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Запоминает автора нового задания.
+        """
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+    @admin.display(description='Прогресс')
+    def progress_display(self, obj):
+        """
+        Возвращает прогресс задания в процентах.
+        """
+        return f'{obj.progress}%'
+
+
+@admin.register(DebtClearingBatch)
+class DebtClearingBatchAdmin(admin.ModelAdmin):
+    """
+    Класс администратора для журнала очистки задолженности, доступного только для просмотра.
+    """
+    list_display = ('job', 'first_id', 'last_id', 'updated', 'debt_cleared', 'created_at')
+    list_select_related = ('job', 'job__root')
+    raw_id_fields = ('job',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
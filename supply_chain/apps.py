@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SupplyChainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'supply_chain'
+
+    def ready(self):
+        from supply_chain import signals  # noqa: F401
@@ -0,0 +1,102 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from supply_chain.permissions import IsActiveEmployee
+from supply_chain.views import NetworkEntityViewSet
+from user.authentication import StatelessJWTAuthentication
+
+
+async def authenticate(request):
+    """
+    Асинхронно аутентифицирует запрос по JWT из заголовка Authorization.
+    Токен разбирается и проверяется средствами rest_framework_simplejwt, а пользователь загружается через
+    асинхронный ORM, поэтому рабочий поток не блокируется на время запроса к базе данных.
+    При JWT_STATELESS_AUTH пользователь строится из утверждений токена (см. StatelessJWTAuthentication).
+
+    Аргументы:
+    request: Объект HttpRequest.
+
+    Возвращает:
+    Пользователя или AnonymousUser, если заголовок с токеном отсутствует.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return AnonymousUser()
+
+    validated_token = authentication.get_validated_token(raw_token)
+    if settings.JWT_STATELESS_AUTH and 'is_active' in validated_token:
+        return await sync_to_async(StatelessJWTAuthentication().get_user)(validated_token)
+    user = await get_user_model().objects.filter(
+        **{jwt_settings.USER_ID_FIELD: validated_token[jwt_settings.USER_ID_CLAIM]}
+    ).afirst()
+    if user is None:
+        raise AuthenticationFailed('Пользователь не найден')
+    return user
+
+
+async def check_access(request):
+    """
+    Выполняет аутентификацию и проверку разрешения IsActiveEmployee.
+
+    Возвращает:
+    JsonResponse с ошибкой, если доступ запрещен, иначе None.
+    """
+    try:
+        request.user = await authenticate(request)
+    except AuthenticationFailed as error:
+        return JsonResponse({'detail': str(error.detail)}, status=401)
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+    if not IsActiveEmployee().has_permission(request, None):
+        return JsonResponse({'detail': 'У вас недостаточно прав для выполнения данного действия.'}, status=403)
+    return None
+
+
+class CheckedAccessAuthentication(BaseAuthentication):
+    """
+    Аутентификация DRF для действий NetworkEntityViewSet, вызываемых из асинхронных представлений:
+    пользователь уже определен и проверен в цикле событий функцией check_access.
+    """
+
+    def authenticate(self, request):
+        return request._request.user, None
+
+
+# Действия чтения NetworkEntityViewSet: асинхронные представления отдают тот же ответ, что и синхронные
+# эндпоинты, включая формат курсора NetworkEntityCursorPagination, параметры 'fields' и 'expand', кэш и ETag.
+list_view = NetworkEntityViewSet.as_view({'get': 'list'}, authentication_classes=[CheckedAccessAuthentication])
+detail_view = NetworkEntityViewSet.as_view({'get': 'retrieve'}, authentication_classes=[CheckedAccessAuthentication])
+
+
+async def network_entity_list(request):
+    """
+    Асинхронный вариант списка сущностей сети.
+
+    Аутентификация выполняется в цикле событий, а действие 'list' NetworkEntityViewSet (фильтр 'contact__country',
+    курсорная пагинация, 'fields' и 'expand', кэш ответов) — одним вызовом в потоке sync_to_async, а не отдельным
+    переключением на каждый запрос ORM. Курсоры совпадают с курсорами синхронного эндпоинта.
+    """
+    error = await check_access(request)
+    if error is not None:
+        return error
+    return await sync_to_async(list_view)(request)
+
+
+async def network_entity_detail(request, pk):
+    """
+    Асинхронный вариант получения одной сущности сети с контактом и продуктами (действие 'retrieve'
+    NetworkEntityViewSet, см. network_entity_list).
+    """
+    error = await check_access(request)
+    if error is not None:
+        return error
+    return await sync_to_async(detail_view)(request, pk=pk)
@@ -0,0 +1,105 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_VERSION_KEY = 'supply_chain:network_entity:version'
+
+
+def get_cache_version():
+    """
+    Возвращает текущую версию данных сети, которая входит в ключи кэша и ETag.
+    Если ключ версии вытеснен из кэша, версия начинается с текущего времени в наносекундах,
+    чтобы не совпасть ни с одной из прежних версий.
+    """
+    version = cache.get(CACHE_VERSION_KEY)
+    if version is None:
+        cache.add(CACHE_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CACHE_VERSION_KEY, time.time_ns())
+    return version
+
+
+def _bump_cache_version():
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.add(CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_network_cache():
+    """
+    Делает недействительными все закэшированные ответы по сущностям сети, меняя версию данных.
+    Версия меняется сразу и повторно после фиксации текущей транзакции, чтобы параллельный запрос
+    не закэшировал данные, прочитанные до фиксации.
+    """
+    _bump_cache_version()
+    transaction.on_commit(_bump_cache_version)
+
+
+class CachedReadMixin:
+    """
+    Примесь для ViewSet, кэширующая ответы действий 'list' и 'retrieve'.
+
+    Ключ кэша строится из версии данных, схемы и хоста запроса, действия, идентификатора объекта, параметров
+    запроса и классов разрешений представления. Ответы снабжаются ETag, вычисляемым из того же ключа,
+    поэтому на запрос с совпадающим If-None-Match возвращается 304 без обращения к базе данных и сериализации.
+    """
+    # None — время жизни берется из настройки NETWORK_ENTITY_CACHE_TIMEOUT при каждом запросе.
+    cache_timeout = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_timeout(self):
+        """
+        Возвращает время жизни закэшированного ответа в секундах; 0 отключает кэш.
+        """
+        return settings.NETWORK_ENTITY_CACHE_TIMEOUT if self.cache_timeout is None else self.cache_timeout
+
+    def get_request_digest(self, request):
+        """
+        Возвращает хеш параметров, от которых зависит ответ: схемы и хоста (из них строятся абсолютные ссылки
+        пагинации), действия, идентификатора объекта, параметров запроса и классов разрешений.
+        """
+        permissions = ','.join(sorted(type(permission).__name__ for permission in self.get_permissions()))
+        query = '&'.join(sorted(f'{name}={value}' for name, value in request.query_params.lists()))
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        origin = f'{request.scheme}://{request.get_host()}'
+        return hashlib.sha1(f'{origin}|{self.action}|{lookup}|{query}|{permissions}'.encode()).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Возвращает ответ из кэша или вызывает обработчик действия и кэширует успешный ответ.
+        """
+        cache_timeout = self.get_cache_timeout()
+        if not cache_timeout:
+            return handler(request, *args, **kwargs)
+
+        version = get_cache_version()
+        digest = self.get_request_digest(request)
+        key = f'supply_chain:network_entity:{version}:{digest}'
+        etag = f'"{version}-{digest[:16]}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, cache_timeout)
+                data = response.data
+            response = Response(data)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
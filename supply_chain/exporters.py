@@ -0,0 +1,90 @@
+import csv
+import json
+
+from supply_chain.models import NetworkEntity
+
+CONTACT_FIELDS = ('email', 'country', 'city', 'street', 'house_number')
+CSV_HEADER = ('id', 'name', 'supplier', 'level', 'debt', 'creation_time',
+              *(f'contact_{field}' for field in CONTACT_FIELDS), 'products')
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def iter_network_rows(queryset=None, chunk_size=2000):
+    """
+    Построчно выгружает сущности сети вместе с контактами и продуктами.
+    Сущности читаются серверным курсором пачками по chunk_size штук, продукты подгружаются отдельным запросом
+    на каждую пачку, поэтому потребление памяти не зависит от размера таблицы.
+
+    Аргументы:
+    queryset: Набор сущностей для выгрузки, по умолчанию вся таблица.
+    chunk_size: Количество сущностей, читаемых из базы данных за один раз.
+
+    Возвращает:
+    Генератор словарей, по одному на сущность.
+    """
+    if queryset is None:
+        queryset = NetworkEntity.objects.all()
+    queryset = queryset.select_related('contact').prefetch_related('products').order_by('pk')
+
+    for entity in queryset.iterator(chunk_size=chunk_size):
+        contact = getattr(entity, 'contact', None)
+        yield {
+            'id': entity.id,
+            'name': entity.name,
+            'supplier': entity.supplier_id,
+            'level': entity.level,
+            'debt': str(entity.debt),
+            'creation_time': entity.creation_time.isoformat(),
+            'contact': {field: getattr(contact, field) for field in CONTACT_FIELDS} if contact else None,
+            'products': [
+                {
+                    'id': product.id,
+                    'name': product.name,
+                    'model': product.model,
+                    'release_date': product.release_date.isoformat(),
+                }
+                for product in entity.products.all()
+            ],
+        }
+
+
+def render_ndjson(rows):
+    """
+    Преобразует строки выгрузки в формат NDJSON: один JSON-объект на строку.
+    """
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _LineBuffer:
+    """
+    Псевдофайл для csv.writer, который возвращает записанную строку вместо ее буферизации.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    """
+    Преобразует строки выгрузки в формат CSV: одна строка на сущность,
+    поля контакта разворачиваются в отдельные столбцы, продукты записываются JSON-массивом.
+    """
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        contact = row['contact'] or {}
+        yield writer.writerow((
+            row['id'], row['name'], row['supplier'], row['level'], row['debt'], row['creation_time'],
+            *(contact.get(field, '') for field in CONTACT_FIELDS),
+            json.dumps(row['products'], ensure_ascii=False),
+        ))
+
+
+def render_rows(rows, export_format):
+    """
+    Возвращает генератор текстовых строк выгрузки в указанном формате ('ndjson' или 'csv').
+    """
+    if export_format == 'csv':
+        return render_csv(rows)
+    return render_ndjson(rows)
@@ -0,0 +1,192 @@
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from config.timing import timed
+
+# Поля, представление которых совпадает со значением из базы данных (str, int, первичный ключ).
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.EmailField, serializers.IntegerField, serializers.PrimaryKeyRelatedField,
+)
+
+
+def _is_iso(field, default_format):
+    output_format = getattr(field, 'format', default_format)
+    return output_format is not None and output_format.lower() == ISO_8601
+
+
+def compile_field(field):
+    """
+    Подбирает функцию преобразования значения из .values() в представление поля сериализатора.
+    Для распространенных типов полей возвращает быстрый эквивалент to_representation,
+    для остальных — сам to_representation поля.
+
+    Аргументы:
+    field: Поле сериализатора DRF.
+
+    Возвращает:
+    Функцию одного аргумента или None, если значение выводится как есть.
+    """
+    kind = type(field)
+    if kind in IDENTITY_FIELDS and not getattr(field, 'pk_field', None):
+        return None
+    if kind is serializers.FloatField:
+        return float
+    if kind is serializers.DateField and _is_iso(field, api_settings.DATE_FORMAT):
+        return lambda value: value.isoformat()
+    if kind is serializers.DateTimeField and _is_iso(field, api_settings.DATETIME_FORMAT):
+        enforce_timezone = field.enforce_timezone
+
+        def convert_datetime(value):
+            value = enforce_timezone(value).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert_datetime
+    if kind is serializers.DecimalField and not field.localize and \
+            getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        exponent, to_representation = -field.decimal_places, field.to_representation
+
+        def convert_decimal(value):
+            # Значение из столбца numeric(max_digits, decimal_places) уже округлено до нужного числа знаков.
+            if value.as_tuple().exponent == exponent:
+                return f'{value:f}'
+            return to_representation(value)
+        return convert_decimal
+    return field.to_representation
+
+
+class CompiledSerializer:
+    """
+    Скомпилированный план сериализации модели только для чтения.
+
+    План строится один раз по полям ModelSerializer: для каждого поля определяется столбец .values()
+    и функция преобразования (см. compile_field). Вложенный сериализатор связи «один к одному» читается
+    тем же запросом через JOIN, вложенный список (many=True) — одним дополнительным запросом на страницу.
+    Результат совпадает с serializer.data, но не требует создания экземпляров моделей и вызова
+    to_representation каждого поля для каждой строки.
+    """
+
+    def __init__(self, serializer, prefix=''):
+        self.model = serializer.Meta.model
+        self.pk_column = f'{prefix}{self.model._meta.pk.name}'
+        self.columns = []
+        self.plan = []
+        self.children = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                foreign_key = self.model._meta.get_field(field.source).field.attname
+                self.children.append((name, foreign_key, CompiledSerializer(field.child)))
+                self.plan.append((name, None, None, None))
+            elif isinstance(field, serializers.ModelSerializer):
+                nested = CompiledSerializer(field, prefix=f'{prefix}{field.source}__')
+                self.columns.extend(nested.columns)
+                if nested.pk_column not in nested.columns:
+                    self.columns.append(nested.pk_column)
+                self.plan.append((name, nested.pk_column, None, nested))
+            else:
+                self.columns.append(prefix + field.source)
+                self.plan.append((name, prefix + field.source, compile_field(field), None))
+        if self.children and self.pk_column not in self.columns:
+            self.columns.append(self.pk_column)
+
+    def values(self, queryset):
+        """
+        Возвращает QuerySet словарей со столбцами, которые нужны плану.
+
+        Аргументы:
+        queryset: Набор объектов модели.
+
+        Возвращает:
+        QuerySet словарей.
+        """
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def represent_row(self, row):
+        """
+        Преобразует одну строку .values() в представление без вложенных списков:
+        на их месте остаются пустые списки, которые заполняет represent.
+        """
+        data = {}
+        for name, column, convert, nested in self.plan:
+            if column is None:
+                data[name] = []
+            elif nested is not None:
+                data[name] = nested.represent_row(row) if row[column] is not None else None
+            else:
+                value = row[column]
+                data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    def represent(self, rows):
+        """
+        Преобразует строки .values() в представление сериализатора.
+        Вложенные списки загружаются одним запросом на каждый список в порядке первичного ключа.
+
+        Аргументы:
+        rows: Список словарей, полученных через values().
+
+        Возвращает:
+        list[dict]: Представления объектов в порядке строк.
+        """
+        results = [self.represent_row(row) for row in rows]
+        if self.children and rows:
+            by_pk = {row[self.pk_column]: data for row, data in zip(rows, results)}
+            for name, foreign_key, child in self.children:
+                child_rows = list(child.model.objects.filter(**{f'{foreign_key}__in': list(by_pk)})
+                                  .order_by('pk').values(foreign_key, *child.columns))
+                for child_row, data in zip(child_rows, child.represent(child_rows)):
+                    by_pk[child_row[foreign_key]][name].append(data)
+        return results
+
+
+@lru_cache(maxsize=64)
+def compile_serializer(serializer_class, fields=None):
+    """
+    Компилирует план сериализации для класса сериализатора и набора выводимых полей.
+    Планы кэшируются, поэтому поля сериализатора разбираются один раз на каждый вариант 'fields'.
+
+    Аргументы:
+    serializer_class: Класс ModelSerializer.
+    fields: frozenset имен выводимых полей или None для всех полей.
+
+    Возвращает:
+    CompiledSerializer.
+    """
+    return CompiledSerializer(serializer_class(context={'fields': fields}))
+
+
+class CompiledReadMixin:
+    """
+    Примесь для ViewSet, выполняющая действия 'list' и 'retrieve' через скомпилированный план сериализации
+    (см. CompiledSerializer) вместо создания экземпляров моделей и вызова сериализатора для каждой строки.
+    Ответ совпадает с ответом сериализатора get_serializer_class() с учетом набора полей selected_fields.
+    """
+
+    def get_compiled_serializer(self):
+        """
+        Возвращает скомпилированный план для сериализатора и набора выводимых полей текущего запроса.
+        """
+        fields = getattr(self, 'selected_fields', None)
+        return compile_serializer(self.get_serializer_class(), None if fields is None else frozenset(fields))
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        with timed(request, 'serialize'):
+            data = compiled.represent(rows)
+        return self.get_paginated_response(data) if page is not None else Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        with timed(request, 'serialize'):
+            data = compiled.represent([row])[0]
+        return Response(data)
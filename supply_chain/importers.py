@@ -0,0 +1,41 @@
+import csv
+import json
+
+from supply_chain.exporters import CONTACT_FIELDS, EXPORT_FORMATS
+
+IMPORT_FORMATS = EXPORT_FORMATS
+
+
+def read_ndjson(lines):
+    """
+    Построчно разбирает данные в формате NDJSON, пропуская пустые строки.
+    """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(lines):
+    """
+    Построчно разбирает данные в формате CSV, полученные командой export_network,
+    и восстанавливает из столбцов вложенные контакт и продукты.
+    """
+    for row in csv.DictReader(lines):
+        contact = {field: row.get(f'contact_{field}', '') for field in CONTACT_FIELDS}
+        yield {
+            'id': row['id'],
+            'name': row['name'],
+            'supplier': row.get('supplier') or None,
+            'debt': row.get('debt') or 0,
+            'contact': contact if any(contact.values()) else None,
+            'products': json.loads(row.get('products') or '[]'),
+        }
+
+
+def read_rows(lines, import_format):
+    """
+    Возвращает генератор словарей сущностей из строк в указанном формате ('ndjson' или 'csv').
+    """
+    if import_format == 'csv':
+        return read_csv(lines)
+    return read_ndjson(lines)
@@ -0,0 +1,227 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from supply_chain.models import Contact, NetworkEntity
+from user.models import User
+
+SCENARIOS = ('list', 'list_sparse', 'filter', 'search', 'retrieve', 'create', 'update', 'admin_changelist')
+
+
+class Command(BaseCommand):
+    """
+    Команда для воспроизводимого замера производительности API и админ-панели на текущей базе данных,
+    например на данных, созданных командой generate_network.
+
+    Каждый сценарий выполняется в процессе через тестовый клиент: несколько прогревочных запросов,
+    затем --iterations замеров времени ответа и один отдельный запрос, для которого считаются SQL-запросы
+    и пиковое выделение памяти (tracemalloc замедляет выполнение, поэтому в замеры времени он не входит).
+    Объекты для чтения и изменения выбираются генератором с --seed. Все изменения, в том числе служебный
+    пользователь, откатываются в конце, а кэш ответов на время замера отключается.
+
+    Результаты выводятся таблицей или записываются в JSON (--output) вместе с описанием окружения;
+    с --baseline к таблице добавляется изменение медианы относительно прошлого результата.
+    """
+    help = 'Замеряет задержку, число запросов и память сценариев API на текущей базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f"Сценарии через запятую: {', '.join(SCENARIOS)}")
+        parser.add_argument('--iterations', type=int, default=30, help='Количество замеров в сценарии')
+        parser.add_argument('--warmup', type=int, default=3, help='Количество прогревочных запросов')
+        parser.add_argument('--page-size', type=int, default=50, help='Размер страницы списка')
+        parser.add_argument('--seed', type=int, default=1, help='Начальное значение для выбора объектов')
+        parser.add_argument('--output', help='Путь к JSON-файлу с результатами')
+        parser.add_argument('--baseline', help='JSON-файл прошлого замера для сравнения')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+        entity_ids = list(NetworkEntity.objects.order_by('pk').values_list('pk', flat=True)[:1])
+        if not entity_ids:
+            raise CommandError('В базе данных нет сущностей: создайте их командой generate_network')
+
+        self.options = options
+        self.random = random.Random(options['seed'])
+        results = []
+        with transaction.atomic(), override_settings(NETWORK_ENTITY_CACHE_TIMEOUT=0):
+            self.client = APIClient(SERVER_NAME=self.host())
+            user = User.objects.create(email=f'benchmark-{time.time_ns()}@example.com', is_active=True,
+                                       is_staff=True, is_superuser=True)
+            self.client.force_authenticate(user=user)
+            self.client.force_login(user)
+            for name in scenarios:
+                results.append(self.run(name, getattr(self, f'scenario_{name}')))
+                self.stdout.write(self.format_result(results[-1]))
+            transaction.set_rollback(True)
+
+        report = {'environment': self.environment(), 'options': {
+            key: options[key] for key in ('iterations', 'warmup', 'page_size', 'seed')
+        }, 'scenarios': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
+        if options['baseline']:
+            self.compare(results, options['baseline'])
+
+    def host(self):
+        """
+        Возвращает имя хоста, которое пропускает ALLOWED_HOSTS.
+        """
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+        return hosts[0] if hosts else 'localhost'
+
+    def random_entity_id(self):
+        """
+        Выбирает существующую сущность: случайная точка в диапазоне идентификаторов и ближайшая сущность после нее.
+        """
+        bounds = getattr(self, '_bounds', None)
+        if bounds is None:
+            bounds = self._bounds = (NetworkEntity.objects.order_by('pk').values_list('pk', flat=True).first(),
+                                     NetworkEntity.objects.order_by('-pk').values_list('pk', flat=True).first())
+        start = self.random.randint(*bounds)
+        return NetworkEntity.objects.filter(pk__gte=start).order_by('pk').values_list('pk', flat=True).first()
+
+    def scenario_list(self):
+        return self.client.get('/supply_chain/network_entity/', {'page_size': self.options['page_size']})
+
+    def scenario_list_sparse(self):
+        return self.client.get('/supply_chain/network_entity/', {
+            'page_size': self.options['page_size'], 'fields': 'name,level,debt',
+        })
+
+    def scenario_filter(self):
+        country = Contact.objects.filter(network_entity=self.random_entity_id()).values_list('country', flat=True)
+        return self.client.get('/supply_chain/network_entity/', {
+            'page_size': self.options['page_size'], 'contact__country': country.first() or '',
+        })
+
+    def scenario_search(self):
+        name = NetworkEntity.objects.filter(pk=self.random_entity_id()).values_list('name', flat=True).first()
+        word = max(name.replace('«', ' ').replace('»', ' ').split(), key=len)
+        return self.client.get('/supply_chain/network_entity/search/', {'q': word})
+
+    def scenario_retrieve(self):
+        return self.client.get(f'/supply_chain/network_entity/{self.random_entity_id()}/')
+
+    def entity_payload(self, supplier_id):
+        return {
+            'name': f'Benchmark {self.random.randint(1, 10 ** 9)}',
+            'supplier': supplier_id,
+            'contact': {'email': 'benchmark@example.com', 'country': 'Россия', 'city': 'Москва',
+                        'street': 'Ленина', 'house_number': '1'},
+            'products': [{'name': 'Смартфон', 'model': 'X1', 'release_date': '2024-01-01'}],
+        }
+
+    def scenario_create(self):
+        return self.client.post('/supply_chain/network_entity/', self.entity_payload(self.random_entity_id()),
+                                format='json')
+
+    def scenario_update(self):
+        entity_id = self.random_entity_id()
+        return self.client.patch(f'/supply_chain/network_entity/{entity_id}/', {
+            'name': f'Benchmark {self.random.randint(1, 10 ** 9)}',
+            'contact': {'email': 'benchmark@example.com', 'country': 'Россия', 'city': 'Москва',
+                        'street': 'Ленина', 'house_number': '1'},
+            'products': [],
+        }, format='json')
+
+    def scenario_admin_changelist(self):
+        return self.client.get('/admin/supply_chain/networkentity/', {'p': self.random.randint(0, 50)})
+
+    def run(self, name, scenario):
+        """
+        Выполняет сценарий и возвращает сводку замеров.
+        """
+        for _ in range(self.options['warmup']):
+            self.check_response(name, scenario())
+
+        durations = []
+        for _ in range(self.options['iterations']):
+            started = time.perf_counter()
+            response = scenario()
+            durations.append((time.perf_counter() - started) * 1000)
+            self.check_response(name, response)
+
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.check_response(name, scenario())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        durations.sort()
+        quantiles = statistics.quantiles(durations, n=100, method='inclusive') if len(durations) > 1 else durations * 99
+        return {
+            'scenario': name,
+            'iterations': len(durations),
+            'mean_ms': statistics.fmean(durations),
+            'p50_ms': quantiles[49],
+            'p95_ms': quantiles[94],
+            'max_ms': durations[-1],
+            'queries': len(queries),
+            'peak_memory_kb': peak / 1024,
+        }
+
+    def check_response(self, name, response):
+        if response.status_code >= 400:
+            raise CommandError(f'Сценарий {name}: ответ {response.status_code}')
+
+    def format_result(self, result):
+        return (f"{result['scenario']:<17} p50={result['p50_ms']:8.1f} мс  p95={result['p95_ms']:8.1f} мс  "
+                f"запросов={result['queries']:3d}  память={result['peak_memory_kb']:9.0f} КБ")
+
+    def environment(self):
+        """
+        Описание окружения замера: коммит, версии и размер данных.
+        """
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                    cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW server_version')
+            server_version = cursor.fetchone()[0]
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': f'{connection.vendor} {server_version}',
+            'entities': NetworkEntity.objects.count(),
+        }
+
+    def compare(self, results, path):
+        """
+        Выводит изменение медианы и числа запросов относительно прошлого замера.
+        """
+        try:
+            with open(path, encoding='utf-8') as source:
+                baseline = {item['scenario']: item for item in json.load(source)['scenarios']}
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        self.stdout.write(f'Сравнение с {path}:')
+        for result in results:
+            before = baseline.get(result['scenario'])
+            if before is None:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            self.stdout.write(f"{result['scenario']:<17} p50 {before['p50_ms']:.1f} → {result['p50_ms']:.1f} мс "
+                              f"({change:+.0f}%), запросов {before['queries']} → {result['queries']}")
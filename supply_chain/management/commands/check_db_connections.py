@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    """
+    Команда для проверки ограничения числа соединений с базой данных.
+
+    Считает серверные соединения PostgreSQL к базе данных 'default' от ее пользователя (pg_stat_activity)
+    и завершается ошибкой, если их больше POSTGRES_MAX_CONNECTIONS. За pgbouncer это соединения пула, число которых
+    ограничено default_pool_size, без него — постоянные соединения потоков WSGI (воркеры × потоки).
+    Запускается мониторингом или после нагрузочного теста (loadtest).
+    """
+    help = 'Проверяет, что число соединений с базой данных не превышает POSTGRES_MAX_CONNECTIONS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-connections', type=int,
+                            help='Наибольшее допустимое число соединений; по умолчанию POSTGRES_MAX_CONNECTIONS')
+
+    def handle(self, *args, **options):
+        limit = options['max_connections']
+        if limit is None:
+            limit = settings.POSTGRES_MAX_CONNECTIONS
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND usename = current_user AND backend_type = 'client backend'"
+            )
+            count = cursor.fetchone()[0]
+        if count > limit:
+            raise CommandError(f'Открыто соединений с базой данных: {count}, ограничение {limit}')
+        self.stdout.write(self.style.SUCCESS(f'Открыто соединений с базой данных: {count} из {limit}'))
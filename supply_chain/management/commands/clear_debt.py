@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from supply_chain.models import DebtClearingJob, NetworkEntity
+
+
+class Command(BaseCommand):
+    """
+    Команда для очистки задолженности пачками вне HTTP-запроса.
+
+    С параметром --country или --subtree создает и сразу выполняет задание DebtClearingJob.
+    Без них выполняет задания, поставленные в очередь из админ-панели; с --watch продолжает
+    ожидать новые задания, что позволяет запускать команду как фоновый обработчик.
+    """
+    help = 'Очищает задолженность по стране, поддереву или выполняет задания из очереди'
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group()
+        scope.add_argument('--country', help='Очистить задолженность всех сущностей страны')
+        scope.add_argument('--subtree', type=int, help='Очистить задолженность сущности и всех ее потомков')
+        parser.add_argument('--batch-size', type=int, default=settings.DEBT_CLEARING_BATCH_SIZE,
+                            help='Количество сущностей в одной транзакции')
+        parser.add_argument('--watch', action='store_true', help='Ожидать новые задания из очереди')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза между проверками очереди в секундах')
+
+    def handle(self, *args, **options):
+        if options['country'] or options['subtree']:
+            job = self.create_job(options)
+            if not self.run(job):
+                raise CommandError(f'Задание {job.pk} завершилось ошибкой: {job.error}')
+            return
+
+        while True:
+            job = DebtClearingJob.objects.claim_next()
+            if job is not None:
+                self.run(job)
+            elif options['watch']:
+                time.sleep(options['interval'])
+            else:
+                return
+
+    def create_job(self, options):
+        """
+        Создает задание по параметрам командной строки.
+        """
+        if options['subtree']:
+            root = NetworkEntity.objects.filter(pk=options['subtree']).first()
+            if root is None:
+                raise CommandError(f"Сущность {options['subtree']} не найдена")
+            return DebtClearingJob.objects.create(scope=DebtClearingJob.SCOPE_SUBTREE, root=root,
+                                                  batch_size=options['batch_size'])
+        return DebtClearingJob.objects.create(scope=DebtClearingJob.SCOPE_COUNTRY, country=options['country'],
+                                              batch_size=options['batch_size'])
+
+    def run(self, job):
+        """
+        Выполняет задание и выводит итог. Ошибка задания сохраняется в нем и не останавливает обработку очереди.
+
+        Returns:
+            bool: True, если задание выполнено успешно.
+        """
+        self.stdout.write(f'Задание {job.pk} ({job}): выполняется')
+        started = time.monotonic()
+        try:
+            job.run()
+        except Exception as error:
+            self.stderr.write(f'Задание {job.pk} завершилось ошибкой: {error}')
+            return False
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Задание {job.pk}: очищено {job.processed} сущностей, снято {job.debt_cleared} за {elapsed:.1f} с'
+        ))
+        return True
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from supply_chain.exporters import EXPORT_FORMATS, iter_network_rows, render_rows
+from supply_chain.models import NetworkEntity
+
+
+class Command(BaseCommand):
+    """
+    Команда для потоковой выгрузки всей сети поставок с контактами и продуктами в файл NDJSON или CSV.
+    """
+    help = 'Выгружает сущности сети с контактами и продуктами в формате NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help='Формат выгрузки')
+        parser.add_argument('--output', help='Путь к файлу; по умолчанию вывод в stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Количество сущностей, читаемых из базы данных за один раз')
+        parser.add_argument('--country', help='Выгрузить только сущности из указанной страны')
+
+    def handle(self, *args, **options):
+        queryset = NetworkEntity.objects.all()
+        if options['country']:
+            queryset = queryset.filter(contact__country=options['country'])
+        lines = render_rows(iter_network_rows(queryset, options['chunk_size']), options['format'])
+
+        if options['output']:
+            count = 0
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for line in lines:
+                    output.write(line)
+                    count += 1
+            self.stderr.write(self.style.SUCCESS(f'Записано строк: {count}'))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
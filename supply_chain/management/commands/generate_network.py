@@ -0,0 +1,231 @@
+import csv
+import io
+import random
+import time
+from array import array
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from supply_chain.caching import invalidate_network_cache
+from supply_chain.models import Contact, DebtSummary, NetworkEntity, Product
+
+# Доли заводов и розничных сетей среди сгенерированных сущностей, остальные — индивидуальные предприниматели.
+FACTORY_SHARE = 0.01
+RETAIL_SHARE = 0.19
+# Доля индивидуальных предпринимателей, которые закупают товар у другого предпринимателя, а не у сети.
+RESELLER_SHARE = 0.1
+
+# Страны с весами и городами: распределение неравномерное, как в реальной сети.
+LOCATIONS = (
+    ('Россия', 40, ('Москва', 'Санкт-Петербург', 'Новосибирск', 'Екатеринбург', 'Казань', 'Самара')),
+    ('Казахстан', 12, ('Алматы', 'Астана', 'Шымкент')),
+    ('Беларусь', 10, ('Минск', 'Гомель', 'Брест')),
+    ('Китай', 15, ('Шэньчжэнь', 'Шанхай', 'Гуанчжоу', 'Пекин')),
+    ('Германия', 8, ('Berlin', 'München', 'Hamburg')),
+    ('Южная Корея', 7, ('Seoul', 'Busan', 'Suwon')),
+    ('Япония', 5, ('Tokyo', 'Osaka')),
+    ('США', 3, ('San Jose', 'Austin', 'Seattle')),
+)
+STREETS = ('Ленина', 'Мира', 'Советская', 'Центральная', 'Садовая', 'Лесная', 'Школьная', 'Новая',
+           'Main', 'Park', 'Oak', 'Hauptstraße', 'Gangnam-daero', 'Nanjing Road')
+BRANDS = ('Электрон', 'Квант', 'Вектор', 'Альфа', 'Сигма', 'Протон', 'Орбита', 'Спектр', 'Импульс', 'Горизонт',
+          'Nova', 'Zenith', 'Helix', 'Vertex', 'Pulsar', 'Apex', 'Aurora', 'Neon', 'Quantum', 'Stellar')
+RETAIL_WORDS = ('Техно', 'Маркет', 'Электро', 'Мир', 'Дом', 'Цифра', 'Плюс', 'Сити', 'Центр', 'Точка')
+SURNAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов', 'Новиков',
+            'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров', 'Павлов', 'Козлов')
+INITIALS = 'АБВГДЕЖЗИКЛМНОПРСТУФЭЮЯ'
+PRODUCTS = ('Смартфон', 'Ноутбук', 'Планшет', 'Телевизор', 'Наушники', 'Умные часы', 'Монитор', 'Роутер',
+            'Фотоаппарат', 'Колонка', 'Электронная книга', 'Игровая приставка')
+MODEL_SERIES = ('X', 'S', 'Pro', 'Max', 'Lite', 'Ultra', 'Air', 'Neo', 'Mini', 'Plus')
+
+
+class Command(BaseCommand):
+    """
+    Команда для генерации синтетической сети поставок заданного размера для замеров производительности.
+
+    Генерируются заводы, розничные сети, закупающие товар у заводов, и индивидуальные предприниматели,
+    закупающие его у сетей или у других предпринимателей, с контактами и продуктами. Доли типов сущностей,
+    страны и города распределены неравномерно. Одинаковые --scale и --seed дают одинаковые данные.
+
+    Сущности вставляются пачками по одной транзакции на пачку с уже вычисленными путями и уровнями
+    командой COPY: идентификаторы резервируются в последовательности заранее, а сигналы
+    и NetworkEntity.save() не вызываются. В конце строится сводка задолженности и обновляется
+    статистика таблиц (ANALYZE).
+    """
+    help = 'Генерирует синтетическую сеть поставок заданного размера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=10000, help='Количество сущностей')
+        parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора случайных чисел')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Количество сущностей, записываемых в одной транзакции')
+        parser.add_argument('--max-products', type=int, default=5, help='Наибольшее число продуктов у сущности')
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить существующие сущности, их контакты, продукты и задания очистки '
+                                 'задолженности перед генерацией')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        if scale < 1:
+            raise CommandError('--scale должен быть положительным')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        if options['max_products'] < 0:
+            raise CommandError('--max-products не может быть отрицательным')
+        if options['clear']:
+            self.clear()
+        elif NetworkEntity.objects.exists():
+            self.stderr.write('В базе данных уже есть сущности: новые будут добавлены к ним')
+
+        self.random = random.Random(options['seed'])
+        self.max_products = options['max_products']
+        self.countries = [country for country, _, _ in LOCATIONS]
+        self.country_weights = [weight for _, weight, _ in LOCATIONS]
+        self.cities = {country: cities for country, _, cities in LOCATIONS}
+        self.started = time.monotonic()
+        self.created = 0
+
+        factories = max(1, round(scale * FACTORY_SHARE))
+        retailers = min(scale - factories, round(scale * RETAIL_SHARE))
+        traders = scale - factories - retailers
+        batch_size = options['batch_size']
+
+        factory_ids = array('q')
+        for count in self.batches(factories, batch_size):
+            rows = [(self.factory_name(), None, '/') for _ in range(count)]
+            factory_ids.extend(self.insert(rows))
+
+        # Для сетей и предпринимателей храним только идентификаторы и пути поставщиков в компактных массивах,
+        # чтобы память не росла вместе с --scale так же быстро, как число сущностей.
+        retail_ids, retail_factories = array('q'), array('q')
+        for count in self.batches(retailers, batch_size):
+            suppliers = [self.random.choice(factory_ids) for _ in range(count)]
+            rows = [(self.retail_name(), supplier, f'/{supplier}/') for supplier in suppliers]
+            retail_ids.extend(self.insert(rows))
+            retail_factories.extend(suppliers)
+
+        sellers = retail_ids or factory_ids
+        trader_ids, trader_paths = [], []
+        for count in self.batches(traders, batch_size):
+            rows = []
+            for _ in range(count):
+                if trader_ids and self.random.random() < RESELLER_SHARE:
+                    index = self.random.randrange(len(trader_ids))
+                    supplier, path = trader_ids[index], f'{trader_paths[index]}{trader_ids[index]}/'
+                else:
+                    index = self.random.randrange(len(sellers))
+                    supplier = sellers[index]
+                    path = f'/{retail_factories[index]}/{supplier}/' if retail_ids else f'/{supplier}/'
+                rows.append((self.trader_name(), supplier, path))
+            ids = self.insert(rows)
+            # Перепродавцами становятся только предприниматели первой пачки, чтобы глубина цепочек была ограничена.
+            if not trader_ids:
+                trader_ids, trader_paths = ids, [path for _, _, path in rows]
+
+        DebtSummary.objects.rebuild()
+        with connection.cursor() as cursor:
+            for model in (NetworkEntity, Contact, Product, DebtSummary):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        invalidate_network_cache()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {elapsed:.1f} с: заводов {factories}, розничных сетей {retailers}, '
+            f'индивидуальных предпринимателей {traders}'
+        ))
+
+    def clear(self):
+        """
+        Удаляет все сущности вместе с контактами, продуктами, сводкой и заданиями очистки задолженности.
+        Используется TRUNCATE: удаление через ORM вызывало бы сигналы для каждой сущности.
+        """
+        with connection.cursor() as cursor:
+            tables = ', '.join(connection.ops.quote_name(model._meta.db_table)
+                               for model in (Product, Contact, DebtSummary, NetworkEntity))
+            cursor.execute(f'TRUNCATE {tables} CASCADE')
+        invalidate_network_cache()
+
+    def batches(self, total, batch_size):
+        """
+        Разбивает количество сущностей на размеры пачек.
+        """
+        while total > 0:
+            count = min(total, batch_size)
+            total -= count
+            yield count
+
+    def insert(self, rows):
+        """
+        Вставляет пачку сущностей с контактами и продуктами в одной транзакции.
+
+        Аргументы:
+        rows: Список кортежей (название, идентификатор поставщика, путь).
+
+        Возвращает:
+        list[int]: Идентификаторы вставленных сущностей в порядке rows.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = self.allocate_ids(len(rows))
+            entities, contacts, products = [], [], []
+            for entity_id, (name, supplier, path) in zip(ids, rows):
+                debt = self.debt() if supplier else Decimal('0.00')
+                entities.append((entity_id, name, supplier, path.count('/') - 1, path, debt, now))
+                contacts.append(self.contact(entity_id))
+                products.extend(self.product(entity_id) for _ in range(self.random.randint(0, self.max_products)))
+            self.copy(NetworkEntity, ('id', 'name', 'supplier_id', 'level', 'path', 'debt', 'creation_time'), entities)
+            self.copy(Contact, ('network_entity_id', 'email', 'country', 'city', 'street', 'house_number'), contacts)
+            self.copy(Product, ('network_entity_id', 'name', 'model', 'release_date'), products)
+
+        self.created += len(rows)
+        rate = self.created / max(time.monotonic() - self.started, 1e-6)
+        self.stdout.write(f'Создано {self.created} сущностей, {rate:.0f} сущностей/с')
+        return ids
+
+    def allocate_ids(self, count):
+        """
+        Резервирует count идентификаторов сущностей в последовательности первичного ключа.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                           [NetworkEntity._meta.db_table, 'id', count])
+            return [entity_id for entity_id, in cursor.fetchall()]
+
+    def copy(self, model, columns, rows):
+        """
+        Записывает строки в таблицу модели командой COPY в формате CSV; None записывается как NULL.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def factory_name(self):
+        return f'Завод «{self.random.choice(BRANDS)}-{self.random.randint(1, 999)}»'
+
+    def retail_name(self):
+        first, second = self.random.choice(RETAIL_WORDS), self.random.choice(RETAIL_WORDS).lower()
+        return f'Сеть «{first}{second}» №{self.random.randint(1, 9999)}'
+
+    def trader_name(self):
+        initials = self.random.sample(INITIALS, 2)
+        return f'ИП {self.random.choice(SURNAMES)} {initials[0]}. {initials[1]}.'
+
+    def debt(self):
+        return Decimal(self.random.randint(0, 10_000_000)) / 100
+
+    def contact(self, entity_id):
+        country = self.random.choices(self.countries, self.country_weights)[0]
+        return (entity_id, f'entity{entity_id}@example.com', country, self.random.choice(self.cities[country]),
+                self.random.choice(STREETS), str(self.random.randint(1, 200)))
+
+    def product(self, entity_id):
+        return (entity_id, f'{self.random.choice(PRODUCTS)} {self.random.choice(BRANDS)}',
+                f'{self.random.choice(MODEL_SERIES)}{self.random.randint(1, 99)}',
+                date(2015, 1, 1) + timedelta(days=self.random.randint(0, 3650)))
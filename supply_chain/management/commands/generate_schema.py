@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from config.schema import generate_schema, get_code_version, get_schema_path, write_schema
+
+
+class Command(BaseCommand):
+    """
+    Команда для генерации схемы OpenAPI текущей версии кода в OPENAPI_SCHEMA_DIR.
+
+    Выполняется при сборке или развертывании: процессы сервера читают готовый файл вместо разбора
+    всех представлений и сериализаторов при первом запросе документации. Файлы других версий удаляются.
+    Без --force схема не генерируется заново, если файл для текущей версии уже есть.
+    """
+    help = 'Генерирует схему OpenAPI для /docs/ и /redoc/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Сгенерировать схему, даже если файл уже есть')
+
+    def handle(self, *args, **options):
+        version = get_code_version()
+        path = get_schema_path(version)
+        if path.exists() and not options['force']:
+            self.stdout.write(f'Схема версии {version} уже сгенерирована: {path}')
+            return
+        path = write_schema(version, generate_schema())
+        self.stdout.write(self.style.SUCCESS(f'Схема версии {version} записана в {path}'))
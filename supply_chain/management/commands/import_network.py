@@ -0,0 +1,225 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from supply_chain.caching import invalidate_network_cache
+from supply_chain.importers import IMPORT_FORMATS, read_rows
+from supply_chain.models import Contact, DebtSummary, NetworkEntity, Product
+from supply_chain.serializers import NetworkEntityImportSerializer
+
+
+class Command(BaseCommand):
+    """
+    Команда для потокового импорта сети поставок из файла, полученного командой export_network.
+
+    Импорт выполняется в два прохода по файлу. Первый проход пачками проверяет строки сериализатором
+    NetworkEntityImportSerializer и вставляет сущности с исходными идентификаторами, их контакты и продукты
+    через bulk_create, по одной транзакции на пачку. Второй проход проставляет ссылки на поставщиков
+    прошедшим проверку сущностям, у которых поставщика еще нет, и отбрасывает ссылки, образующие цикл
+    (в том числе через ссылки, уже записанные в базу данных). После этого пути и уровни пересчитываются
+    как в команде rebuild_hierarchy, а сводка задолженности строится заново.
+
+    Сущности, которые уже есть в базе данных, повторно не вставляются, а уже проставленные поставщики
+    не перезаписываются, поэтому после сбоя на любом этапе команду можно запустить повторно с тем же файлом:
+    записанные пачки не будут продублированы, а сущности, оставшиеся без поставщика, будут связаны.
+    """
+    help = 'Импортирует сущности сети с контактами и продуктами из файла NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу в формате команды export_network')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='Формат файла; по умолчанию определяется по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество строк, проверяемых и записываемых в одной транзакции')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        batch_size = options['batch_size']
+
+        started = time.monotonic()
+        try:
+            imported, inserted = self.insert_entities(path, import_format, batch_size, started)
+            linked = self.link_suppliers(path, import_format, batch_size, imported)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+        for _ in NetworkEntity.objects.rebuild_hierarchy():
+            pass
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [NetworkEntity]):
+                cursor.execute(sql)
+        DebtSummary.objects.rebuild()
+        invalidate_network_cache()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {elapsed:.1f} с: добавлено {inserted} сущностей, связано с поставщиками {linked}'
+        ))
+
+    def iter_batches(self, path, import_format, batch_size):
+        """
+        Читает файл потоково и выдает пачки пар (номер записи, данные записи).
+        """
+        with open(path, encoding='utf-8', newline='') as source:
+            batch = []
+            for number, row in enumerate(read_rows(source, import_format), start=1):
+                batch.append((number, row))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    def insert_entities(self, path, import_format, batch_size, started):
+        """
+        Первый проход: проверяет записи и вставляет новые сущности, их контакты и продукты.
+
+        Возвращает:
+        tuple[set[int], int]: Идентификаторы сущностей, прошедших проверку (добавленных этим или прежним запуском),
+        и количество добавленных сущностей.
+        """
+        # Один экземпляр сериализатора на весь импорт: поля строятся один раз, а не для каждой записи.
+        serializer = NetworkEntityImportSerializer()
+        processed = inserted = 0
+        imported = set()
+        for batch_number, batch in enumerate(self.iter_batches(path, import_format, batch_size), start=1):
+            items = {}
+            for number, row in batch:
+                try:
+                    item = serializer.run_validation(row)
+                except ValidationError as error:
+                    self.stderr.write(f'Запись {number} пропущена: {error.detail}')
+                    continue
+                if item['id'] in items:
+                    self.stderr.write(f'Запись {number} пропущена: повторный id={item["id"]}')
+                else:
+                    items[item['id']] = item
+
+            existing = set(NetworkEntity.objects.filter(pk__in=items).values_list('pk', flat=True))
+            new_items = [item for entity_id, item in items.items() if entity_id not in existing]
+            with transaction.atomic():
+                NetworkEntity.objects.bulk_create([
+                    NetworkEntity(id=item['id'], name=item['name'], debt=item.get('debt', 0), level=0)
+                    for item in new_items
+                ])
+                Contact.objects.bulk_create([
+                    Contact(network_entity_id=item['id'], **item['contact'])
+                    for item in new_items if item['contact']
+                ])
+                Product.objects.bulk_create([
+                    Product(network_entity_id=item['id'], **product_data)
+                    for item in new_items for product_data in item['products']
+                ])
+
+            processed += len(batch)
+            inserted += len(new_items)
+            imported.update(items)
+            rate = processed / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'Пачка {batch_number}: добавлено {len(new_items)}, '
+                              f'уже существовало {len(existing)}, {rate:.0f} строк/с')
+        return imported, inserted
+
+    def link_suppliers(self, path, import_format, batch_size, imported):
+        """
+        Второй проход: проставляет ссылки на поставщиков сущностям, прошедшим проверку первым проходом,
+        у которых поставщика еще нет, когда поставщик есть в базе данных. Записи, не прошедшие проверку,
+        и сущности с уже проставленным поставщиком не меняются.
+        Ссылки, образующие цикл (например, A -> B и B -> A) вместе со ссылками в файле или в базе данных,
+        не проставляются, сущности цикла сообщаются в stderr.
+
+        Аргументы:
+        imported: Идентификаторы сущностей, прошедших проверку первым проходом.
+
+        Возвращает:
+        int: Количество сущностей, связанных с поставщиками.
+        """
+        links = {}
+        for batch in self.iter_batches(path, import_format, batch_size):
+            batch_links = {}
+            for _, row in batch:
+                try:
+                    entity_id = int(row['id'])
+                    if entity_id in imported and row.get('supplier') not in (None, ''):
+                        batch_links[entity_id] = int(row['supplier'])
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    continue
+
+            # Сущности, связанные прежним запуском до сбоя, уже имеют поставщика и не перезаписываются.
+            unlinked = set(NetworkEntity.objects.filter(pk__in=batch_links, supplier=None).values_list('pk', flat=True))
+            supplier_ids = set(batch_links.values()) - imported
+            known = imported | set(NetworkEntity.objects.filter(pk__in=supplier_ids).values_list('pk', flat=True))
+            for entity_id, supplier_id in batch_links.items():
+                if entity_id not in unlinked:
+                    continue
+                if supplier_id in known:
+                    links[entity_id] = supplier_id
+                else:
+                    self.stderr.write(f'Поставщик id={supplier_id} для сущности id={entity_id} не найден')
+
+        for cycle in self.find_cycles(self.with_stored_suppliers(links)):
+            self.stderr.write(f'Сущности id={cycle} образуют цикл поставщиков, ссылки не проставлены')
+            for entity_id in cycle:
+                links.pop(entity_id, None)
+
+        # Покупателей одного поставщика связываем одним UPDATE: у поставщика обычно много покупателей.
+        customers_by_supplier = defaultdict(list)
+        for entity_id, supplier_id in links.items():
+            customers_by_supplier[supplier_id].append(entity_id)
+        linked = 0
+        for supplier_id, entity_ids in customers_by_supplier.items():
+            linked += NetworkEntity.objects.filter(pk__in=entity_ids).update(supplier_id=supplier_id)
+        return linked
+
+    @staticmethod
+    def with_stored_suppliers(links):
+        """
+        Дополняет ссылки из файла ссылками на поставщиков, уже записанными в базу данных, для цепочек,
+        которые выходят из файла: так находятся циклы, замыкающиеся через сущности, связанные прежним запуском.
+        Цепочки загружаются по одному запросу на уровень иерархии.
+
+        Аргументы:
+        links: Словарь {id сущности: id поставщика} ссылок, которые будут проставлены.
+
+        Возвращает:
+        dict[int, int]: Ссылки из links вместе с записанными в базу данных ссылками их цепочек.
+        """
+        graph = dict(links)
+        seen = set(graph)
+        frontier = set(graph.values()) - seen
+        while frontier:
+            seen |= frontier
+            stored = dict(NetworkEntity.objects.filter(pk__in=frontier).exclude(supplier=None)
+                          .values_list('pk', 'supplier_id'))
+            graph.update(stored)
+            frontier = set(stored.values()) - seen
+        return graph
+
+    @staticmethod
+    def find_cycles(links):
+        """
+        Находит циклы в ссылках на поставщиков. У каждой сущности не больше одного поставщика,
+        поэтому достаточно пройти по цепочке от каждой сущности, помечая уже пройденные.
+
+        Аргументы:
+        links: Словарь {id сущности: id поставщика}.
+
+        Возвращает:
+        list[list[int]]: Идентификаторы сущностей каждого цикла в порядке ссылок.
+        """
+        cycles, visited = [], set()
+        for start in links:
+            chain, on_chain = [], set()
+            node = start
+            while node in links and node not in visited:
+                visited.add(node)
+                on_chain.add(node)
+                chain.append(node)
+                node = links[node]
+            if node in on_chain:
+                cycles.append(chain[chain.index(node):])
+        return cycles
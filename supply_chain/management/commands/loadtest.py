@@ -0,0 +1,73 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Команда для нагрузочного сравнения развертываний по HTTP.
+
+    Отправляет заданное количество GET-запросов на каждый URL с указанным уровнем параллелизма
+    и выводит пропускную способность и перцентили задержки. Используется, например, для сравнения
+    асинхронных представлений под ASGI (config/asgi.py) с синхронным API под WSGI (config/wsgi.py).
+    """
+    help = 'Нагрузочный тест GET-эндпоинтов: RPS и перцентили задержки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Полные URL для проверки')
+        parser.add_argument('--requests', type=int, default=1000, help='Количество запросов на каждый URL')
+        parser.add_argument('--concurrency', type=int, default=50, help='Количество одновременных запросов')
+        parser.add_argument('--token', help='JWT для заголовка Authorization: Bearer')
+        parser.add_argument('--timeout', type=float, default=30, help='Таймаут одного запроса в секундах')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты в формате JSON')
+
+    def handle(self, *args, **options):
+        results = [self.run(url, options) for url in options['urls']]
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f"{result['url']}\n"
+                f"  запросов: {result['requests']}, ошибок: {result['errors']}, RPS: {result['rps']:.1f}\n"
+                f"  задержка, мс: p50={result['p50_ms']:.1f} p95={result['p95_ms']:.1f} p99={result['p99_ms']:.1f}"
+            )
+
+    def run(self, url, options):
+        """
+        Выполняет серию запросов к одному URL и возвращает сводку измерений.
+        """
+        headers = {'Authorization': f"Bearer {options['token']}"} if options['token'] else {}
+
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            samples = list(executor.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(duration * 1000 for duration, ok in samples if ok)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99 or [0.0] * 99
+        return {
+            'url': url,
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'rps': len(samples) / elapsed,
+            'p50_ms': quantiles[49],
+            'p95_ms': quantiles[94],
+            'p99_ms': quantiles[98],
+        }
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from supply_chain.caching import invalidate_network_cache
+from supply_chain.models import DebtSummary, NetworkEntity
+
+
+class Command(BaseCommand):
+    """
+    Команда для полного пересчета путей и уровней всех сущностей NetworkEntity и сводки задолженности DebtSummary.
+
+    Используется после массовых изменений данных в обход save(), например прямых UPDATE в базе данных.
+    """
+    help = 'Пересчитывает пути и уровни всех сущностей сети пачками по корневым сущностям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество корневых сущностей, обрабатываемых в одной транзакции')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = 0
+        for batch, updated in enumerate(NetworkEntity.objects.rebuild_hierarchy(options['batch_size']), start=1):
+            total += updated
+            self.stdout.write(f'Пачка {batch}: исправлено {updated} строк')
+        DebtSummary.objects.rebuild()
+        invalidate_network_cache()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Готово: исправлено {total} строк за {elapsed:.1f} с'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_chain', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='network_entity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='supply_chain.networkentity'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_chain', '0002_product_related_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='networkentity',
+            index=models.Index(fields=['creation_time', 'id'], name='network_entity_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:50
+
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+
+def populate_paths(apps, schema_editor):
+    """
+    Заполняет пути и уровни существующих сущностей, продвигаясь по иерархии от заводов вниз:
+    за каждый проход одним запросом вычисляются пути сущностей, чьи поставщики уже обработаны.
+    """
+    NetworkEntity = apps.get_model('supply_chain', 'NetworkEntity')
+    NetworkEntity.objects.filter(supplier__isnull=True).update(path='/', level=0)
+    NetworkEntity.objects.filter(supplier__isnull=False).update(path='')
+
+    supplier_path = NetworkEntity.objects.filter(pk=OuterRef('supplier_id')).values('path')
+    level = 0
+    while True:
+        level += 1
+        updated = NetworkEntity.objects.filter(path='').exclude(supplier__path='').update(
+            path=Concat(Subquery(supplier_path), Cast('supplier_id', CharField()), Value('/'),
+                        output_field=CharField()),
+            level=level,
+        )
+        if not updated:
+            break
+
+    # Сущности, оставшиеся без пути, образуют цикл поставщиков и считаются корнями.
+    NetworkEntity.objects.filter(path='').update(path='/', level=0, supplier=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_chain', '0003_network_entity_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkentity',
+            name='path',
+            field=models.CharField(default='/', editable=False, max_length=1024, verbose_name='Путь в иерархии'),
+        ),
+        migrations.AddIndex(
+            model_name='networkentity',
+            index=models.Index(fields=['path'], name='network_entity_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи в таблицы, что невозможно внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('supply_chain', '0004_network_entity_path'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='contact',
+            index=models.Index(fields=['country'], name='contact_country_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='contact',
+            index=models.Index(fields=['city'], name='contact_city_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='networkentity',
+            index=models.Index(fields=['level'], name='network_entity_level_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+POPULATE_DEBT_SUMMARY = """
+    INSERT INTO supply_chain_debtsummary (root_id, level, country, total_debt, entity_count)
+    SELECT CASE WHEN entity.path = '/' THEN entity.id ELSE CAST(SPLIT_PART(entity.path, '/', 2) AS bigint) END,
+           entity.level, COALESCE(contact.country, ''), SUM(entity.debt), COUNT(*)
+    FROM supply_chain_networkentity AS entity
+    LEFT JOIN supply_chain_contact AS contact ON contact.network_entity_id = entity.id
+    GROUP BY 1, 2, 3
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_chain', '0005_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.IntegerField(verbose_name='Уровень поставщика')),
+                ('country', models.CharField(blank=True, max_length=100, verbose_name='Страна')),
+                ('total_debt', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Суммарная задолженность')),
+                ('entity_count', models.IntegerField(default=0, verbose_name='Количество сущностей')),
+                ('root', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='supply_chain.networkentity', verbose_name='Корневая сущность')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='debtsummary',
+            constraint=models.UniqueConstraint(fields=('root', 'level', 'country'), name='debt_summary_key_uniq'),
+        ),
+        migrations.RunSQL(POPULATE_DEBT_SUMMARY, migrations.RunSQL.noop),
+    ]
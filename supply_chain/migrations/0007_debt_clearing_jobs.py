@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_chain', '0006_debt_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtClearingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('selection', 'Выбранные сущности'), ('country', 'Страна'), ('subtree', 'Поддерево')], max_length=20, verbose_name='Область')),
+                ('country', models.CharField(blank=True, max_length=100, verbose_name='Страна')),
+                ('batch_size', models.PositiveIntegerField(default=1000, verbose_name='Размер пачки')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('running', 'Выполняется'), ('done', 'Завершено'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего сущностей с задолженностью')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('debt_cleared', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Снятая задолженность')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('root', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='supply_chain.networkentity', verbose_name='Корень поддерева')),
+            ],
+            options={
+                'verbose_name': 'Задание очистки задолженности',
+                'verbose_name_plural': 'Задания очистки задолженности',
+            },
+        ),
+        migrations.CreateModel(
+            name='DebtClearingBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_id', models.BigIntegerField(verbose_name='Первый id пачки')),
+                ('last_id', models.BigIntegerField(verbose_name='Последний id пачки')),
+                ('updated', models.PositiveIntegerField(verbose_name='Обновлено строк')),
+                ('debt_cleared', models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Снятая задолженность')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='supply_chain.debtclearingjob', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Пачка очистки задолженности',
+                'verbose_name_plural': 'Журнал очистки задолженности',
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Индекс строится без блокировки записи в таблицу, что невозможно внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('supply_chain', '0007_debt_clearing_jobs'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "network_entity_name_upper_idx" '
+            'ON "supply_chain_networkentity" (UPPER("name") text_pattern_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS "network_entity_name_upper_idx"',
+        ),
+    ]
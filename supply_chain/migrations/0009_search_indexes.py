@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+# Триграммные индексы строятся по UPPER(столбец), так как поиск по подстроке без учета регистра
+# (icontains) Django переводит в UPPER(столбец) LIKE UPPER(шаблон).
+TRIGRAM_INDEXES = [
+    ('network_entity_name_trgm_idx', 'supply_chain_networkentity', 'name'),
+    ('product_name_trgm_idx', 'supply_chain_product', 'name'),
+    ('product_model_trgm_idx', 'supply_chain_product', 'model'),
+    ('contact_street_trgm_idx', 'supply_chain_contact', 'street'),
+    ('contact_city_trgm_idx', 'supply_chain_contact', 'city'),
+    ('contact_country_trgm_idx', 'supply_chain_contact', 'country'),
+]
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи в таблицы, что невозможно внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('supply_chain', '0008_network_entity_name_upper_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='networkentity',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector('name', config='simple'),
+                name='network_entity_name_fts_idx',
+            ),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" USING gin (UPPER("{column}") gin_trgm_ops)',
+            f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"',
+        )
+        for name, table, column in TRIGRAM_INDEXES
+    ]
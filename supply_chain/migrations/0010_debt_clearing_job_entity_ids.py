@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:21
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supply_chain', '0009_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debtclearingjob',
+            name='entity_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None, verbose_name='Выбранные сущности'),
+        ),
+    ]
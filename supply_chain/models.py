@@ -1,36 +1,426 @@
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import BigIntegerField, Case, Count, F, Func, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Greatest, Length, Replace, Substr
+from django.utils import timezone
+
+from supply_chain.caching import invalidate_network_cache
+
+# Конфигурация полнотекстового поиска: названия, модели и адреса не переводятся к основам слов,
+# так как это в основном имена собственные на разных языках.
+SEARCH_CONFIG = 'simple'
+
+
+def path_depth(path):
+    """
+    Строит SQL-выражение уровня сущности по ее материализованному пути: число символов '/' минус один.
+
+    Аргументы:
+    path: Выражение или имя поля с путем.
+
+    Возвращает:
+    Выражение, вычисляемое на стороне базы данных.
+    """
+    if isinstance(path, str):
+        path = F(path)
+    return Length(path) - Length(Replace(path, Value('/'), Value(''))) - 1
+
+
+def path_root():
+    """
+    Строит SQL-выражение идентификатора корневой сущности (завода) по материализованному пути:
+    первый идентификатор в пути или собственный идентификатор для корня.
+
+    Возвращает:
+    Выражение, вычисляемое на стороне базы данных.
+    """
+    return Case(
+        When(path='/', then=F('pk')),
+        default=Cast(Func(F('path'), Value('/'), Value(2), function='SPLIT_PART'), BigIntegerField()),
+        output_field=BigIntegerField(),
+    )
+
+
+class NetworkEntityQuerySet(models.QuerySet):
+    """
+    QuerySet для модели NetworkEntity с заготовками запросов под типовые сценарии чтения.
+    """
+
+    def for_read(self, fields=None):
+        """
+        Подгружает связанные объекты, которые выводит NetworkEntityListSerializer.
+        Контакт и поставщик присоединяются через JOIN, продукты загружаются одним дополнительным запросом
+        в порядке первичного ключа, поэтому количество запросов не зависит от числа сущностей на странице.
+
+        Если задан набор выводимых полей (параметры 'fields' и 'expand' списка), из базы данных читаются
+        только эти поля, а контакт и продукты загружаются, только если они входят в набор.
+        Идентификатор и время создания читаются всегда: по ним строится курсор пагинации.
+
+        Аргументы:
+        fields: Набор имен выводимых полей или None для всех полей.
+
+        Возвращает:
+        QuerySet с select_related и prefetch_related.
+        """
+        products = models.Prefetch('products', queryset=Product.objects.order_by('pk'))
+        if fields is None:
+            return self.select_related('contact', 'supplier').prefetch_related(products)
+
+        columns = {field.name for field in self.model._meta.concrete_fields} & set(fields)
+        queryset = self.only('id', 'creation_time', *columns)
+        if 'contact' in fields:
+            queryset = queryset.select_related('contact')
+        if 'products' in fields:
+            queryset = queryset.prefetch_related(products)
+        return queryset
+
+    def ancestors_of(self, entity):
+        """
+        Возвращает цепочку поставщиков сущности, начиная с корня (завода).
+        Идентификаторы предков берутся из материализованного пути, поэтому выборка выполняется одним запросом.
+
+        Аргументы:
+        entity: Экземпляр NetworkEntity.
+
+        Возвращает:
+        QuerySet предков, упорядоченный от корня к непосредственному поставщику.
+        """
+        return self.filter(pk__in=entity.get_ancestor_ids()).order_by(Length('path'))
+
+    def descendants_of(self, entity):
+        """
+        Возвращает все сущности, находящиеся ниже указанной в иерархии, на любой глубине.
+        Выборка выполняется одним запросом по префиксу материализованного пути, который покрыт индексом.
+
+        Аргументы:
+        entity: Экземпляр NetworkEntity.
+
+        Возвращает:
+        QuerySet потомков.
+        """
+        return self.filter(path__startswith=entity.descendants_path)
+
+    def search_matches(self, text, limit=None):
+        """
+        Ищет совпадения строки запроса в названии сущности, названии и модели ее продуктов
+        и адресе контакта (улица, город, страна).
+
+        Совпадения по подстроке (icontains) находятся по триграммным индексам, по словам названия —
+        по индексу полнотекстового поиска (см. миграцию 0009). Каждая из трех выборок — по сущностям,
+        продуктам и контактам — сразу вычисляет релевантность совпадения: сходство запроса со словами
+        поля (word_similarity), а для названия сущности еще и полнотекстовый ранг. Каждая выборка упорядочена
+        по убыванию релевантности и ограничена limit строками, поэтому в результат попадают самые релевантные
+        совпадения каждой таблицы. Для общего запроса (например, названия страны) сходство вычисляется
+        для всех совпадений, что занимает сотни миллисекунд; такой запрос нужно уточнить.
+
+        Аргументы:
+        text: Строка запроса; для поиска по триграммам в ней должно быть не меньше трех символов.
+        limit: Наибольшее число совпадений в каждой выборке, по умолчанию settings.NETWORK_SEARCH_MAX_MATCHES.
+
+        Возвращает:
+        QuerySet пар (идентификатор сущности, релевантность), объединяющий три выборки (UNION ALL).
+        Сущность может встретиться в нем несколько раз.
+        """
+        limit = limit or settings.NETWORK_SEARCH_MAX_MATCHES
+        vector = SearchVector('name', config=SEARCH_CONFIG)
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+
+        entities = self.annotate(search_vector=vector).filter(
+            Q(search_vector=query) | Q(name__icontains=text)
+        ).annotate(
+            rank=SearchRank(vector, query) + TrigramWordSimilarity(text, 'name'),
+        ).values_list('pk', 'rank')
+        products = Product.objects.filter(Q(name__icontains=text) | Q(model__icontains=text)).annotate(
+            rank=Greatest(TrigramWordSimilarity(text, 'name'), TrigramWordSimilarity(text, 'model')),
+        ).values_list('network_entity_id', 'rank')
+        contacts = Contact.objects.filter(
+            Q(street__icontains=text) | Q(city__icontains=text) | Q(country__icontains=text)
+        ).annotate(
+            rank=Greatest(TrigramWordSimilarity(text, 'street'), TrigramWordSimilarity(text, 'city'),
+                          TrigramWordSimilarity(text, 'country')),
+        ).values_list('network_entity_id', 'rank')
+        if self.query.has_filters():
+            products = products.filter(network_entity__in=self.values('pk'))
+            contacts = contacts.filter(network_entity__in=self.values('pk'))
+        return entities.order_by('-rank', 'pk')[:limit].union(
+            products.order_by('-rank', 'network_entity_id')[:limit],
+            contacts.order_by('-rank', 'network_entity_id')[:limit],
+            all=True,
+        )
+
+    def search_ranking(self, text, limit=None):
+        """
+        Ищет сущности (см. search_matches) и упорядочивает их по релевантности.
+        Наибольшая релевантность совпадений каждой сущности выбирается в Python: совпадений не больше
+        трех выборок по limit строк, а страницу результатов затем загружают по идентификаторам.
+
+        Аргументы:
+        text: Строка запроса.
+        limit: Наибольшее число совпадений в каждой выборке.
+
+        Возвращает:
+        list[tuple[int, float]]: Пары (идентификатор сущности, релевантность) по убыванию релевантности.
+        """
+        ranks = {}
+        for pk, rank in self.search_matches(text, limit):
+            if rank > ranks.get(pk, -1):
+                ranks[pk] = rank
+        return sorted(ranks.items(), key=lambda item: (-item[1], item[0]))
+
+    def recalculate_levels(self):
+        """
+        Пересчитывает уровни выбранных сущностей по их путям одним UPDATE-запросом.
+        Например, NetworkEntity.objects.descendants_of(entity).recalculate_levels() исправляет все поддерево.
+
+        Возвращает:
+        int: Количество обновленных строк.
+        """
+        return self.update(level=path_depth('path'))
+
+    def root_ids(self):
+        """
+        Возвращает идентификаторы корневых сущностей, в поддеревьях которых находятся выбранные сущности.
+
+        Возвращает:
+        set[int]: Идентификаторы корней.
+        """
+        return set(self.annotate(root=path_root()).values_list('root', flat=True).distinct())
+
+    def in_subtrees_of(self, root_ids):
+        """
+        Отбирает сущности из поддеревьев указанных корней, включая сами корни.
+        Условие строится по префиксам путей, покрытым индексом network_entity_path_idx.
+
+        Аргументы:
+        root_ids: Идентификаторы корневых сущностей.
+
+        Возвращает:
+        QuerySet сущностей.
+        """
+        condition = Q(pk__in=root_ids, path='/')
+        for root_id in root_ids:
+            condition |= Q(path__startswith=f'/{root_id}/')
+        return self.filter(condition)
+
+    def clear_debt_batches(self, batch_size=1000):
+        """
+        Обнуляет задолженность выбранных сущностей пачками по batch_size строк в порядке первичного ключа.
+        Каждая пачка выполняется в отдельной короткой транзакции: строки пачки блокируются, их задолженность
+        вычитается из сводки DebtSummary и обнуляется одним UPDATE. Блокировки держатся только до конца пачки,
+        поэтому параллельные изменения других сущностей не ждут окончания всей операции.
+        Результат пачки выдается после фиксации ее транзакции, поэтому код, обрабатывающий его
+        (например, запись журнала пачек), не удерживает блокировки строк.
+
+        Аргументы:
+        batch_size: Количество сущностей в одной пачке.
+
+        Возвращает:
+        Генератор, выдающий для каждой пачки кортеж (первый id, последний id, обновлено строк, снятая задолженность).
+        """
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    self.filter(pk__gt=last_id).exclude(debt=0).order_by('pk')
+                    .select_for_update(of=('self',)).values_list('pk', flat=True)[:batch_size]
+                )
+                if not ids:
+                    return
+                batch = self.model.objects.filter(pk__in=ids)
+                cleared = 0
+                for row in batch.values(
+                    row_root=path_root(),
+                    row_level=F('level'),
+                    row_country=Coalesce(F('contact__country'), Value('')),
+                ).annotate(row_debt=Sum('debt')).order_by():
+                    DebtSummary.objects.add(row['row_root'], row['row_level'], row['row_country'], -row['row_debt'], 0)
+                    cleared += row['row_debt']
+                updated = batch.update(debt=0)
+            yield ids[0], ids[-1], updated, cleared
+            last_id = ids[-1]
+
+    def rebuild_hierarchy(self, batch_size=1000):
+        """
+        Полностью перестраивает пути и уровни всех сущностей по фактическим ссылкам на поставщиков.
+        Корни обрабатываются пачками по batch_size штук в порядке первичного ключа: для каждой пачки рекурсивный CTE
+        обходит их поддеревья и одним UPDATE исправляет строки, у которых путь или уровень отличаются.
+        Каждая пачка выполняется в отдельной короткой транзакции, в память Python строки не загружаются.
+
+        Аргументы:
+        batch_size: Количество корневых сущностей в одной пачке.
+
+        Возвращает:
+        Генератор, выдающий количество исправленных строк после каждой пачки.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = f"""
+            WITH RECURSIVE tree (id, path, level) AS (
+                SELECT id, CAST('/' AS varchar), 0
+                FROM {table}
+                WHERE supplier_id IS NULL AND id BETWEEN %s AND %s
+                UNION ALL
+                SELECT child.id, CAST(tree.path || CAST(tree.id AS varchar) || '/' AS varchar), tree.level + 1
+                FROM {table} AS child
+                JOIN tree ON child.supplier_id = tree.id
+            )
+            UPDATE {table}
+            SET path = tree.path, level = tree.level
+            FROM tree
+            WHERE {table}.id = tree.id AND ({table}.path <> tree.path OR {table}.level <> tree.level)
+        """
+        last_root_id = 0
+        while True:
+            root_ids = list(
+                self.model.objects.filter(supplier__isnull=True, pk__gt=last_root_id)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not root_ids:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [root_ids[0], root_ids[-1]])
+                yield cursor.rowcount
+            last_root_id = root_ids[-1]
 
 
 class NetworkEntity(models.Model):
     """
     Модель для представления сущности в сети продаж электроники.
+
+    Положение сущности в иерархии хранится в виде материализованного пути 'path' — перечня идентификаторов
+    всех поставщиков от корня, например '/1/5/' для сущности, чей поставщик 5 получает товар от завода 1.
+    У корневой сущности путь равен '/'.
     """
     name = models.CharField(max_length=255, verbose_name='Название')
     supplier = models.ForeignKey('self', on_delete=models.SET_NULL, verbose_name='Поставщик', null=True, blank=True)
     level = models.IntegerField(editable=False, verbose_name='Уровень поставщика')
+    path = models.CharField(max_length=1024, default='/', editable=False, verbose_name='Путь в иерархии')
     debt = models.DecimalField(max_digits=10, decimal_places=2, default=0.00,
                                verbose_name='Задолженность перед поставщиком')
     creation_time = models.DateTimeField(auto_now_add=True, verbose_name='Время создания')
 
-    def calculate_level(self):
+    objects = NetworkEntityQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['creation_time', 'id'], name='network_entity_created_id_idx'),
+            models.Index(fields=['level'], name='network_entity_level_idx'),
+            models.Index(fields=['path'], name='network_entity_path_idx', opclasses=['varchar_pattern_ops']),
+            GinIndex(SearchVector('name', config=SEARCH_CONFIG), name='network_entity_name_fts_idx'),
+        ]
+        # Для поиска по префиксу названия без учета регистра (name__istartswith) миграция 0008 создает
+        # индекс network_entity_name_upper_idx по UPPER(name) с классом операторов text_pattern_ops,
+        # а для поиска по подстроке (name__icontains) миграция 0009 — триграммный индекс
+        # network_entity_name_trgm_idx по UPPER(name). Они не описаны здесь, так как Django 5.0
+        # формирует для OpClass над выражением некорректный SQL.
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженную из базы данных задолженность, чтобы при сохранении
+        обновить сводную таблицу DebtSummary на разницу, а не пересчитывать ее.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_debt = instance.__dict__.get('debt')
+        return instance
+
+    @property
+    def descendants_path(self):
+        """
+        Префикс пути, с которого начинаются пути всех потомков сущности.
+        """
+        return f'{self.path}{self.pk}/'
+
+    @property
+    def root_id(self):
+        """
+        Идентификатор корневой сущности (завода), в поддереве которой находится сущность.
+        """
+        ancestor_ids = self.get_ancestor_ids()
+        return ancestor_ids[0] if ancestor_ids else self.pk
+
+    def get_ancestor_ids(self):
+        """
+        Возвращает идентификаторы поставщиков сущности от корня к непосредственному поставщику.
+        Возвращает:
+        list[int]: Идентификаторы предков.
+        """
+        return [int(ancestor_id) for ancestor_id in self.path.strip('/').split('/') if ancestor_id]
+
+    def is_valid_supplier(self, supplier):
         """
-        Вычисляет уровень сущности в иерархии сети на основе наличия и уровня поставщика.
+        Проверяет, что назначение поставщика не создаст цикл в иерархии.
+        Поставщиком не может быть сама сущность или любой из ее потомков.
+        Аргументы:
+        supplier: Предполагаемый поставщик или None.
         Возвращает:
-        int: Уровень сущности (0, 1 или 2).
+        bool: True, если поставщика можно назначить.
+        """
+        if supplier is None or self.pk is None:
+            return True
+        return supplier.pk != self.pk and f'/{self.pk}/' not in supplier.path
+
+    def calculate_path(self):
+        """
+        Вычисляет материализованный путь сущности по пути ее поставщика.
+        Возвращает:
+        str: Путь сущности в иерархии.
         """
         if not self.supplier:
-            return 0
-        elif not self.supplier.supplier:
-            return 1
-        else:
-            return 2
+            return '/'
+        return self.supplier.descendants_path
+
+    def calculate_level(self):
+        """
+        Вычисляет уровень сущности в иерархии сети как количество поставщиков в ее пути.
+        Возвращает:
+        int: Уровень сущности (0 для завода, 1 для его покупателей и так далее).
+        """
+        return self.path.count('/') - 1
+
+    def clean(self):
+        """
+        Проверяет, что выбранный поставщик не образует цикл в иерархии.
+        """
+        if not self.is_valid_supplier(self.supplier):
+            raise ValidationError({'supplier': 'Поставщик не может быть самой сущностью или ее потомком'})
 
     def save(self, *args, **kwargs):
         """
-        Переопределенный метод сохранения. Вычисляет и задает уровень сущности перед сохранением.
+        Переопределенный метод сохранения. Вычисляет и задает путь и уровень сущности перед сохранением.
+        Если при смене поставщика путь сущности изменился, пути и уровни всех ее потомков
+        обновляются одним запросом заменой префикса.
+        Сводная таблица задолженности обновляется в той же транзакции: при переносе поддерева пересчитываются
+        затронутые корни, при изменении задолженности к строке сводки прибавляется разница.
         """
+        old_path = self.path if self.pk else None
+        old_root_id = self.root_id if old_path is not None else None
+        old_debt = getattr(self, '_loaded_debt', None)
+        # Сводка прибавляет разницу задолженности, поэтому заданную строкой задолженность (данные формы, импорта)
+        # приводим к Decimal до сравнения с загруженной.
+        self.debt = self._meta.get_field('debt').to_python(self.debt)
+        adding = self._state.adding
+        self.path = self.calculate_path()
         self.level = self.calculate_level()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path is not None and old_path != self.path:
+                new_path = Concat(Value(self.path), Substr('path', len(old_path) + 1))
+                NetworkEntity.objects.filter(path__startswith=f'{old_path}{self.pk}/').update(
+                    path=new_path,
+                    level=path_depth(new_path),
+                )
+                DebtSummary.objects.refresh_roots({old_root_id, self.root_id})
+            elif adding:
+                DebtSummary.objects.add(self.root_id, self.level, '', self.debt, 1)
+            elif old_debt is None:
+                DebtSummary.objects.refresh_roots({self.root_id})
+            elif old_debt != self.debt:
+                DebtSummary.objects.add_debt(self, self.debt - old_debt)
+        self._loaded_debt = self.debt
 
     def __str__(self):
         return self.name
@@ -47,6 +437,24 @@ class Contact(models.Model):
     street = models.CharField(max_length=100, verbose_name='Улица')
     house_number = models.CharField(max_length=20, verbose_name='Номер дома')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['country'], name='contact_country_idx'),
+            models.Index(fields=['city'], name='contact_city_idx'),
+        ]
+        # Триграммные индексы по UPPER(street), UPPER(city) и UPPER(country) для поиска по подстроке
+        # создает миграция 0009 (см. NetworkEntity.Meta).
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженную из базы данных страну, чтобы при ее изменении перенести
+        вклад сущности в сводной таблице DebtSummary.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_country = instance.__dict__.get('country')
+        return instance
+
     def __str__(self):
         return f"{self.house_number}, {self.street}, {self.city}, {self.country}, {self.email}"
 
@@ -55,10 +463,312 @@ class Product(models.Model):
     """
     Модель для представления продукта, предлагаемого сущностью сети.
     """
-    network_entity = models.ForeignKey(NetworkEntity, on_delete=models.CASCADE)
+    network_entity = models.ForeignKey(NetworkEntity, on_delete=models.CASCADE, related_name='products')
     name = models.CharField(max_length=255, verbose_name='Название')
     model = models.CharField(max_length=255, verbose_name='Модель')
     release_date = models.DateField(verbose_name='Дата выхода продукта на рынок')
 
+    # Триграммные индексы по UPPER(name) и UPPER(model) для поиска по подстроке создает миграция 0009
+    # (см. NetworkEntity.Meta).
+
     def __str__(self):
         return f"{self.name} {self.model} {self.release_date}"
+
+
+class DebtSummaryQuerySet(models.QuerySet):
+    """
+    QuerySet для сводной таблицы DebtSummary: поддержание сводки в актуальном состоянии и агрегаты по ней.
+    """
+
+    def add(self, root_id, level, country, debt, count):
+        """
+        Прибавляет задолженность и количество сущностей к строке сводки, создавая строку при ее отсутствии.
+
+        Аргументы:
+        root_id: Идентификатор корневой сущности.
+        level: Уровень в иерархии.
+        country: Страна контакта или пустая строка.
+        debt: Прибавляемая задолженность (может быть отрицательной).
+        count: Прибавляемое количество сущностей (может быть отрицательным).
+        """
+        key = {'root_id': root_id, 'level': level, 'country': country}
+        changes = {'total_debt': F('total_debt') + debt, 'entity_count': F('entity_count') + count}
+        if self.filter(**key).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                self.create(total_debt=debt, entity_count=count, **key)
+        except IntegrityError:
+            # Строку одновременно создала другая транзакция.
+            self.filter(**key).update(**changes)
+
+    def add_debt(self, entity, debt):
+        """
+        Прибавляет изменение задолженности сущности к ее строке сводки.
+
+        Аргументы:
+        entity: Экземпляр NetworkEntity с актуальными путем и уровнем.
+        debt: Изменение задолженности.
+        """
+        country = Contact.objects.filter(network_entity=entity).values_list('country', flat=True).first()
+        self.add(entity.root_id, entity.level, country or '', debt, 0)
+
+    def move_country(self, entity, old_country, new_country):
+        """
+        Переносит вклад сущности в сводку из одной страны в другую при изменении ее контакта.
+
+        Аргументы:
+        entity: Экземпляр NetworkEntity.
+        old_country: Прежняя страна или пустая строка.
+        new_country: Новая страна или пустая строка.
+        """
+        if old_country == new_country:
+            return
+        self.add(entity.root_id, entity.level, old_country, -entity.debt, -1)
+        self.add(entity.root_id, entity.level, new_country, entity.debt, 1)
+
+    def refresh_roots(self, root_ids, chunk_size=100):
+        """
+        Пересчитывает строки сводки для поддеревьев указанных корней.
+        Корни обрабатываются группами по chunk_size: строки группы удаляются и вставляются заново
+        одним запросом INSERT ... SELECT с агрегацией на стороне базы данных.
+
+        Аргументы:
+        root_ids: Идентификаторы корневых сущностей.
+        chunk_size: Количество корней в одном запросе.
+        """
+        root_ids = sorted(root_id for root_id in root_ids if root_id is not None)
+        for start in range(0, len(root_ids), chunk_size):
+            chunk = root_ids[start:start + chunk_size]
+            with transaction.atomic():
+                # Блокировка корней не дает двум пересчетам одного поддерева вставить дублирующиеся строки.
+                list(NetworkEntity.objects.filter(pk__in=chunk).select_for_update().values_list('pk'))
+                self.filter(root_id__in=chunk).delete()
+                self._insert_from(NetworkEntity.objects.in_subtrees_of(chunk))
+
+    def rebuild(self):
+        """
+        Полностью пересчитывает сводку по всем сущностям одним запросом INSERT ... SELECT.
+        """
+        with transaction.atomic():
+            self.all().delete()
+            self._insert_from(NetworkEntity.objects.all())
+
+    def _insert_from(self, entities):
+        """
+        Вставляет в сводку агрегаты выбранных сущностей, не загружая строки в память Python.
+        """
+        aggregates = entities.values(
+            agg_root=path_root(),
+            agg_level=F('level'),
+            agg_country=Coalesce(F('contact__country'), Value('')),
+        ).annotate(agg_debt=Sum('debt'), agg_count=Count('id')).order_by()
+        sql, params = aggregates.query.sql_with_params()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (root_id, level, country, total_debt, entity_count) {sql}', params
+            )
+
+    def rollup(self, group_by):
+        """
+        Агрегирует задолженность по уровню, стране или корневой сущности.
+
+        Аргументы:
+        group_by: 'level', 'country' или 'root'.
+
+        Возвращает:
+        QuerySet словарей с ключом группировки, 'total_debt' и 'entity_count'.
+        """
+        key = {'level': 'level', 'country': 'country', 'root': 'root_id'}[group_by]
+        fields = [key, 'root__name'] if group_by == 'root' else [key]
+        return (
+            self.filter(entity_count__gt=0)
+            .values(*fields)
+            .annotate(total_debt=Sum('total_debt'), entity_count=Sum('entity_count'))
+            .order_by(key)
+        )
+
+
+class DebtSummary(models.Model):
+    """
+    Сводная таблица задолженности: сумма задолженностей и количество сущностей для каждого сочетания
+    корневой сущности (завода), уровня в иерархии и страны контакта.
+
+    Поддерживается инкрементально при сохранении сущностей и контактов, поэтому агрегаты по уровню,
+    стране и заводу считаются по нескольким строкам сводки, а не по всей таблице сущностей.
+    Сущности без контакта учитываются с пустой страной.
+    """
+    root = models.ForeignKey(NetworkEntity, on_delete=models.CASCADE, related_name='+',
+                             verbose_name='Корневая сущность')
+    level = models.IntegerField(verbose_name='Уровень поставщика')
+    country = models.CharField(max_length=100, blank=True, verbose_name='Страна')
+    total_debt = models.DecimalField(max_digits=20, decimal_places=2, default=0,
+                                     verbose_name='Суммарная задолженность')
+    entity_count = models.IntegerField(default=0, verbose_name='Количество сущностей')
+
+    objects = DebtSummaryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['root', 'level', 'country'], name='debt_summary_key_uniq'),
+        ]
+
+
+class DebtClearingJobQuerySet(models.QuerySet):
+    """
+    QuerySet для заданий очистки задолженности.
+    """
+
+    def claim_next(self):
+        """
+        Забирает самое старое ожидающее задание и переводит его в статус 'running'.
+        Строка блокируется с SKIP LOCKED, поэтому несколько обработчиков не возьмут одно задание.
+
+        Возвращает:
+        DebtClearingJob или None, если ожидающих заданий нет.
+        """
+        with transaction.atomic():
+            job = self.filter(status=DebtClearingJob.STATUS_PENDING).order_by('pk').select_for_update(
+                skip_locked=True).first()
+            if job is not None:
+                job.status = DebtClearingJob.STATUS_RUNNING
+                job.started_at = timezone.now()
+                job.save(update_fields=['status', 'started_at'])
+        return job
+
+
+class DebtClearingJob(models.Model):
+    """
+    Модель задания очистки задолженности для выбранных сущностей, страны или поддерева.
+
+    Задание выполняется пачками (см. NetworkEntityQuerySet.clear_debt_batches), после каждой пачки
+    обновляется прогресс и добавляется запись в журнал DebtClearingBatch. Задания выполняются в фоне
+    командой clear_debt, а не в HTTP-запросе админ-панели; для области 'selection' идентификаторы
+    выбранных сущностей сохраняются в самом задании.
+    """
+    SCOPE_SELECTION = 'selection'
+    SCOPE_COUNTRY = 'country'
+    SCOPE_SUBTREE = 'subtree'
+    SCOPE_CHOICES = [
+        (SCOPE_SELECTION, 'Выбранные сущности'),
+        (SCOPE_COUNTRY, 'Страна'),
+        (SCOPE_SUBTREE, 'Поддерево'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Ожидает'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершено'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, verbose_name='Область')
+    country = models.CharField(max_length=100, blank=True, verbose_name='Страна')
+    root = models.ForeignKey(NetworkEntity, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                             verbose_name='Корень поддерева')
+    entity_ids = ArrayField(BigIntegerField(), default=list, blank=True, verbose_name='Выбранные сущности')
+    batch_size = models.PositiveIntegerField(default=1000, verbose_name='Размер пачки')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='Статус')
+    total = models.PositiveIntegerField(default=0, verbose_name='Всего сущностей с задолженностью')
+    processed = models.PositiveIntegerField(default=0, verbose_name='Обработано')
+    debt_cleared = models.DecimalField(max_digits=20, decimal_places=2, default=0,
+                                       verbose_name='Снятая задолженность')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name='Автор')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начато')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+
+    objects = DebtClearingJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Задание очистки задолженности'
+        verbose_name_plural = 'Задания очистки задолженности'
+
+    @property
+    def progress(self):
+        """
+        Доля обработанных сущностей в процентах.
+        """
+        if self.status == self.STATUS_DONE:
+            return 100
+        return round(self.processed * 100 / self.total) if self.total else 0
+
+    def clean(self):
+        """
+        Проверяет, что для выбранной области указаны страна или корень поддерева.
+        """
+        if self.scope == self.SCOPE_COUNTRY and not self.country:
+            raise ValidationError({'country': 'Укажите страну'})
+        if self.scope == self.SCOPE_SUBTREE and self.root_id is None:
+            raise ValidationError({'root': 'Укажите корень поддерева'})
+
+    def get_queryset(self):
+        """
+        Возвращает сущности, задолженность которых очищает задание.
+        """
+        if self.scope == self.SCOPE_SELECTION:
+            return NetworkEntity.objects.filter(pk__in=self.entity_ids)
+        if self.scope == self.SCOPE_COUNTRY:
+            return NetworkEntity.objects.filter(contact__country=self.country)
+        if self.scope == self.SCOPE_SUBTREE and self.root is not None:
+            return NetworkEntity.objects.filter(Q(pk=self.root_id) | Q(path__startswith=self.root.descendants_path))
+        return NetworkEntity.objects.none()
+
+    def run(self):
+        """
+        Выполняет задание пачками, обновляя прогресс и журнал после каждой пачки.
+
+        Возвращает:
+        DebtClearingJob: Само задание в итоговом статусе.
+        """
+        queryset = self.get_queryset()
+        self.status = self.STATUS_RUNNING
+        self.started_at = self.started_at or timezone.now()
+        self.total = queryset.exclude(debt=0).count()
+        self.save(update_fields=['status', 'started_at', 'total'])
+        try:
+            for first_id, last_id, updated, cleared in queryset.clear_debt_batches(self.batch_size):
+                DebtClearingBatch.objects.create(job=self, first_id=first_id, last_id=last_id,
+                                                 updated=updated, debt_cleared=cleared)
+                self.processed += updated
+                self.debt_cleared += cleared
+                self.save(update_fields=['processed', 'debt_cleared'])
+                invalidate_network_cache()
+        except Exception as error:
+            self.status = self.STATUS_FAILED
+            self.error = str(error)
+            raise
+        else:
+            self.status = self.STATUS_DONE
+        finally:
+            self.finished_at = timezone.now()
+            self.save(update_fields=['status', 'error', 'finished_at'])
+        return self
+
+    def __str__(self):
+        target = {self.SCOPE_COUNTRY: self.country, self.SCOPE_SUBTREE: str(self.root)}.get(self.scope, '')
+        return f"{self.get_scope_display()} {target}".strip()
+
+
+class DebtClearingBatch(models.Model):
+    """
+    Запись журнала очистки задолженности: одна строка на пачку, зафиксированную в одной транзакции с ней.
+    """
+    job = models.ForeignKey(DebtClearingJob, on_delete=models.CASCADE, related_name='batches',
+                            verbose_name='Задание')
+    first_id = models.BigIntegerField(verbose_name='Первый id пачки')
+    last_id = models.BigIntegerField(verbose_name='Последний id пачки')
+    updated = models.PositiveIntegerField(verbose_name='Обновлено строк')
+    debt_cleared = models.DecimalField(max_digits=20, decimal_places=2, verbose_name='Снятая задолженность')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время')
+
+    class Meta:
+        verbose_name = 'Пачка очистки задолженности'
+        verbose_name_plural = 'Журнал очистки задолженности'
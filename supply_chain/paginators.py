@@ -0,0 +1,76 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class NetworkEntityCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация для списка сущностей NetworkEntity.
+
+    Сущности упорядочиваются по паре (creation_time, id), которая покрыта составным индексом,
+    поэтому получение любой страницы сводится к поиску по индексу и не зависит от глубины, в отличие от OFFSET.
+    Курсор DRF хранит только значение creation_time последней записи и смещение среди записей с тем же значением:
+    id лишь делает порядок детерминированным и в курсор не входит, поэтому на группах сущностей с одинаковым
+    creation_time страница пропускает записи группы через OFFSET.
+    Курсоры непрозрачны для клиента, размер страницы задается параметром 'page_size'.
+    """
+    ordering = ('creation_time', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class NetworkEntitySearchPagination(PageNumberPagination):
+    """
+    Постраничная пагинация результатов поиска сущностей.
+
+    Результаты упорядочены по релевантности, а не по индексированному ключу, поэтому курсорная пагинация
+    неприменима; номер страницы задается параметром 'page', размер — параметром 'page_size'.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админ-панели, который для больших таблиц берет количество строк из статистики PostgreSQL
+    вместо COUNT(*), требующего полного прохода по таблице.
+
+    Для выборки без условий используется pg_class.reltuples, для отфильтрованной — оценка числа строк
+    из плана запроса (EXPLAIN). Если оценка меньше estimate_threshold или статистика еще не собрана,
+    выполняется точный COUNT(*).
+    """
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.estimate_threshold:
+            return super().count
+        return estimate
+
+    def estimate_count(self):
+        """
+        Возвращает оценку количества строк в выборке или None, если оценить его нельзя.
+        """
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return None
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                # reltuples равен -1 для таблицы, по которой ANALYZE еще не выполнялся.
+                return int(row[0]) if row and row[0] >= 0 else None
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
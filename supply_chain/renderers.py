@@ -0,0 +1,22 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на основе orjson с тем же результатом, что и JSONRenderer при настройках DRF по умолчанию
+    (UNICODE_JSON и COMPACT_JSON): компактный вывод в UTF-8 с экранированием U+2028 и U+2029.
+
+    Типы, которые orjson не поддерживает (Decimal, ленивые строки перевода), преобразуются
+    кодировщиком DRF. Форматированный вывод (indent) выполняет JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default)
+        # Как и JSONRenderer, экранирует разделители строк, недопустимые в JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,5 +1,9 @@
+from collections import Counter
+
+from django.db import transaction
 from rest_framework import serializers
-from supply_chain.models import NetworkEntity, Contact, Product
+from supply_chain.caching import invalidate_network_cache
+from supply_chain.models import NetworkEntity, Contact, Product, DebtSummary
 
 
 class ContactSerializer(serializers.ModelSerializer):
@@ -111,17 +115,93 @@ class ProductSerializer(serializers.ModelSerializer):
         return instance
 
 
+class NetworkEntityProductSerializer(ProductSerializer):
+    """
+    Сериализатор продукта в составе сущности NetworkEntity.
+    В отличие от ProductSerializer принимает 'id', чтобы при обновлении сущности можно было
+    сопоставить входные данные с уже существующими продуктами.
+    """
+    id = serializers.IntegerField(required=False)
+
+    class Meta(ProductSerializer.Meta):
+        pass
+
+
 class NetworkEntityListSerializer(serializers.ModelSerializer):
     """
     Сериализатор для предоставления данных сущности NetworkEntity, включая связанные контакты и продукты.
     Используется для чтения данных, где контакт и продукты отображаются в режиме 'read_only'.
+
+    Набор выводимых полей можно сузить, передав в контексте 'fields' множество имен
+    (см. get_selected_fields); поля always_included_fields выводятся всегда.
     """
     contact = ContactSerializer(read_only=True)
     products = ProductSerializer(many=True, read_only=True)
 
+    expandable_fields = ('contact', 'products')
+    always_included_fields = ('id', 'creation_time')
+
     class Meta:
         model = NetworkEntity
-        fields = '__all__'
+        exclude = ('path',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected is not None:
+            for name in set(self.fields) - set(selected) - set(self.always_included_fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_selected_fields(cls, query_params):
+        """
+        Определяет набор выводимых полей по параметрам запроса 'fields' и 'expand'.
+
+        'fields' — перечень полей сущности через запятую, 'expand' — перечень вложенных объектов
+        ('contact', 'products'). Если задан только 'expand', выводятся все поля сущности и перечисленные
+        вложенные объекты; если задан 'fields', вложенные объекты выводятся, только если они перечислены
+        в одном из параметров.
+
+        Аргументы:
+        query_params: Параметры запроса.
+
+        Возвращает:
+        set | None: Имена выводимых полей или None, если ни один параметр не задан.
+
+        Raises:
+        ValidationError: Если указано неизвестное поле.
+        """
+        if 'fields' not in query_params and 'expand' not in query_params:
+            return None
+
+        def split(param):
+            return {name.strip() for name in query_params.get(param, '').split(',') if name.strip()}
+
+        fields, expand = split('fields'), split('expand')
+        declared = set(cls().fields)
+        errors = {}
+        if fields - declared:
+            errors['fields'] = f"Неизвестные поля: {', '.join(sorted(fields - declared))}"
+        if expand - set(cls.expandable_fields):
+            errors['expand'] = f"Допустимые значения: {', '.join(cls.expandable_fields)}"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if 'fields' not in query_params:
+            fields = declared - set(cls.expandable_fields)
+        return fields | expand | set(cls.always_included_fields)
+
+
+class NetworkEntitySearchSerializer(NetworkEntityListSerializer):
+    """
+    Сериализатор результата поиска сущностей: данные NetworkEntityListSerializer и релевантность 'rank'.
+    """
+    rank = serializers.FloatField(read_only=True)
+
+    always_included_fields = NetworkEntityListSerializer.always_included_fields + ('rank',)
+
+    class Meta(NetworkEntityListSerializer.Meta):
+        pass
 
 
 class NetworkEntityCreateUpdateSerializer(serializers.ModelSerializer):
@@ -130,11 +210,52 @@ class NetworkEntityCreateUpdateSerializer(serializers.ModelSerializer):
     Включает в себя логику для обработки связанных данных контактов и продуктов при создании или обновлении сущности NetworkEntity.
     """
     contact = ContactSerializer()
-    products = ProductSerializer(many=True)
+    products = NetworkEntityProductSerializer(many=True)
 
     class Meta:
         model = NetworkEntity
-        exclude = ('debt',)
+        exclude = ('debt', 'path')
+
+    def validate_supplier(self, value):
+        """
+        Проверяет, что новый поставщик не является самой сущностью или ее потомком.
+
+        Аргументы:
+        value: Выбранный поставщик или None.
+
+        Возвращает:
+        Проверенного поставщика.
+        """
+        if self.instance is not None and not self.instance.is_valid_supplier(value):
+            raise serializers.ValidationError("Поставщик не может быть самой сущностью или ее потомком")
+        return value
+
+    def validate_products(self, value):
+        """
+        Проверяет, что 'id' продуктов не повторяются, а при обновлении — что продукты с 'id' принадлежат сущности.
+        Существующие продукты сущности загружаются одним запросом и сохраняются в existing_products для sync_products.
+
+        Аргументы:
+        value: Список валидированных данных продуктов.
+
+        Возвращает:
+        Проверенный список продуктов.
+        """
+        ids = [product_data['id'] for product_data in value if 'id' in product_data]
+        duplicate_ids = sorted(product_id for product_id, count in Counter(ids).items() if count > 1)
+        if duplicate_ids:
+            raise serializers.ValidationError(f"Продукты с id={duplicate_ids} переданы несколько раз")
+
+        if self.instance is not None:
+            self.existing_products = {
+                product.id: product for product in Product.objects.filter(network_entity=self.instance)
+            }
+            unknown_ids = set(ids) - set(self.existing_products)
+            if unknown_ids:
+                raise serializers.ValidationError(
+                    f"Продукты с id={sorted(unknown_ids)} не принадлежат этой сущности"
+                )
+        return value
 
     def create(self, validated_data):
         """
@@ -151,12 +272,15 @@ class NetworkEntityCreateUpdateSerializer(serializers.ModelSerializer):
         contact_data = validated_data.pop('contact')
         products_data = validated_data.pop('products')
 
-        network_entity = NetworkEntity.objects.create(**validated_data)
+        with transaction.atomic():
+            network_entity = NetworkEntity.objects.create(**validated_data)
 
-        Contact.objects.create(network_entity=network_entity, **contact_data)
+            Contact.objects.create(network_entity=network_entity, **contact_data)
 
-        for product_data in products_data:
-            Product.objects.create(network_entity=network_entity, **product_data)
+            Product.objects.bulk_create([
+                Product(network_entity=network_entity, **self.product_fields(product_data))
+                for product_data in products_data
+            ])
 
         return network_entity
 
@@ -165,6 +289,7 @@ class NetworkEntityCreateUpdateSerializer(serializers.ModelSerializer):
         Обновляет существующий объект NetworkEntity и связанные с ним объекты Contact и Product.
         Извлекает данные для контактов и продуктов из validated_data, затем обновляет основную сущность.
         После обновления основной сущности, обновляет связанные объекты Contact и Product, связывая обновленные данные с существующей сущностью NetworkEntity.
+        Продукты синхронизируются с переданным списком (см. sync_products), все изменения выполняются в одной транзакции.
 
         Аргументы:
         instance: Экземпляр NetworkEntity для обновления.
@@ -173,20 +298,276 @@ class NetworkEntityCreateUpdateSerializer(serializers.ModelSerializer):
         Возвращает:
         Обновленный объект NetworkEntity с связанными объектами Contact и Product.
         """
-        contact_data = validated_data.pop('contact')
-        products_data = validated_data.pop('products', [])
+        contact_data = validated_data.pop('contact', None)
+        products_data = validated_data.pop('products', None)
+
+        with transaction.atomic():
+            if contact_data is not None:
+                contacts = Contact.objects.filter(network_entity=instance)
+                old_country = contacts.values_list('country', flat=True).first()
+                contacts.update(**contact_data)
+                if old_country is not None and 'country' in contact_data:
+                    DebtSummary.objects.move_country(instance, old_country, contact_data['country'])
+
+            if products_data is not None:
+                self.sync_products(instance, products_data)
+
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+        return instance
+
+    def sync_products(self, instance, products_data):
+        """
+        Приводит набор продуктов сущности в соответствие с переданным списком.
+        Существующие продукты загружены при валидации (см. validate_products), после чего вычисляется разница:
+        продукты с 'id' обновляются через bulk_update, продукты без 'id' создаются через bulk_create,
+        а отсутствующие в списке удаляются одним запросом. Количество запросов не зависит от количества продуктов.
 
-        Contact.objects.filter(id=instance.contact.id).update(**contact_data)
+        Аргументы:
+        instance: Экземпляр NetworkEntity, продукты которого синхронизируются.
+        products_data: Список валидированных данных продуктов.
+        """
+        existing = dict(self.existing_products)
 
+        to_create, to_update = [], []
         for product_data in products_data:
-            product_id = product_data.get('id')
-            if product_id:
-                Product.objects.filter(id=product_id).update(**product_data)
+            product = existing.pop(product_data.get('id'), None)
+            if product is None:
+                to_create.append(Product(network_entity=instance, **self.product_fields(product_data)))
             else:
-                Product.objects.create(network_entity=instance, **product_data)
+                for attr, value in self.product_fields(product_data).items():
+                    setattr(product, attr, value)
+                to_update.append(product)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        Product.objects.bulk_create(to_create)
+        Product.objects.bulk_update(to_update, ['name', 'model', 'release_date'])
+        if existing:
+            Product.objects.filter(pk__in=existing).delete()
 
-        return instance
+    @staticmethod
+    def product_fields(product_data):
+        """
+        Возвращает поля модели Product из данных продукта без 'id', не изменяя validated_data.
+        """
+        return {attr: value for attr, value in product_data.items() if attr != 'id'}
+
+
+class NetworkEntityBulkListSerializer(serializers.ListSerializer):
+    """
+    Списочный сериализатор для пакетного создания сущностей NetworkEntity.
+
+    Перед валидацией элементов одним запросом загружает пути всех упомянутых внешних поставщиков
+    и разрешает ссылки 'supplier_ref' на сущности из этого же пакета, чтобы ошибки возвращались по каждому элементу.
+    Создание выполняется через bulk_create в одной транзакции: по одному INSERT на поколение сущностей
+    внутри пакета, а также по одному на контакты и продукты.
+    """
+
+    def to_internal_value(self, data):
+        """
+        Подготавливает данные для валидации элементов: пути внешних поставщиков и множество разрешимых ссылок.
+        """
+        items = [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+
+        supplier_ids = set()
+        for item in items:
+            try:
+                supplier_ids.add(int(item.get('supplier')))
+            except (TypeError, ValueError):
+                pass
+        self.supplier_paths = dict(NetworkEntity.objects.filter(pk__in=supplier_ids).values_list('pk', 'path'))
+
+        # Граф ссылок строится по значениям, приведенным так же, как их приведет поле 'ref' элемента.
+        # Некорректные значения (списки, словари) в граф не попадают: ошибку по ним вернет валидация элемента.
+        refs = [(self.parse_ref(item.get('ref')), self.parse_ref(item.get('supplier_ref'))) for item in items]
+        ref_counts = Counter(ref for ref, _ in refs if ref is not None)
+        self.duplicate_refs = {ref for ref, count in ref_counts.items() if count > 1}
+        supplier_refs = {ref: supplier_ref for ref, supplier_ref in refs if ref is not None}
+        self.known_refs = set(supplier_refs)
+        self.resolved_refs = {ref for ref, supplier_ref in supplier_refs.items() if supplier_ref is None}
+        pending = {ref: supplier_ref for ref, supplier_ref in supplier_refs.items() if supplier_ref is not None}
+        while True:
+            ready = {ref for ref, supplier_ref in pending.items() if supplier_ref in self.resolved_refs}
+            if not ready:
+                break
+            self.resolved_refs |= ready
+            for ref in ready:
+                del pending[ref]
+
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_ref(value):
+        """
+        Приводит значение 'ref' или 'supplier_ref' к строке, как поле CharField элемента.
+
+        Возвращает:
+        Строку или None, если значение не задано или не является скаляром.
+        """
+        if value is None:
+            return None
+        try:
+            return serializers.CharField().run_validation(value)
+        except serializers.ValidationError:
+            return None
+
+    def create(self, validated_data):
+        """
+        Создает сущности, их контакты и продукты пакетно.
+        Пути и уровни вычисляются в памяти: для внешнего поставщика по его пути из базы данных,
+        для поставщика из пакета — после вставки его поколения, когда известен его идентификатор.
+        Новые сущности добавляются в сводку задолженности одним обновлением на сочетание корня, уровня и страны.
+
+        Аргументы:
+        validated_data: Список валидированных данных сущностей.
+
+        Возвращает:
+        Список созданных объектов NetworkEntity в порядке входных данных.
+        """
+        entities = [None] * len(validated_data)
+        created_by_ref = {}
+        pending = list(range(len(validated_data)))
+
+        with transaction.atomic():
+            while pending:
+                ready, waiting = [], []
+                for index in pending:
+                    supplier_ref = validated_data[index].get('supplier_ref')
+                    (ready if supplier_ref is None or supplier_ref in created_by_ref else waiting).append(index)
+
+                generation = []
+                for index in ready:
+                    item = validated_data[index]
+                    entity = NetworkEntity(name=item['name'])
+                    if item.get('supplier_ref') is not None:
+                        supplier = created_by_ref[item['supplier_ref']]
+                        entity.supplier_id = supplier.pk
+                        entity.path = supplier.descendants_path
+                    elif item.get('supplier') is not None:
+                        entity.supplier_id = item['supplier']
+                        entity.path = f"{self.supplier_paths[item['supplier']]}{item['supplier']}/"
+                    entity.level = entity.calculate_level()
+                    entity.ref = item.get('ref')
+                    entities[index] = entity
+                    generation.append(entity)
+                NetworkEntity.objects.bulk_create(generation)
+                for entity in generation:
+                    if entity.ref is not None:
+                        created_by_ref[entity.ref] = entity
+                pending = waiting
+
+            Contact.objects.bulk_create([
+                Contact(network_entity=entity, **item['contact'])
+                for entity, item in zip(entities, validated_data)
+            ])
+            Product.objects.bulk_create([
+                Product(network_entity=entity, **product_data)
+                for entity, item in zip(entities, validated_data)
+                for product_data in item['products']
+            ])
+            added = Counter(
+                (entity.root_id, entity.level, item['contact']['country'])
+                for entity, item in zip(entities, validated_data)
+            )
+            for (root_id, level, country), count in added.items():
+                DebtSummary.objects.add(root_id, level, country, 0, count)
+            invalidate_network_cache()
+
+        return entities
+
+
+class NetworkEntityBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор элемента пакетного создания сущностей NetworkEntity.
+
+    Поставщик задается либо идентификатором существующей сущности в поле 'supplier',
+    либо ссылкой 'supplier_ref' на значение 'ref' другого элемента того же пакета.
+    В ответе для каждого элемента возвращаются его 'ref', идентификатор и уровень созданной сущности.
+    """
+    ref = serializers.CharField(required=False)
+    supplier = serializers.IntegerField(required=False, allow_null=True)
+    supplier_ref = serializers.CharField(required=False)
+    contact = ContactSerializer()
+    products = ProductSerializer(many=True)
+
+    class Meta:
+        model = NetworkEntity
+        fields = ('ref', 'name', 'supplier', 'supplier_ref', 'contact', 'products')
+        list_serializer_class = NetworkEntityBulkListSerializer
+
+    def validate_ref(self, value):
+        """
+        Проверяет, что значение 'ref' уникально в пределах пакета.
+        """
+        if value in self.parent.duplicate_refs:
+            raise serializers.ValidationError(f"Значение ref={value} повторяется в пакете")
+        return value
+
+    def validate_supplier(self, value):
+        """
+        Проверяет, что внешний поставщик существует.
+        """
+        if value is not None and value not in self.parent.supplier_paths:
+            raise serializers.ValidationError(f"Поставщик с id={value} не найден")
+        return value
+
+    def validate(self, attrs):
+        """
+        Проверяет ссылку на поставщика внутри пакета: она должна указывать на элемент пакета и не образовывать цикл.
+        """
+        supplier_ref = attrs.get('supplier_ref')
+        if supplier_ref is None:
+            return attrs
+        if attrs.get('supplier') is not None:
+            raise serializers.ValidationError("Укажите только одно из полей 'supplier' и 'supplier_ref'")
+        if supplier_ref not in self.parent.known_refs:
+            raise serializers.ValidationError({'supplier_ref': f"Элемент с ref={supplier_ref} не найден в пакете"})
+        if attrs.get('ref', supplier_ref) not in self.parent.resolved_refs:
+            raise serializers.ValidationError({'supplier_ref': "Ссылки на поставщиков образуют цикл"})
+        return attrs
+
+    def to_representation(self, instance):
+        """
+        Возвращает результат создания элемента пакета.
+        """
+        return {'ref': instance.ref, 'id': instance.id, 'level': instance.level, 'status': 'created'}
+
+
+class NetworkEntityImportSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для проверки строк импорта сети командой import_network.
+
+    Использует те же правила полей, что и сериализаторы API, но сохраняет исходный идентификатор сущности
+    и принимает поставщика как идентификатор без обращения к базе данных: ссылки на поставщиков
+    разрешаются отдельным проходом после вставки всех сущностей.
+    """
+    id = serializers.IntegerField(min_value=1)
+    supplier = serializers.IntegerField(required=False, allow_null=True)
+    contact = ContactSerializer(allow_null=True)
+    products = ProductSerializer(many=True)
+
+    class Meta:
+        model = NetworkEntity
+        fields = ('id', 'name', 'supplier', 'debt', 'contact', 'products')
+
+    def validate(self, attrs):
+        """
+        Проверяет, что сущность не указана собственным поставщиком.
+        """
+        if attrs.get('supplier') == attrs['id']:
+            raise serializers.ValidationError({'supplier': "Сущность не может быть собственным поставщиком"})
+        return attrs
+
+
+class DebtRollupSerializer(serializers.Serializer):
+    """
+    Сериализатор строки агрегата задолженности из DebtSummary.objects.rollup().
+    Выводятся только поля выбранной группировки: 'level', 'country' или 'root' с 'root_name'.
+    """
+    level = serializers.IntegerField(read_only=True)
+    country = serializers.CharField(read_only=True)
+    root = serializers.IntegerField(source='root_id', read_only=True)
+    root_name = serializers.CharField(source='root__name', read_only=True)
+    total_debt = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
+    entity_count = serializers.IntegerField(read_only=True)
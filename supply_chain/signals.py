@@ -0,0 +1,72 @@
+from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, StrIndex, Substr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from supply_chain.caching import invalidate_network_cache
+from supply_chain.models import Contact, DebtSummary, NetworkEntity, Product, path_depth
+
+
+@receiver(post_delete, sender=NetworkEntity)
+def detach_descendants(sender, instance, **kwargs):
+    """
+    Обновляет пути и уровни потомков удаленной сущности.
+    При удалении поставщика Django проставляет его покупателям supplier=NULL без вызова save(),
+    поэтому из путей всех потомков одним запросом вырезается часть до удаленной сущности включительно:
+    ее непосредственные покупатели становятся корнями, а их потомки сохраняют свою часть иерархии.
+    Поиск идет по вхождению идентификатора, а не по префиксу, чтобы пути оставались корректными
+    и при удалении нескольких связанных сущностей одним запросом.
+    Сводка задолженности пересчитывается для прежнего корня удаленной сущности, текущих корней ее потомков
+    и покупателей, ставших новыми корнями.
+    """
+    marker = f'/{instance.pk}/'
+    descendants = NetworkEntity.objects.filter(path__contains=marker)
+    root_ids = descendants.root_ids() | {instance.root_id}
+    root_ids |= set(descendants.filter(path__endswith=marker).values_list('pk', flat=True))
+    new_path = Concat(Value('/'), Substr('path', StrIndex('path', Value(marker)) + len(marker)))
+    descendants.update(path=new_path, level=path_depth(new_path))
+    DebtSummary.objects.refresh_roots(root_ids)
+
+
+@receiver(post_save, sender=NetworkEntity)
+@receiver(post_delete, sender=NetworkEntity)
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+@receiver(post_save, sender=Product)
+def invalidate_cached_reads(sender, **kwargs):
+    """
+    Сбрасывает закэшированные ответы по сущностям сети при изменении сущности, контакта или продукта.
+    На удаление продуктов обработчик намеренно не подписан: любой обработчик post_delete заставляет Django
+    удалять продукты поштучно вместо одного DELETE. Продукты удаляются вместе с сущностью или при ее сохранении
+    (синхронизация в сериализаторе, встроенные формы админ-панели), и в этих случаях кэш сбрасывается
+    сохранением сущности — в том числе повторно после фиксации транзакции.
+    """
+    invalidate_network_cache()
+
+
+@receiver(post_save, sender=Contact)
+def track_contact_country(sender, instance, created, **kwargs):
+    """
+    Переносит вклад сущности в сводке задолженности на страну сохраненного контакта.
+    Если прежняя страна неизвестна (контакт не загружался из базы данных), пересчитывается поддерево корня.
+    """
+    old_country = '' if created else getattr(instance, '_loaded_country', None)
+    entity = instance.network_entity
+    if old_country is None:
+        DebtSummary.objects.refresh_roots({entity.root_id})
+    else:
+        DebtSummary.objects.move_country(entity, old_country, instance.country)
+    instance._loaded_country = instance.country
+
+
+@receiver(post_delete, sender=Contact)
+def untrack_contact_country(sender, instance, origin=None, **kwargs):
+    """
+    Переносит вклад сущности в сводке задолженности на пустую страну при удалении контакта.
+    При удалении самой сущности сводку пересчитывает detach_descendants.
+    """
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin_model is NetworkEntity:
+        return
+    DebtSummary.objects.move_country(instance.network_entity, instance.country, '')
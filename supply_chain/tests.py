@@ -1,8 +1,56 @@
-from django.test import TestCase
-from .models import NetworkEntity, Contact, Product
+import csv
+import gzip
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Max, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.renderers import JSONRenderer
+from .models import NetworkEntity, Contact, Product, DebtSummary, DebtClearingJob
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.query_budget import QueryBudgetExceeded, QueryBudgetTestMixin, fingerprint
+from user.models import User
+from .admin import CityListFilter
+from .caching import invalidate_network_cache
+from .fast_serializers import compile_serializer
+from .paginators import EstimatedCountPaginator
+from .renderers import FastJSONRenderer
+from .serializers import NetworkEntityCreateUpdateSerializer, NetworkEntityListSerializer
+from .views import NetworkEntityViewSet
+
+benchmark_logger = logging.getLogger('supply_chain.benchmark')
+
 
-from .serializers import NetworkEntityCreateUpdateSerializer
+def run_admin_action(client, action, queryset):
+    """
+    Выполняет действие админ-панели над выбранными сущностями от имени суперпользователя.
+    """
+    admin_user, _ = User.objects.get_or_create(email='admin@example.com',
+                                               defaults={'is_staff': True, 'is_superuser': True})
+    client.force_login(admin_user)
+    return client.post('/admin/supply_chain/networkentity/', {
+        'action': action,
+        '_selected_action': list(queryset.values_list('pk', flat=True)),
+    })
 
 
 class NetworkEntityModelTest(TestCase):
@@ -172,3 +220,1806 @@ class NetworkEntitySerializerTest(APITestCase):
         is_valid = serializer.is_valid()
         self.assertFalse(is_valid)
         self.assertIn('supplier', serializer.errors)
+
+
+class NetworkEntityViewSetQueryCountTest(QueryBudgetTestMixin, APITestCase):
+    """
+    Набор тестов на количество SQL-запросов при чтении сущностей через NetworkEntityViewSet.
+
+    Тесты проверяют, что число запросов не зависит от количества возвращаемых сущностей.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='reader@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+
+    def create_entities(self, count, supplier=None):
+        """
+        Создает указанное количество сущностей с контактом и двумя продуктами у каждой.
+        """
+        for index in range(count):
+            entity = NetworkEntity.objects.create(name=f"Entity {index}", supplier=supplier)
+            Contact.objects.create(network_entity=entity, email=f"entity{index}@example.com", country="Country",
+                                   city="City", street="Street", house_number=str(index))
+            Product.objects.create(network_entity=entity, name="Product A", model="Model A", release_date="2022-01-01")
+            Product.objects.create(network_entity=entity, name="Product B", model="Model B", release_date="2023-01-01")
+
+    def test_list_query_count_is_constant(self):
+        """
+        Тест на постоянное число запросов при получении списка сущностей.
+        Проверяет, что список из одной и из десяти сущностей с поставщиком, контактом и продуктами
+        загружается одинаковым числом запросов.
+        """
+        supplier = NetworkEntity.objects.create(name="Supplier")
+        self.create_entities(1, supplier=supplier)
+        with self.assertNumQueries(2):
+            response = self.client.get('/supply_chain/network_entity/')
+        self.assertEqual(response.status_code, 200)
+
+        self.create_entities(9, supplier=supplier)
+        with self.assertNumQueries(2):
+            response = self.client.get('/supply_chain/network_entity/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_includes_contact_and_products(self):
+        """
+        Тест на получение одной сущности вместе с контактом и продуктами за фиксированное число запросов.
+        """
+        self.create_entities(1)
+        entity = NetworkEntity.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/supply_chain/network_entity/{entity.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['contact']['email'], "entity0@example.com")
+        self.assertEqual(len(response.data['products']), 2)
+
+    def test_sparse_fields_skip_joins_and_prefetch(self):
+        """
+        Тест на параметр 'fields': выводятся только перечисленные поля, идентификатор и время создания,
+        а список читается одним запросом без JOIN и подгрузки продуктов.
+        """
+        self.create_entities(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/supply_chain/network_entity/', {'fields': 'name,level'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'creation_time', 'name', 'level'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertNotIn('"debt"', queries[0]['sql'])
+
+    def test_expand_loads_only_requested_relations(self):
+        """
+        Тест на параметр 'expand': вложенный контакт выводится и присоединяется, продукты не загружаются.
+        """
+        self.create_entities(2)
+        with self.assertNumQueries(1):
+            response = self.client.get('/supply_chain/network_entity/', {'fields': 'name', 'expand': 'contact'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'creation_time', 'name', 'contact'})
+        self.assertEqual(response.data['results'][0]['contact']['city'], "City")
+
+        entity = NetworkEntity.objects.first()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/supply_chain/network_entity/{entity.id}/', {'expand': 'products'})
+        self.assertIn('debt', response.data)
+        self.assertNotIn('contact', response.data)
+        self.assertEqual(len(response.data['products']), 2)
+
+    def test_unknown_field_is_rejected(self):
+        """
+        Тест на отказ при неизвестном поле в 'fields' или 'expand'.
+        """
+        response = self.client.get('/supply_chain/network_entity/', {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+        response = self.client.get('/supply_chain/network_entity/', {'expand': 'supplier'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+
+
+class NetworkEntityPaginationTest(APITestCase):
+    """
+    Набор тестов для курсорной пагинации списка сущностей NetworkEntity.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='pager@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        for index in range(5):
+            NetworkEntity.objects.create(name=f"Entity {index}")
+
+    def test_pages_follow_creation_order(self):
+        """
+        Тест на обход всех страниц по курсорам.
+        Проверяет, что при размере страницы 2 все сущности возвращаются ровно один раз и в порядке создания.
+        """
+        names = []
+        url = '/supply_chain/network_entity/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            names.extend(item['name'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(names, [f"Entity {index}" for index in range(5)])
+
+    def test_deep_page_query_count(self):
+        """
+        Тест на то, что получение следующей страницы требует столько же запросов, сколько и первой.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get('/supply_chain/network_entity/?page_size=2')
+        with self.assertNumQueries(2):
+            self.client.get(response.data['next'])
+
+
+class NetworkEntityHierarchyTest(APITestCase):
+    """
+    Набор тестов для материализованного пути иерархии NetworkEntity и связанных с ним эндпоинтов.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='tree@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.factory = NetworkEntity.objects.create(name="Factory")
+        self.retail = NetworkEntity.objects.create(name="Retail", supplier=self.factory)
+        self.trader = NetworkEntity.objects.create(name="Trader", supplier=self.retail)
+        self.reseller = NetworkEntity.objects.create(name="Reseller", supplier=self.trader)
+
+    def test_path_and_level_of_deep_chain(self):
+        """
+        Тест на вычисление пути и уровня для цепочки глубже трех звеньев.
+        """
+        self.assertEqual(self.factory.path, '/')
+        self.assertEqual(self.reseller.path, f'/{self.factory.id}/{self.retail.id}/{self.trader.id}/')
+        self.assertEqual(self.reseller.level, 3)
+
+    def test_supplier_reassignment_updates_descendant_paths(self):
+        """
+        Тест на обновление путей потомков при смене поставщика у сущности в середине цепочки.
+        """
+        other_factory = NetworkEntity.objects.create(name="Other Factory")
+        self.trader.supplier = other_factory
+        self.trader.save()
+        self.reseller.refresh_from_db()
+        self.assertEqual(self.reseller.path, f'/{other_factory.id}/{self.trader.id}/')
+
+    def test_supplier_deletion_detaches_descendants(self):
+        """
+        Тест на обновление путей потомков при удалении их поставщика.
+        """
+        self.retail.delete()
+        self.trader.refresh_from_db()
+        self.reseller.refresh_from_db()
+        self.assertIsNone(self.trader.supplier)
+        self.assertEqual(self.trader.path, '/')
+        self.assertEqual(self.reseller.path, f'/{self.trader.id}/')
+
+    def test_cycle_is_rejected(self):
+        """
+        Тест на запрет назначения потомка поставщиком сущности.
+        """
+        self.assertFalse(self.retail.is_valid_supplier(self.reseller))
+        self.assertFalse(self.retail.is_valid_supplier(self.retail))
+        self.assertTrue(self.reseller.is_valid_supplier(self.factory))
+
+    def test_ancestors_endpoint(self):
+        """
+        Тест на получение цепочки поставщиков от завода.
+        """
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/supply_chain/network_entity/{self.reseller.id}/ancestors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data], ["Factory", "Retail", "Trader"])
+
+    def test_descendants_endpoint(self):
+        """
+        Тест на получение всех потомков сущности.
+        """
+        response = self.client.get(f'/supply_chain/network_entity/{self.retail.id}/descendants/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data['results']], ["Trader", "Reseller"])
+
+    def test_subtree_size_endpoint(self):
+        """
+        Тест на подсчет размера поддерева сущности.
+        """
+        response = self.client.get(f'/supply_chain/network_entity/{self.factory.id}/subtree_size/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['subtree_size'], 4)
+
+
+class NetworkEntityLevelCascadeTest(TestCase):
+    """
+    Набор тестов для пересчета уровней потомков при изменении иерархии.
+    """
+
+    def setUp(self):
+        self.factory = NetworkEntity.objects.create(name="Factory")
+        self.retail = NetworkEntity.objects.create(name="Retail", supplier=self.factory)
+        self.trader = NetworkEntity.objects.create(name="Trader", supplier=self.retail)
+
+    def test_reassignment_updates_descendant_levels(self):
+        """
+        Тест на пересчет уровней потомков, когда сущность становится корнем.
+        """
+        self.retail.supplier = None
+        self.retail.save()
+        self.trader.refresh_from_db()
+        self.assertEqual(self.retail.level, 0)
+        self.assertEqual(self.trader.level, 1)
+
+    def test_supplier_deletion_updates_descendant_levels(self):
+        """
+        Тест на пересчет уровней потомков после удаления поставщика, при котором save() у них не вызывается.
+        """
+        self.factory.delete()
+        self.retail.refresh_from_db()
+        self.trader.refresh_from_db()
+        self.assertEqual(self.retail.level, 0)
+        self.assertEqual(self.trader.level, 1)
+
+    def test_rebuild_hierarchy_command(self):
+        """
+        Тест на восстановление путей и уровней, испорченных изменениями в обход save().
+        """
+        NetworkEntity.objects.update(path='/', level=0)
+        call_command('rebuild_hierarchy', batch_size=1, stdout=StringIO())
+        self.trader.refresh_from_db()
+        self.assertEqual(self.trader.path, f'/{self.factory.id}/{self.retail.id}/')
+        self.assertEqual(self.trader.level, 2)
+
+
+class NetworkEntityBulkCreateTest(APITestCase):
+    """
+    Набор тестов для пакетного создания сущностей через эндпоинт bulk.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='bulk@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.factory = NetworkEntity.objects.create(name="Factory")
+
+    def make_item(self, ref, **extra):
+        """
+        Формирует данные одного элемента пакета.
+        """
+        item = {
+            "ref": ref,
+            "name": f"Entity {ref}",
+            "contact": {
+                "email": f"{ref}@example.com",
+                "country": "Test Country",
+                "city": "Test City",
+                "street": "Test Street",
+                "house_number": "1"
+            },
+            "products": [
+                {"name": "Product 1", "model": "Model 1", "release_date": "2022-01-01"}
+            ]
+        }
+        item.update(extra)
+        return item
+
+    def test_bulk_create_with_batch_references(self):
+        """
+        Тест на создание цепочки сущностей, ссылающихся друг на друга внутри пакета и на существующего поставщика.
+        """
+        data = [
+            self.make_item("trader", supplier_ref="retail"),
+            self.make_item("retail", supplier=self.factory.id),
+            self.make_item("standalone"),
+        ]
+        response = self.client.post('/supply_chain/network_entity/bulk/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['ref'] for item in response.data], ["trader", "retail", "standalone"])
+        self.assertEqual([item['level'] for item in response.data], [2, 1, 0])
+
+        trader = NetworkEntity.objects.get(id=response.data[0]['id'])
+        self.assertEqual(trader.path, f'/{self.factory.id}/{response.data[1]["id"]}/')
+        self.assertEqual(trader.contact.email, "trader@example.com")
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_bulk_create_query_count_is_constant(self):
+        """
+        Тест на то, что количество запросов зависит от числа поколений в пакете, а не от числа сущностей.
+        """
+        data = [self.make_item(f"outlet{index}", supplier=self.factory.id) for index in range(50)]
+        # Загрузка поставщиков, транзакция, вставка сущностей, контактов и продуктов
+        # и одна новая строка сводки задолженности (UPDATE, точка сохранения, INSERT).
+        with self.assertNumQueries(10):
+            response = self.client.post('/supply_chain/network_entity/bulk/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(NetworkEntity.objects.filter(supplier=self.factory).count(), 50)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """
+        Тест на возврат ошибок по каждому элементу и отсутствие частичной записи.
+        """
+        data = [
+            self.make_item("valid"),
+            self.make_item("unknown", supplier_ref="missing"),
+            self.make_item("a", supplier_ref="b"),
+            self.make_item("b", supplier_ref="a"),
+            self.make_item("orphan", supplier=999999),
+        ]
+        response = self.client.post('/supply_chain/network_entity/bulk/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('supplier_ref', response.data[1])
+        self.assertIn('supplier_ref', response.data[2])
+        self.assertIn('supplier_ref', response.data[3])
+        self.assertIn('supplier', response.data[4])
+        self.assertEqual(NetworkEntity.objects.count(), 1)
+
+    def test_bulk_create_rejects_non_scalar_refs(self):
+        """
+        Тест на ответ 400, а не ошибку сервера, если 'ref' или 'supplier_ref' не являются строкой или числом.
+        Числовые ссылки приводятся к строкам так же, как поле 'ref'.
+        """
+        data = [
+            self.make_item(["x"]),
+            self.make_item("child", supplier_ref={"ref": "parent"}),
+            self.make_item(1),
+            self.make_item("numbered", supplier_ref=1),
+        ]
+        response = self.client.post('/supply_chain/network_entity/bulk/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ref', response.data[0])
+        self.assertIn('supplier_ref', response.data[1])
+        self.assertEqual(response.data[2], {})
+        self.assertEqual(response.data[3], {})
+        self.assertEqual(NetworkEntity.objects.count(), 1)
+
+
+class NetworkEntityProductSyncTest(TestCase):
+    """
+    Набор тестов для синхронизации продуктов при обновлении сущности через NetworkEntityCreateUpdateSerializer.
+    """
+
+    def setUp(self):
+        self.entity = NetworkEntity.objects.create(name="Entity")
+        Contact.objects.create(network_entity=self.entity, email="entity@example.com", country="Country",
+                               city="City", street="Street", house_number="1")
+
+    def make_update_data(self, products):
+        """
+        Формирует данные для обновления сущности с указанным списком продуктов.
+        """
+        return {
+            "name": "Entity",
+            "supplier": None,
+            "contact": {
+                "email": "entity@example.com",
+                "country": "Country",
+                "city": "City",
+                "street": "Street",
+                "house_number": "1"
+            },
+            "products": products
+        }
+
+    def update_products(self, products):
+        """
+        Обновляет сущность с указанным списком продуктов и возвращает количество выполненных запросов.
+        """
+        serializer = NetworkEntityCreateUpdateSerializer(instance=self.entity, data=self.make_update_data(products))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+        return len(queries)
+
+    def test_diff_inserts_updates_and_deletes(self):
+        """
+        Тест на обновление, создание и удаление продуктов по разнице с текущим набором.
+        """
+        kept = Product.objects.create(network_entity=self.entity, name="Kept", model="K", release_date="2022-01-01")
+        Product.objects.create(network_entity=self.entity, name="Removed", model="R", release_date="2022-01-01")
+
+        self.update_products([
+            {"id": kept.id, "name": "Renamed", "model": "K", "release_date": "2022-01-01"},
+            {"name": "New", "model": "N", "release_date": "2023-01-01"},
+        ])
+
+        self.assertEqual(sorted(self.entity.products.values_list('name', flat=True)), ["New", "Renamed"])
+        self.assertTrue(Product.objects.filter(id=kept.id, name="Renamed").exists())
+
+    def test_foreign_product_id_is_rejected(self):
+        """
+        Тест на отказ обновлять продукт, принадлежащий другой сущности.
+        """
+        other = NetworkEntity.objects.create(name="Other")
+        foreign = Product.objects.create(network_entity=other, name="Foreign", model="F", release_date="2022-01-01")
+        serializer = NetworkEntityCreateUpdateSerializer(instance=self.entity, data=self.make_update_data([
+            {"id": foreign.id, "name": "Hijacked", "model": "F", "release_date": "2022-01-01"},
+        ]))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('products', serializer.errors)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.name, "Foreign")
+
+    def test_duplicate_product_id_is_rejected(self):
+        """
+        Тест на отказ принимать один и тот же продукт несколько раз: повтор не должен создавать новый продукт.
+        """
+        product = Product.objects.create(network_entity=self.entity, name="Phone", model="P", release_date="2022-01-01")
+        products = [
+            {"id": product.id, "name": "First", "model": "P", "release_date": "2022-01-01"},
+            {"id": product.id, "name": "Second", "model": "P", "release_date": "2022-01-01"},
+        ]
+        serializer = NetworkEntityCreateUpdateSerializer(instance=self.entity, data=self.make_update_data(products))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('products', serializer.errors)
+        self.assertEqual(list(self.entity.products.values_list('name', flat=True)), ["Phone"])
+
+    def test_validated_data_is_not_mutated(self):
+        """
+        Тест на то, что сохранение не удаляет 'id' продуктов из validated_data.
+        """
+        product = Product.objects.create(network_entity=self.entity, name="Phone", model="P", release_date="2022-01-01")
+        serializer = NetworkEntityCreateUpdateSerializer(instance=self.entity, data=self.make_update_data([
+            {"id": product.id, "name": "Renamed", "model": "P", "release_date": "2022-01-01"},
+        ]))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(serializer.validated_data['products'][0]['id'], product.id)
+
+    def test_query_count_does_not_depend_on_product_count(self):
+        """
+        Бенчмарк количества запросов при синхронизации 1, 100 и 1000 продуктов.
+        Каждый размер проверяется на наборе, где половина продуктов обновляется, половина создается заново,
+        а прежние продукты, не попавшие в список, удаляются.
+        """
+        query_counts = {}
+        for size in (1, 100, 1000):
+            Product.objects.filter(network_entity=self.entity).delete()
+            Product.objects.bulk_create([
+                Product(network_entity=self.entity, name=f"Old {index}", model="M", release_date="2022-01-01")
+                for index in range(size + 1)
+            ])
+            existing_ids = list(self.entity.products.values_list('id', flat=True))
+            kept_ids = existing_ids[:max(size // 2, 1)]
+            products = [
+                {"id": product_id, "name": "Updated", "model": "M", "release_date": "2022-01-01"}
+                for product_id in kept_ids
+            ] + [
+                {"name": f"New {index}", "model": "M", "release_date": "2023-01-01"}
+                for index in range(size - len(kept_ids) + 1)
+            ]
+            query_counts[size] = self.update_products(products)
+        self.assertEqual(len(set(query_counts.values())), 1, query_counts)
+
+
+class NetworkExportTest(APITestCase):
+    """
+    Набор тестов для потоковой выгрузки сети через эндпоинт export и команду export_network.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='export@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.factory = NetworkEntity.objects.create(name="Factory")
+        Contact.objects.create(network_entity=self.factory, email="factory@example.com", country="Germany",
+                               city="Berlin", street="Main", house_number="1")
+        Product.objects.create(network_entity=self.factory, name="Phone", model="X", release_date="2022-01-01")
+        retail = NetworkEntity.objects.create(name="Retail", supplier=self.factory)
+        Contact.objects.create(network_entity=retail, email="retail@example.com", country="France",
+                               city="Paris", street="Rue", house_number="2")
+
+    def test_export_ndjson(self):
+        """
+        Тест на потоковую выгрузку в формате NDJSON с учетом фильтра по стране.
+        """
+        response = self.client.get('/supply_chain/network_entity/export/?contact__country=Germany')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['name'], "Factory")
+        self.assertEqual(rows[0]['contact']['city'], "Berlin")
+        self.assertEqual(rows[0]['products'][0]['model'], "X")
+
+    def test_export_csv(self):
+        """
+        Тест на потоковую выгрузку в формате CSV.
+        """
+        response = self.client.get('/supply_chain/network_entity/export/?output=csv')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['name'] for row in rows], ["Factory", "Retail"])
+        self.assertEqual(rows[1]['supplier'], str(self.factory.id))
+        self.assertEqual(rows[1]['contact_country'], "France")
+
+    def test_export_network_command(self):
+        """
+        Тест на выгрузку сети командой export_network.
+        """
+        stdout = StringIO()
+        call_command('export_network', stdout=stdout)
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ["Factory", "Retail"])
+
+
+class NetworkImportTest(TestCase):
+    """
+    Набор тестов для потокового импорта сети командой import_network.
+    """
+
+    def write_rows(self, rows):
+        """
+        Записывает строки во временный NDJSON-файл и возвращает путь к нему.
+        """
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False, encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps(row) + '\n')
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def make_row(self, entity_id, supplier=None):
+        """
+        Формирует строку импорта в формате команды export_network.
+        """
+        return {
+            "id": entity_id,
+            "name": f"Entity {entity_id}",
+            "supplier": supplier,
+            "debt": "10.50",
+            "contact": {
+                "email": f"entity{entity_id}@example.com",
+                "country": "Country",
+                "city": "City",
+                "street": "Street",
+                "house_number": "1"
+            },
+            "products": [{"name": "Product", "model": "Model", "release_date": "2022-01-01"}]
+        }
+
+    def test_import_resolves_suppliers_and_levels(self):
+        """
+        Тест на импорт сущностей, поставщики которых встречаются в файле позже них самих.
+        """
+        path = self.write_rows([self.make_row(30, supplier=20), self.make_row(20, supplier=10), self.make_row(10)])
+        call_command('import_network', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+
+        entity = NetworkEntity.objects.get(id=30)
+        self.assertEqual(entity.supplier_id, 20)
+        self.assertEqual(entity.path, '/10/20/')
+        self.assertEqual(entity.level, 2)
+        self.assertEqual(entity.contact.email, "entity30@example.com")
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertGreater(NetworkEntity.objects.create(name="After import").id, 30)
+
+    def test_import_is_resumable(self):
+        """
+        Тест на повторный запуск импорта без дублирования уже записанных данных.
+        Некорректные строки пропускаются с сообщением об ошибке.
+        """
+        rows = [self.make_row(1), self.make_row(2, supplier=1), {"id": 3, "name": ""}]
+        path = self.write_rows(rows)
+        stderr = StringIO()
+        call_command('import_network', path, stdout=StringIO(), stderr=stderr)
+        call_command('import_network', path, stdout=StringIO(), stderr=StringIO())
+
+        self.assertIn('Запись 3', stderr.getvalue())
+        self.assertEqual(NetworkEntity.objects.count(), 2)
+        self.assertEqual(Contact.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_import_does_not_relink_skipped_rows(self):
+        """
+        Тест на то, что второй проход не перезаписывает уже проставленного поставщика
+        и не трогает записи, не прошедшие проверку.
+        """
+        supplier = NetworkEntity.objects.create(id=7, name="Supplier")
+        existing = NetworkEntity.objects.create(id=5, name="Existing", supplier=supplier)
+        path = self.write_rows([self.make_row(1), self.make_row(5, supplier=1), {"id": 6, "name": "", "supplier": 1}])
+        call_command('import_network', path, stdout=StringIO(), stderr=StringIO())
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.supplier_id, 7)
+        self.assertFalse(NetworkEntity.objects.filter(id=6).exists())
+
+    def test_import_resumes_after_failure(self):
+        """
+        Тест на повторный запуск после сбоя, случившегося после записи первой пачки:
+        сущности этой пачки связываются с поставщиками при повторном запуске.
+        """
+        path = self.write_rows([self.make_row(2, supplier=1), self.make_row(3, supplier=2), self.make_row(1)])
+        bulk_create = Product.objects.bulk_create
+        batches = []
+
+        def fail_after_first_batch(objs, *args, **kwargs):
+            batches.append(objs)
+            if len(batches) > 1:
+                raise RuntimeError('Сбой импорта')
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Product.objects, 'bulk_create', side_effect=fail_after_first_batch), \
+                self.assertRaises(RuntimeError):
+            call_command('import_network', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(set(NetworkEntity.objects.values_list('id', flat=True)), {2, 3})
+
+        call_command('import_network', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(dict(NetworkEntity.objects.values_list('id', 'supplier_id')), {1: None, 2: 1, 3: 2})
+        self.assertEqual(NetworkEntity.objects.get(id=3).path, '/1/2/')
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_import_rejects_cycles_through_stored_suppliers(self):
+        """
+        Тест на отказ проставлять ссылку, которая замыкает цикл через поставщика, записанного прежним запуском.
+        """
+        first = NetworkEntity.objects.create(id=1, name="Entity 1")
+        NetworkEntity.objects.create(id=2, name="Entity 2", supplier=first)
+        path = self.write_rows([self.make_row(1, supplier=2), self.make_row(2, supplier=1)])
+        stderr = StringIO()
+        call_command('import_network', path, stdout=StringIO(), stderr=stderr)
+
+        self.assertEqual(dict(NetworkEntity.objects.values_list('id', 'supplier_id')), {1: None, 2: 1})
+        self.assertIn('цикл', stderr.getvalue())
+
+    def test_import_rejects_supplier_cycles(self):
+        """
+        Тест на отказ проставлять ссылки, образующие цикл поставщиков.
+        """
+        path = self.write_rows([
+            self.make_row(1, supplier=2), self.make_row(2, supplier=3), self.make_row(3, supplier=1),
+            self.make_row(4, supplier=1),
+        ])
+        stderr = StringIO()
+        call_command('import_network', path, batch_size=1, stdout=StringIO(), stderr=stderr)
+
+        suppliers = dict(NetworkEntity.objects.values_list('id', 'supplier_id'))
+        self.assertEqual(suppliers, {1: None, 2: None, 3: None, 4: 1})
+        self.assertIn('цикл', stderr.getvalue())
+        self.assertEqual(NetworkEntity.objects.get(id=4).path, '/1/')
+
+
+class NetworkEntityQueryPlanTest(TestCase):
+    """
+    Набор тестов на планы основных запросов чтения: ни один из них не должен сводиться к последовательному
+    сканированию таблиц.
+
+    Последовательное сканирование отключается на время теста, поэтому в плане оно остается только там,
+    где у планировщика нет подходящего индекса.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        factories = NetworkEntity.objects.bulk_create([
+            NetworkEntity(name=f"Factory {index}", level=0) for index in range(10)
+        ])
+        outlets = NetworkEntity.objects.bulk_create([
+            NetworkEntity(name=f"Outlet {index}", supplier=factories[index % 10],
+                          path=f'/{factories[index % 10].id}/', level=1)
+            for index in range(500)
+        ])
+        Contact.objects.bulk_create([
+            Contact(network_entity=entity, email=f"entity{entity.id}@example.com", country=f"Country {entity.id % 20}",
+                    city=f"City {entity.id % 50}", street="Street", house_number="1")
+            for entity in factories + outlets
+        ])
+        Product.objects.bulk_create([
+            Product(network_entity=entity, name="Product", model="Model", release_date="2022-01-01")
+            for entity in outlets
+        ])
+        cls.factory = factories[0]
+
+    def assertNoSeqScan(self, queryset):
+        """
+        Проверяет, что в плане выполнения запроса нет узлов последовательного сканирования.
+
+        Аргументы:
+        queryset: Проверяемый QuerySet.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = json.loads(queryset.explain(format='json'))
+        nodes, seq_scans = [plan[0]['Plan']], []
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan':
+                seq_scans.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        self.assertEqual(seq_scans, [], json.dumps(plan, indent=2))
+
+    def test_list_filtered_by_country(self):
+        """
+        Тест на план страницы списка, отфильтрованного по стране контакта.
+        """
+        self.assertNoSeqScan(
+            NetworkEntity.objects.for_read().filter(contact__country="Country 3").order_by('creation_time', 'id')[:51]
+        )
+
+    def test_supplier_search_by_name_prefix(self):
+        """
+        Тест на план поиска поставщика по префиксу названия в автодополнении админ-панели.
+        """
+        self.assertNoSeqScan(NetworkEntity.objects.filter(name__istartswith="outlet 1").values_list('pk', 'name'))
+
+    def test_search_matches(self):
+        """
+        Тест на план поиска по названию сущности, продуктам и адресу: каждая выборка использует индексы.
+        """
+        self.assertNoSeqScan(NetworkEntity.objects.search_matches("Outlet 12"))
+
+    def test_filter_by_city(self):
+        """
+        Тест на план фильтра по городу контакта, который использует админ-панель.
+        """
+        self.assertNoSeqScan(NetworkEntity.objects.filter(contact__city="City 7"))
+
+    def test_filter_by_level_and_supplier(self):
+        """
+        Тест на планы фильтров по уровню и по поставщику.
+        """
+        self.assertNoSeqScan(NetworkEntity.objects.filter(level=0))
+        self.assertNoSeqScan(NetworkEntity.objects.filter(supplier=self.factory))
+
+    def test_descendants_and_products(self):
+        """
+        Тест на планы выборки потомков по префиксу пути и подгрузки продуктов страницы.
+        """
+        self.assertNoSeqScan(NetworkEntity.objects.descendants_of(self.factory))
+        self.assertNoSeqScan(Product.objects.filter(network_entity__in=[self.factory.id]))
+
+
+class NetworkEntityResponseCacheTest(APITestCase):
+    """
+    Набор тестов для кэширования ответов list/retrieve и их инвалидации.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='cache@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.entity = NetworkEntity.objects.create(name="Entity")
+        Contact.objects.create(network_entity=self.entity, email="entity@example.com", country="Germany",
+                               city="Berlin", street="Main", house_number="1")
+
+    def test_repeated_list_is_served_from_cache(self):
+        """
+        Тест на повторный запрос списка без обращения к базе данных и на раздельный кэш для разных фильтров.
+        """
+        self.client.get('/supply_chain/network_entity/?contact__country=Germany')
+        with self.assertNumQueries(0):
+            response = self.client.get('/supply_chain/network_entity/?contact__country=Germany')
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.get('/supply_chain/network_entity/?contact__country=France')
+        self.assertEqual(len(response.data['results']), 0)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_cache_is_separate_per_host_and_scheme(self):
+        """
+        Тест на раздельный кэш для разных хостов и схем: ссылки пагинации в ответе абсолютные.
+        """
+        NetworkEntity.objects.create(name="Second")
+        url = '/supply_chain/network_entity/?page_size=1'
+        self.client.get(url)
+        response = self.client.get(url, HTTP_HOST='api.example.com')
+        self.assertTrue(response.data['next'].startswith('http://api.example.com/'))
+        response = self.client.get(url, HTTP_HOST='api.example.com', secure=True)
+        self.assertTrue(response.data['next'].startswith('https://api.example.com/'))
+
+    def test_cache_timeout_is_read_per_request(self):
+        """
+        Тест на отключение кэша настройкой NETWORK_ENTITY_CACHE_TIMEOUT, измененной после импорта представлений.
+        """
+        url = f'/supply_chain/network_entity/{self.entity.id}/'
+        self.client.get(url)
+        with override_settings(NETWORK_ENTITY_CACHE_TIMEOUT=0):
+            NetworkEntity.objects.filter(id=self.entity.id).update(name="Renamed")
+            response = self.client.get(url)
+        self.assertEqual(response.data['name'], "Renamed")
+        self.assertNotIn('ETag', response)
+
+    def test_product_change_invalidates_cache(self):
+        """
+        Тест на сброс кэша при изменении продукта сущности.
+        """
+        self.client.get(f'/supply_chain/network_entity/{self.entity.id}/')
+        Product.objects.create(network_entity=self.entity, name="Phone", model="X", release_date="2022-01-01")
+        response = self.client.get(f'/supply_chain/network_entity/{self.entity.id}/')
+        self.assertEqual(len(response.data['products']), 1)
+
+    def test_bulk_update_invalidates_cache(self):
+        """
+        Тест на сброс кэша действием админ-панели clear_debt, которое не отправляет сигналы.
+        """
+        NetworkEntity.objects.filter(id=self.entity.id).update(debt=100)
+        invalidate_network_cache()
+        self.client.get(f'/supply_chain/network_entity/{self.entity.id}/')
+        run_admin_action(self.client, 'clear_debt', NetworkEntity.objects.all())
+        call_command('clear_debt', stdout=StringIO())
+        response = self.client.get(f'/supply_chain/network_entity/{self.entity.id}/')
+        self.assertEqual(response.data['debt'], '0.00')
+
+    def test_etag_not_modified(self):
+        """
+        Тест на ответ 304 при совпадении If-None-Match с ETag и на новый ETag после изменения данных.
+        """
+        response = self.client.get('/supply_chain/network_entity/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/supply_chain/network_entity/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.entity.name = "Renamed"
+        self.entity.save()
+        response = self.client.get('/supply_chain/network_entity/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class AsyncNetworkEntityViewTest(TestCase):
+    """
+    Набор тестов для асинхронных представлений списка и детальной информации о сущностях.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='async@example.com', is_active=True)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.entities = []
+        for index in range(3):
+            entity = NetworkEntity.objects.create(name=f"Entity {index}")
+            Contact.objects.create(network_entity=entity, email=f"entity{index}@example.com", country="Germany",
+                                   city="Berlin", street="Main", house_number=str(index))
+            Product.objects.create(network_entity=entity, name="Phone", model="X", release_date="2022-01-01")
+            self.entities.append(entity)
+
+    async def test_list_pages_with_cursor(self):
+        """
+        Тест на постраничное получение списка через асинхронное представление.
+        """
+        names = []
+        url = '/supply_chain/async/network_entity/?page_size=2&contact__country=Germany'
+        while url:
+            response = await self.async_client.get(url, AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            names.extend(item['name'] for item in data['results'])
+            url = data['next']
+        self.assertEqual(names, ["Entity 0", "Entity 1", "Entity 2"])
+
+    async def test_invalid_page_size_falls_back_to_default(self):
+        """
+        Тест на размер страницы по умолчанию при нулевом, отрицательном и нечисловом page_size.
+        """
+        for page_size in ('0', '-1', 'abc', ''):
+            response = await self.async_client.get(f'/supply_chain/async/network_entity/?page_size={page_size}',
+                                                   AUTHORIZATION=f'Bearer {self.token}')
+            self.assertEqual(response.status_code, 200, page_size)
+            self.assertEqual(len(response.json()['results']), 3, page_size)
+
+    async def test_detail_includes_contact_and_products(self):
+        """
+        Тест на получение сущности с контактом и продуктами через асинхронное представление.
+        """
+        entity = self.entities[0]
+        response = await self.async_client.get(f'/supply_chain/async/network_entity/{entity.id}/',
+                                               AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['products'][0]['model'], "X")
+        self.assertEqual(response.json()['contact']['city'], "Berlin")
+
+    async def test_cursor_fields_and_etag_match_sync_endpoint(self):
+        """
+        Тест на то, что курсор асинхронного списка принимается синхронным эндпоинтом, а параметр 'fields'
+        и ETag обрабатываются так же, как в нем.
+        """
+        response = await self.async_client.get('/supply_chain/async/network_entity/?page_size=2&fields=id,name',
+                                               AUTHORIZATION=f'Bearer {self.token}')
+        results = response.json()['results']
+        self.assertEqual([item['name'] for item in results], ["Entity 0", "Entity 1"])
+        self.assertNotIn('products', results[0])
+        cursor = parse_qs(urlparse(response.json()['next']).query)['cursor'][0]
+
+        sync_response = await sync_to_async(self.client.get)(
+            '/supply_chain/network_entity/', {'page_size': 2, 'fields': 'id,name', 'cursor': cursor},
+            HTTP_AUTHORIZATION=f'Bearer {self.token}',
+        )
+        self.assertEqual([item['name'] for item in sync_response.json()['results']], ["Entity 2"])
+
+        response = await self.async_client.get('/supply_chain/async/network_entity/?page_size=2&fields=id,name',
+                                               AUTHORIZATION=f'Bearer {self.token}',
+                                               IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    async def test_requires_authentication(self):
+        """
+        Тест на отказ в доступе без токена.
+        """
+        response = await self.async_client.get('/supply_chain/async/network_entity/')
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncMiddlewareChainTest(TestCase):
+    """
+    Набор тестов для работы middleware проекта в асинхронной цепочке (ASGI) без адаптации обработчиков.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='chain@example.com', is_active=True, is_staff=True)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        NetworkEntity.objects.create(name="Entity")
+
+    async def request_async(self, **extra):
+        """
+        Выполняет запрос к асинхронному представлению и возвращает ответ и сообщения Django об адаптации
+        обработчиков middleware (переключении между циклом событий и потоком); Django пишет их при DEBUG.
+        """
+        with override_settings(DEBUG=True), self.assertLogs('django.request', 'DEBUG') as logs:
+            logging.getLogger('django.request').debug('start')
+            response = await self.async_client.get('/supply_chain/async/network_entity/',
+                                                   AUTHORIZATION=f'Bearer {self.token}', **extra)
+        self.assertEqual(response.status_code, 200)
+        return response, [message for message in logs.output if 'adapted' in message]
+
+    async def test_database_checkout_is_not_adapted(self):
+        """
+        Тест на сбор метрик выдачи соединения в асинхронной цепочке без адаптации DatabaseCheckoutMiddleware.
+        """
+        response, adapted = await self.request_async()
+        self.assertFalse([message for message in adapted if 'DatabaseCheckoutMiddleware' in message], adapted)
+        self.assertEqual(response.asgi_request.db_checkout['reused'], True)
+        self.assertEqual(response.asgi_request.db_checkout['opened'], 0)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_PROFILING_ENABLED=True)
+    async def test_request_timing_is_not_adapted(self):
+        """
+        Тест на заголовок Server-Timing и профилирование в асинхронной цепочке без адаптации RequestTimingMiddleware.
+        """
+        with self.assertLogs('config.profile', 'INFO'):
+            response, adapted = await self.request_async(X_PROFILE='1')
+        self.assertFalse([message for message in adapted if 'RequestTimingMiddleware' in message], adapted)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        response = await self.async_client.get('/supply_chain/network_entity/', AUTHORIZATION=f'Bearer {self.token}')
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_MAX_REPEATS=0)
+    async def test_query_budget_is_not_adapted(self):
+        """
+        Тест на учет SQL-запросов асинхронного представления без адаптации QueryBudgetMiddleware:
+        при QUERY_BUDGET_MAX_REPEATS=0 о каждом запросе пишется предупреждение.
+        """
+        with self.assertLogs('config.query_budget', 'WARNING'):
+            response, adapted = await self.request_async()
+        self.assertFalse([message for message in adapted if 'QueryBudgetMiddleware' in message], adapted)
+
+    @override_settings(METRICS_ENABLED=True)
+    async def test_metrics_are_not_adapted(self):
+        """
+        Тест на запись длительности SQL-запросов асинхронного представления без адаптации MetricsMiddleware.
+        """
+        def query_count():
+            return REGISTRY.get_sample_value('db_query_duration_seconds_count', {'alias': 'default'}) or 0
+
+        before = query_count()
+        response, adapted = await self.request_async()
+        self.assertFalse([message for message in adapted if 'MetricsMiddleware' in message], adapted)
+        self.assertGreater(query_count(), before)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, QUERY_BUDGET_ENABLED=True)
+    async def test_async_chain_is_not_adapted(self):
+        """
+        Тест на отсутствие адаптации обработчиков во всей цепочке middleware при всех включенных middleware проекта.
+        """
+        response, adapted = await self.request_async()
+        self.assertEqual(adapted, [])
+
+
+class DatabaseCheckoutMiddlewareTest(APITestCase):
+    """
+    Набор тестов для метрик выдачи соединения с базой данных на запрос.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='checkout@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+
+    def test_persistent_connection_is_reused(self):
+        """
+        Тест на переиспользование открытого соединения и запись метрик в лог.
+        """
+        with self.assertLogs('config.db', 'INFO') as logs:
+            response = self.client.get('/supply_chain/network_entity/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.db_checkout['reused'], True)
+        self.assertEqual(response.wsgi_request.db_checkout['opened'], 0)
+        self.assertIn('reused=True', logs.output[0])
+
+    def test_asgi_disables_persistent_connections(self):
+        """
+        Тест на отключение постоянных соединений при запуске через config.asgi независимо от POSTGRES_CONN_MAX_AGE.
+        """
+        code = ("import config.asgi; from django.conf import settings; "
+                "print(settings.DATABASES['default']['CONN_MAX_AGE'])")
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, check=True, capture_output=True,
+                                text=True, env={**os.environ, 'POSTGRES_CONN_MAX_AGE': '60'})
+        self.assertEqual(result.stdout.strip(), '0')
+
+    def test_connection_limit_check(self):
+        """
+        Тест на ошибку команды check_db_connections, когда соединений больше допустимого.
+        """
+        extra = connections.create_connection(DEFAULT_DB_ALIAS)
+        extra.ensure_connection()
+        self.addCleanup(extra.close)
+
+        stdout = StringIO()
+        call_command('check_db_connections', stdout=stdout)
+        self.assertIn(f'из {settings.POSTGRES_MAX_CONNECTIONS}', stdout.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('check_db_connections', max_connections=1, stdout=StringIO())
+
+
+class RequestTimingMiddlewareTest(APITestCase):
+    """
+    Набор тестов для длительностей этапов запроса в заголовке Server-Timing и профилирования по заголовку X-Profile.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='timing@example.com', is_active=True)
+        self.staff = User.objects.create(email='staff@example.com', is_active=True, is_staff=True)
+        NetworkEntity.objects.create(name="Timed Entity")
+
+    def authorize(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_timing_disabled_by_default(self):
+        """
+        Тест на отсутствие заголовка Server-Timing, если сбор длительностей выключен.
+        """
+        self.authorize(self.user)
+        response = self.client.get('/supply_chain/network_entity/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True)
+    def test_timings_in_header_and_log(self):
+        """
+        Тест на вывод длительностей SQL-запросов, аутентификации, сериализации и рендеринга в заголовок и лог.
+        """
+        self.authorize(self.user)
+        with self.assertLogs('config.timing', 'INFO') as logs:
+            response = self.client.get('/supply_chain/network_entity/')
+        self.assertEqual(response.status_code, 200)
+        stages = {entry.split(';')[0] for entry in response['Server-Timing'].split(', ')}
+        self.assertEqual(stages, {'db', 'auth', 'serialize', 'render', 'total'})
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('status=200', logs.output[0])
+        self.assertEqual(logs.records[0].timing['path'], '/supply_chain/network_entity/')
+        self.assertGreater(logs.records[0].timing['queries'], 0)
+
+    @override_settings(REQUEST_PROFILING_ENABLED=True)
+    def test_profile_only_for_staff(self):
+        """
+        Тест на профилирование запроса сотрудника с заголовком X-Profile и сохранение профиля в файл.
+        Тот же заголовок от обычного пользователя игнорируется.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        self.authorize(self.user)
+        with self.assertNoLogs('config.profile', 'INFO'):
+            response = self.client.get('/supply_chain/network_entity/', HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile', response)
+
+        self.authorize(self.staff)
+        with self.settings(REQUEST_PROFILING_DIR=directory), self.assertLogs('config.profile', 'INFO') as logs:
+            response = self.client.get('/supply_chain/network_entity/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('cumulative', logs.output[0])
+        self.assertTrue(os.path.exists(os.path.join(directory, response['X-Profile'])))
+
+
+class NetworkEntityQueryBudgetTest(QueryBudgetTestMixin, APITestCase):
+    """
+    Набор тестов на соблюдение бюджетов SQL-запросов всеми действиями NetworkEntityViewSet.
+    Данных достаточно, чтобы загрузка связанных объектов по одной строке (N+1) превысила бюджет
+    или число повторов одного запроса. Запросы аутентифицируются настоящим JWT, как в работающем сервисе,
+    поэтому в бюджет входит запрос пользователя.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='budget@example.com', is_active=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.root = NetworkEntity.objects.create(name="Budget Root")
+        self.entities = []
+        for index in range(8):
+            entity = NetworkEntity.objects.create(name=f"Budget Entity {index}", supplier=self.root, debt="10.00")
+            Contact.objects.create(network_entity=entity, email=f"budget{index}@example.com", country="Country",
+                                   city="City", street="Street", house_number=str(index))
+            Product.objects.create(network_entity=entity, name="Product A", model="Model A", release_date="2022-01-01")
+            Product.objects.create(network_entity=entity, name="Product B", model="Model B", release_date="2023-01-01")
+            self.entities.append(entity)
+
+    def payload(self, name):
+        return {
+            'name': name,
+            'supplier': self.root.id,
+            'contact': {'email': 'new@example.com', 'country': 'Country', 'city': 'City', 'street': 'Street',
+                        'house_number': '1'},
+            'products': [{'name': f'Product {index}', 'model': 'Model', 'release_date': '2022-01-01'}
+                         for index in range(5)],
+        }
+
+    def test_read_actions_within_budget(self):
+        """
+        Тест на бюджеты действий чтения: списка, сущности, иерархии, поиска, агрегатов и выгрузки.
+        """
+        entity = self.entities[0]
+        for url in ('/supply_chain/network_entity/', f'/supply_chain/network_entity/{entity.id}/',
+                    f'/supply_chain/network_entity/{entity.id}/ancestors/',
+                    f'/supply_chain/network_entity/{self.root.id}/descendants/',
+                    f'/supply_chain/network_entity/{self.root.id}/subtree_size/',
+                    '/supply_chain/network_entity/search/?q=Budget',
+                    '/supply_chain/network_entity/debt-summary/', '/supply_chain/network_entity/export/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_write_actions_within_budget(self):
+        """
+        Тест на бюджеты создания, пакетного создания, изменения и удаления сущностей.
+        """
+        url = '/supply_chain/network_entity/'
+        self.assertEqual(self.client.post(url, self.payload("Created"), format='json').status_code, 201)
+        response = self.client.post(f'{url}bulk/', [self.payload(f"Bulk {index}") for index in range(6)],
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        entity = self.entities[0]
+        self.assertEqual(self.client.put(f'{url}{entity.id}/', self.payload("Updated"), format='json').status_code, 200)
+        self.assertEqual(self.client.patch(f'{url}{entity.id}/', {'name': "Renamed"}, format='json').status_code, 200)
+        self.assertEqual(self.client.delete(f'{url}{self.root.id}/').status_code, 204)
+
+    def test_repeated_queries_are_detected(self):
+        """
+        Тест на обнаружение N+1: сериализация без предварительной загрузки связанных объектов
+        повторяет один и тот же запрос для каждой сущности.
+        """
+        with self.assertRaisesRegex(QueryBudgetExceeded, 'supply_chain_contact'):
+            with self.assertQueryBudget():
+                NetworkEntityListSerializer(NetworkEntity.objects.filter(supplier=self.root), many=True).data
+
+    def test_budget_violation_is_logged_without_raise(self):
+        """
+        Тест на предупреждение в логе при превышении бюджета, если исключение не выбрасывается (режим стенда).
+        """
+        with self.settings(QUERY_BUDGET_RAISE=False), \
+                mock.patch.object(NetworkEntityViewSet, 'query_budget', {'list': 1}), \
+                self.assertLogs('config.query_budget', 'WARNING') as logs:
+            response = self.client.get('/supply_chain/network_entity/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('при бюджете 1', logs.output[0])
+
+    def test_fingerprint_ignores_values(self):
+        """
+        Тест на одинаковый отпечаток запросов, отличающихся только значениями и длиной списка IN.
+        """
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a''b' AND pk IN (%s, %s)"),
+            fingerprint("SELECT  *  FROM t WHERE id = 25 AND name = 'c' AND pk IN (%s)"),
+        )
+        self.assertEqual(fingerprint('SAVEPOINT "s1_x2"'), fingerprint('SAVEPOINT "s7_x9"'))
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTest(APITestCase):
+    """
+    Набор тестов для гистограмм длительности запросов и их экспорта в формате Prometheus.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='metrics@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+
+    def test_request_and_query_histograms_are_exported(self):
+        """
+        Тест на запись длительности запроса с меткой URL-шаблона роутера и SQL-запросов с меткой базы данных.
+        """
+        self.assertEqual(self.client.get('/supply_chain/network_entity/').status_code, 200)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",status="200",'
+                      'view="supply_chain:networkentity-list"}', content)
+        self.assertIn('db_query_duration_seconds_count{alias="default"}', content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token_is_required(self):
+        """
+        Тест на отказ в доступе к метрикам без токена, если METRICS_TOKEN задан.
+        """
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_are_not_served_when_disabled(self):
+        """
+        Тест на отсутствие эндпоинта метрик при выключенном сборе (по умолчанию).
+        """
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+
+    def test_metrics_of_worker_processes_are_aggregated(self):
+        """
+        Тест на суммирование метрик нескольких процессов через каталог PROMETHEUS_MULTIPROC_DIR.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        code = ("from config.metrics import REQUEST_LATENCY; "
+                "REQUEST_LATENCY.labels('worker-view', 'GET', 200).observe(0.2)")
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, check=True,
+                           env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory})
+
+        with self.settings(PROMETHEUS_MULTIPROC_DIR=directory):
+            response = self.client.get('/metrics/')
+        self.assertIn('http_request_duration_seconds_count{method="GET",status="200",view="worker-view"} 2.0',
+                      response.content.decode())
+
+
+class OpenAPISchemaTest(TestCase):
+    """
+    Набор тестов для заранее сгенерированной схемы OpenAPI, которую загружают /docs/ и /redoc/.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_schema_is_served_with_etag_and_gzip(self):
+        """
+        Тест на отдачу схемы с сильным ETag, ответ 304 при совпадении If-None-Match и сжатый вариант.
+        """
+        with self.settings(OPENAPI_SCHEMA_DIR=self.directory, CODE_VERSION='served'):
+            response = self.client.get('/docs/', {'format': 'openapi'})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('/supply_chain/network_entity/', json.loads(response.content)['paths'])
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+            not_modified = self.client.get('/redoc/', {'format': 'openapi'}, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+
+            compressed = self.client.get('/docs/', {'format': 'openapi'}, HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(compressed['Content-Encoding'], 'gzip')
+            self.assertNotEqual(compressed['ETag'], response['ETag'])
+            self.assertEqual(gzip.decompress(compressed.content), response.content)
+
+    def test_schema_is_read_from_versioned_file(self):
+        """
+        Тест на то, что схема текущей версии читается из файла, а не генерируется заново.
+        """
+        with open(os.path.join(self.directory, 'openapi-from-file.json'), 'wb') as file:
+            file.write(b'{"swagger": "2.0", "paths": {}}')
+        with self.settings(OPENAPI_SCHEMA_DIR=self.directory, CODE_VERSION='from-file'):
+            response = self.client.get('/docs/', {'format': 'openapi'})
+        self.assertEqual(response.content, b'{"swagger": "2.0", "paths": {}}')
+
+    def test_generate_schema_replaces_previous_version(self):
+        """
+        Тест на генерацию схемы командой generate_schema: файл новой версии заменяет файлы прежних версий.
+        """
+        with self.settings(OPENAPI_SCHEMA_DIR=self.directory, CODE_VERSION='v1'):
+            call_command('generate_schema', stdout=StringIO())
+        with self.settings(OPENAPI_SCHEMA_DIR=self.directory, CODE_VERSION='v2'):
+            call_command('generate_schema', stdout=StringIO())
+            stdout = StringIO()
+            call_command('generate_schema', stdout=stdout)
+        self.assertEqual(os.listdir(self.directory), ['openapi-v2.json'])
+        self.assertIn('уже сгенерирована', stdout.getvalue())
+
+    def test_empty_schema_dir_falls_back_to_default(self):
+        """
+        Тест на каталог схемы по умолчанию, если OPENAPI_SCHEMA_DIR задана пустой (как в скопированном .env),
+        а не на текущий каталог процесса, из которого write_schema удалял бы файлы схем.
+        """
+        code = "import django; django.setup(); from django.conf import settings; print(settings.OPENAPI_SCHEMA_DIR)"
+        env = {**os.environ, 'OPENAPI_SCHEMA_DIR': '', 'PYTHONPATH': str(settings.BASE_DIR),
+               'DJANGO_SETTINGS_MODULE': 'config.settings'}
+        result = subprocess.run([sys.executable, '-c', code], cwd=self.directory, check=True, capture_output=True,
+                                text=True, env=env)
+        self.assertEqual(result.stdout.strip(), str(settings.BASE_DIR / 'var' / 'schema'))
+
+
+class DebtSummaryTest(APITestCase):
+    """
+    Набор тестов для сводной таблицы задолженности и эндпоинта агрегатов по ней.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='debt@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.factory = NetworkEntity.objects.create(name="Factory", debt=0)
+        self.retailer = NetworkEntity.objects.create(name="Retailer", supplier=self.factory, debt=100)
+        self.entrepreneur = NetworkEntity.objects.create(name="Entrepreneur", supplier=self.retailer, debt=50)
+        self.other_factory = NetworkEntity.objects.create(name="Other factory", debt=10)
+        for entity, country in [(self.factory, "Germany"), (self.retailer, "France"), (self.other_factory, "Germany")]:
+            Contact.objects.create(network_entity=entity, email="entity@example.com", country=country,
+                                   city="City", street="Street", house_number="1")
+
+    def assertSummaryIsConsistent(self):
+        """
+        Проверяет, что инкрементально поддерживаемая сводка совпадает с полным пересчетом.
+        """
+        def snapshot():
+            return {
+                (row.root_id, row.level, row.country): (row.total_debt, row.entity_count)
+                for row in DebtSummary.objects.filter(entity_count__gt=0)
+            }
+
+        maintained = snapshot()
+        DebtSummary.objects.rebuild()
+        self.assertEqual(maintained, snapshot())
+
+    def test_rollup_by_level_country_and_root(self):
+        """
+        Тест на агрегаты задолженности по уровню, стране и заводу.
+        """
+        response = self.client.get('/supply_chain/network_entity/debt-summary/?group_by=level')
+        self.assertEqual([(row['level'], row['total_debt'], row['entity_count']) for row in response.data],
+                         [(0, '10.00', 2), (1, '100.00', 1), (2, '50.00', 1)])
+
+        response = self.client.get('/supply_chain/network_entity/debt-summary/?group_by=country')
+        self.assertEqual([(row['country'], row['total_debt']) for row in response.data],
+                         [('', '50.00'), ('France', '100.00'), ('Germany', '10.00')])
+
+        response = self.client.get('/supply_chain/network_entity/debt-summary/?group_by=root')
+        self.assertEqual([(row['root_name'], row['total_debt'], row['entity_count']) for row in response.data],
+                         [("Factory", '150.00', 3), ("Other factory", '10.00', 1)])
+
+        response = self.client.get(f'/supply_chain/network_entity/debt-summary/?group_by=level&root={self.factory.id}')
+        self.assertEqual(len(response.data), 3)
+
+    def test_invalid_group_by(self):
+        """
+        Тест на отказ при недопустимой группировке.
+        """
+        response = self.client.get('/supply_chain/network_entity/debt-summary/?group_by=city')
+        self.assertEqual(response.status_code, 400)
+
+    def test_summary_follows_changes(self):
+        """
+        Тест на актуальность сводки после изменения задолженности, переноса поддерева, смены страны и удаления.
+        """
+        self.entrepreneur.debt = 70
+        self.entrepreneur.save()
+        self.assertSummaryIsConsistent()
+
+        self.retailer.supplier = self.other_factory
+        self.retailer.save()
+        self.assertSummaryIsConsistent()
+
+        contact = Contact.objects.get(network_entity=self.retailer)
+        contact.country = "Italy"
+        contact.save()
+        contact.delete()
+        self.assertSummaryIsConsistent()
+
+        self.retailer.delete()
+        self.assertSummaryIsConsistent()
+
+        run_admin_action(self.client, 'clear_debt', NetworkEntity.objects.all())
+        call_command('clear_debt', stdout=StringIO())
+        self.assertSummaryIsConsistent()
+
+    def test_debt_given_as_string(self):
+        """
+        Тест на актуальность сводки, если задолженность сущности задана строкой, как в данных формы или импорта.
+        """
+        entity = NetworkEntity.objects.create(name="Shop", supplier=self.factory, debt="12.50")
+        contact = Contact.objects.create(network_entity=entity, email="shop@example.com", country="Germany",
+                                         city="City", street="Street", house_number="1")
+        contact.country = "Italy"
+        contact.save()
+        self.assertSummaryIsConsistent()
+
+        entity.debt = "20"
+        entity.save()
+        self.assertEqual(entity.debt, Decimal("20"))
+        self.assertEqual(DebtSummary.objects.get(root_id=self.factory.id, level=1, country="Italy").total_debt,
+                         Decimal("20"))
+        self.assertSummaryIsConsistent()
+
+
+class DebtClearingTest(APITestCase):
+    """
+    Набор тестов для пакетной очистки задолженности, журнала пачек и фоновых заданий.
+    """
+
+    def setUp(self):
+        self.factory = NetworkEntity.objects.create(name="Factory", debt=10)
+        self.retailers = [
+            NetworkEntity.objects.create(name=f"Retailer {index}", supplier=self.factory, debt=100)
+            for index in range(5)
+        ]
+        self.other = NetworkEntity.objects.create(name="Other", debt=30)
+        Contact.objects.create(network_entity=self.other, email="other@example.com", country="France",
+                               city="Paris", street="Street", house_number="1")
+
+    @override_settings(DEBT_CLEARING_BATCH_SIZE=2)
+    def test_admin_action_clears_in_batches(self):
+        """
+        Тест на постановку очистки выбранных сущностей в очередь и ее выполнение пачками
+        с записью журнала по каждой пачке.
+        """
+        response = run_admin_action(self.client, 'clear_debt', NetworkEntity.objects.filter(supplier=self.factory))
+        self.assertEqual(response.status_code, 302)
+        job = DebtClearingJob.objects.get()
+        self.assertEqual(job.status, DebtClearingJob.STATUS_PENDING)
+        self.assertEqual(NetworkEntity.objects.filter(supplier=self.factory).exclude(debt=0).count(), 5)
+
+        call_command('clear_debt', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.total, job.progress), (DebtClearingJob.STATUS_DONE, 5, 5, 100))
+        self.assertEqual(job.debt_cleared, 500)
+        self.assertEqual([batch.updated for batch in job.batches.order_by('pk')], [2, 2, 1])
+        self.assertFalse(NetworkEntity.objects.filter(supplier=self.factory).exclude(debt=0).exists())
+        self.assertEqual(NetworkEntity.objects.get(pk=self.other.pk).debt, 30)
+
+    def test_batches_are_committed_before_yield(self):
+        """
+        Тест на то, что транзакция пачки завершается до того, как ее результат получает вызывающий код.
+        """
+        depth = len(connection.atomic_blocks)
+        batches = 0
+        for _ in NetworkEntity.objects.all().clear_debt_batches(batch_size=2):
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            batches += 1
+        self.assertEqual(batches, 4)
+
+    def test_background_subtree_job(self):
+        """
+        Тест на выполнение задания по поддереву, поставленного в очередь из админ-панели, командой clear_debt.
+        """
+        run_admin_action(self.client, 'clear_subtree_debt', NetworkEntity.objects.filter(pk=self.factory.pk))
+        job = DebtClearingJob.objects.get()
+        self.assertEqual(job.status, DebtClearingJob.STATUS_PENDING)
+
+        call_command('clear_debt', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DebtClearingJob.STATUS_DONE)
+        self.assertEqual(job.debt_cleared, 510)
+        self.assertEqual(NetworkEntity.objects.exclude(debt=0).get().pk, self.other.pk)
+
+    def test_country_command(self):
+        """
+        Тест на очистку задолженности страны командой clear_debt и на согласованность сводки задолженности.
+        """
+        call_command('clear_debt', country="France", stdout=StringIO())
+        self.assertEqual(NetworkEntity.objects.get(pk=self.other.pk).debt, 0)
+        self.assertEqual(DebtSummary.objects.get(root=self.other, entity_count__gt=0).total_debt, 0)
+        self.assertEqual(DebtSummary.objects.rollup('root').get(root_id=self.factory.pk)['total_debt'], 510)
+
+
+class NetworkEntityAdminChangelistTest(TestCase):
+    """
+    Набор тестов для списка сущностей в админ-панели на больших таблицах.
+    """
+
+    def setUp(self):
+        self.admin_user = User.objects.create(email='changelist@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin_user)
+        factory = NetworkEntity.objects.create(name="Factory")
+        for index in range(3):
+            entity = NetworkEntity.objects.create(name=f"Retailer {index}", supplier=factory)
+            Contact.objects.create(network_entity=entity, email="retailer@example.com", country="Germany",
+                                   city=f"City {index}", street="Street", house_number="1")
+
+    def get_changelist(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/supply_chain/networkentity/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        """
+        Тест на то, что количество запросов списка не зависит от числа строк и поставщиков.
+        """
+        _, first_count = self.get_changelist()
+        factory = NetworkEntity.objects.create(name="Another factory")
+        for index in range(5):
+            NetworkEntity.objects.create(name=f"Outlet {index}", supplier=factory)
+        response, second_count = self.get_changelist()
+        self.assertEqual(first_count, second_count)
+        self.assertContains(response, "Another factory")
+
+    def test_city_filter_is_cached(self):
+        """
+        Тест на фильтрацию по городу и на кэширование списка городов.
+        """
+        cache.delete(CityListFilter.cache_key)
+        response, _ = self.get_changelist('?city=City%201')
+        self.assertEqual(list(response.context['cl'].result_list), [NetworkEntity.objects.get(name="Retailer 1")])
+        _, count_without_cache = self.get_changelist()
+        _, count_with_cache = self.get_changelist()
+        self.assertEqual(count_with_cache, count_without_cache)
+        self.assertEqual(cache.get(CityListFilter.cache_key), ["City 0", "City 1", "City 2"])
+
+    def test_estimated_count_for_large_tables(self):
+        """
+        Тест на использование статистики PostgreSQL вместо COUNT(*) для больших выборок.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE supply_chain_networkentity')
+        paginator = EstimatedCountPaginator(NetworkEntity.objects.order_by('pk'), 100)
+        paginator.estimate_threshold = 0
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 4)
+        self.assertIn('reltuples', queries[0]['sql'])
+
+        filtered = EstimatedCountPaginator(NetworkEntity.objects.filter(level=1).order_by('pk'), 100)
+        filtered.estimate_threshold = 0
+        self.assertGreaterEqual(filtered.count, 1)
+
+
+class SupplierAutocompleteTest(TestCase):
+    """
+    Набор тестов для поиска поставщиков в форме сущности админ-панели.
+    """
+
+    def setUp(self):
+        self.admin_user = User.objects.create(email='autocomplete@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin_user)
+        self.factory = NetworkEntity.objects.create(name="Factory")
+        self.retailer = NetworkEntity.objects.create(name="Retailer", supplier=self.factory)
+        self.outlet = NetworkEntity.objects.create(name="Retail outlet", supplier=self.retailer)
+        self.other = NetworkEntity.objects.create(name="Retail chain")
+        self.url = '/admin/supply_chain/networkentity/supplier-autocomplete/'
+
+    def test_excludes_entity_and_descendants(self):
+        """
+        Тест на исключение самой сущности и ее потомков из вариантов поставщика.
+        """
+        response = self.client.get(self.url, {'term': 'ret', 'exclude': self.retailer.id})
+        self.assertEqual([item['text'] for item in response.json()['results']], ["Retail chain"])
+
+        response = self.client.get(self.url, {'term': 'ret'})
+        self.assertCountEqual([item['text'] for item in response.json()['results']],
+                              ["Retail chain", "Retail outlet", "Retailer"])
+
+    def test_pagination(self):
+        """
+        Тест на постраничную выдачу вариантов.
+        """
+        NetworkEntity.objects.bulk_create([NetworkEntity(name=f"Shop {index:02}", level=0) for index in range(25)])
+        first = self.client.get(self.url, {'term': 'shop'}).json()
+        second = self.client.get(self.url, {'term': 'shop', 'page': 2}).json()
+        self.assertEqual((len(first['results']), first['pagination']['more']), (20, True))
+        self.assertEqual((len(second['results']), second['pagination']['more']), (5, False))
+
+    def test_change_form_does_not_render_all_entities(self):
+        """
+        Тест на то, что форма сущности выводит только выбранного поставщика и ссылается на эндпоинт поиска.
+        """
+        response = self.client.get(f'/admin/supply_chain/networkentity/{self.retailer.id}/change/')
+        self.assertContains(response, f'{self.url}?exclude={self.retailer.id}')
+        self.assertNotContains(response, "Retail chain")
+
+    def test_requires_staff(self):
+        """
+        Тест на закрытый доступ к эндпоинту для пользователей без доступа к админ-панели.
+        """
+        self.client.force_login(User.objects.create(email='employee@example.com'))
+        response = self.client.get(self.url, {'term': 'ret'})
+        self.assertEqual(response.status_code, 302)
+
+
+class NetworkEntitySearchTest(APITestCase):
+    """
+    Набор тестов для поиска сущностей по названию, продуктам и адресу контакта.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='search@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.url = '/supply_chain/network_entity/search/'
+        self.factory = NetworkEntity.objects.create(name="Samsung Factory")
+        self.store = NetworkEntity.objects.create(name="Electronics Store", supplier=self.factory)
+        self.kiosk = NetworkEntity.objects.create(name="Corner kiosk", supplier=self.store)
+        for entity, country, street in ((self.factory, "Korea", "Samsung-ro"), (self.store, "Germany", "Hauptstrasse"),
+                                        (self.kiosk, "Germany", "Lindenstrasse")):
+            Contact.objects.create(network_entity=entity, email=f"entity{entity.id}@example.com", country=country,
+                                   city="Berlin", street=street, house_number="1")
+        Product.objects.create(network_entity=self.store, name="Phone", model="Galaxy S24", release_date="2024-01-01")
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_name_product_and_address(self):
+        """
+        Тест на поиск по подстроке названия, модели продукта и улицы без учета регистра.
+        """
+        self.assertEqual([item['id'] for item in self.search(q="electro")['results']], [self.store.id])
+        self.assertEqual([item['id'] for item in self.search(q="galaxy")['results']], [self.store.id])
+        self.assertEqual([item['id'] for item in self.search(q="linden")['results']], [self.kiosk.id])
+
+    def test_results_are_ranked(self):
+        """
+        Тест на порядок результатов по релевантности: совпадение целого слова выше совпадения части слова.
+        """
+        data = self.search(q="samsung")
+        self.assertEqual([item['id'] for item in data['results']], [self.factory.id])
+        self.assertEqual(data['results'][0]['contact']['street'], "Samsung-ro")
+
+        data = self.search(q="strasse")
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([item['rank'] for item in data['results']],
+                         sorted((item['rank'] for item in data['results']), reverse=True))
+
+        store = NetworkEntity.objects.create(name="Strasse outlet")
+        data = self.search(q="strasse")
+        self.assertEqual(data['results'][0]['id'], store.id)
+        self.assertGreater(data['results'][0]['rank'], data['results'][1]['rank'])
+
+    @override_settings(NETWORK_SEARCH_MAX_MATCHES=1)
+    def test_match_limit_keeps_most_relevant(self):
+        """
+        Тест на отбор самых релевантных совпадений, когда их больше NETWORK_SEARCH_MAX_MATCHES:
+        точное совпадение, созданное последним, не вытесняется совпадениями части слова.
+        """
+        for index in range(5):
+            NetworkEntity.objects.create(name=f"Electronics outlet {index}")
+        exact = NetworkEntity.objects.create(name="Electro")
+        data = self.search(q="electro")
+        self.assertEqual([item['id'] for item in data['results']], [exact.id])
+
+    def test_pagination_and_filters(self):
+        """
+        Тест на постраничную выдачу и учет фильтра по стране контакта.
+        """
+        first = self.search(q="berlin", page_size=2)
+        second = self.search(q="berlin", page_size=2, page=2)
+        self.assertEqual((first['count'], len(first['results']), len(second['results'])), (3, 2, 1))
+        self.assertEqual(len({item['id'] for item in first['results'] + second['results']}), 3)
+
+        data = self.search(q="berlin", contact__country="Korea")
+        self.assertEqual([item['id'] for item in data['results']], [self.factory.id])
+
+    def test_short_query_is_rejected(self):
+        """
+        Тест на отказ при запросе короче трех символов.
+        """
+        response = self.client.get(self.url, {'q': 'ab'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('q', response.json())
+
+
+class CompiledSerializerTest(APITestCase):
+    """
+    Набор тестов для скомпилированного плана сериализации сущностей и рендерера FastJSONRenderer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        factory = NetworkEntity.objects.create(name="Factory", debt="1234.50")
+        NetworkEntity.objects.create(name="Без контакта\u2028", supplier=factory)
+        for index in range(200):
+            entity = NetworkEntity.objects.create(name=f"Entity {index}", supplier=factory, debt=f"{index}.0{index % 10}")
+            Contact.objects.create(network_entity=entity, email=f"entity{index}@example.com", country="Германия",
+                                   city="Berlin", street="Main", house_number=str(index))
+            Product.objects.bulk_create([
+                Product(network_entity=entity, name=f"Product {product}", model="X", release_date="2022-01-01")
+                for product in range(index % 3)
+            ])
+
+    def render_both(self, queryset, fields=None):
+        """
+        Сериализует сущности сериализатором DRF и скомпилированным планом.
+
+        Возвращает:
+        Пару (JSON сериализатора DRF, JSON скомпилированного плана) и время каждого варианта в секундах.
+        """
+        started = time.perf_counter()
+        serializer = NetworkEntityListSerializer(list(queryset.for_read(fields)), many=True, context={'fields': fields})
+        expected = JSONRenderer().render(serializer.data)
+        serializer_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = compile_serializer(NetworkEntityListSerializer, fields and frozenset(fields))
+        actual = FastJSONRenderer().render(compiled.represent(list(compiled.values(queryset))))
+        compiled_time = time.perf_counter() - started
+        return expected, actual, serializer_time, compiled_time
+
+    def test_output_matches_serializer(self):
+        """
+        Тест на совпадение ответа скомпилированного плана с ответом сериализатора, в том числе для сущности
+        без контакта и продуктов и для сокращенного набора полей.
+        """
+        queryset = NetworkEntity.objects.order_by('creation_time', 'id')
+        expected, actual = self.render_both(queryset)[:2]
+        self.assertEqual(actual, expected)
+        self.assertIsNone(json.loads(actual)[1]['contact'])
+
+        fields = NetworkEntityListSerializer.get_selected_fields({'fields': 'name,debt', 'expand': 'products'})
+        expected, actual = self.render_both(queryset, fields)[:2]
+        self.assertEqual(actual, expected)
+
+    def test_list_and_retrieve_use_compiled_plan(self):
+        """
+        Тест на ответы 'list' и 'retrieve', совпадающие с данными сериализатора.
+        """
+        self.client.force_authenticate(user=User.objects.create(email='compiled@example.com', is_active=True))
+        entity = NetworkEntity.objects.filter(products__isnull=False).first()
+        response = self.client.get(f'/supply_chain/network_entity/{entity.id}/')
+        self.assertEqual(response.json(), json.loads(JSONRenderer().render(
+            NetworkEntityListSerializer(NetworkEntity.objects.for_read().get(pk=entity.id)).data
+        )))
+        self.assertEqual(self.client.get('/supply_chain/network_entity/0/').status_code, 404)
+
+        response = self.client.get('/supply_chain/network_entity/', {'page_size': 5})
+        self.assertEqual([item['name'] for item in response.json()['results']],
+                         ["Factory", "Без контакта\u2028", "Entity 0", "Entity 1", "Entity 2"])
+
+    @skipUnless(os.getenv('RUN_BENCHMARKS', 'False') == 'True', 'замеры скорости включаются RUN_BENCHMARKS=True')
+    def test_serialization_benchmark(self):
+        """
+        Тест-замер скорости сериализации страницы сущностей в объектах в секунду.
+        Скомпилированный план должен быть быстрее сериализатора DRF; результат замера пишется в лог
+        supply_chain.benchmark на уровне INFO. Время зависит от нагрузки на машину, поэтому замер
+        выполняется только с переменной окружения RUN_BENCHMARKS=True.
+        """
+        queryset = NetworkEntity.objects.order_by('creation_time', 'id')
+        count = queryset.count()
+        timings = [self.render_both(queryset)[2:] for _ in range(3)]
+        serializer_rate = count / min(serializer_time for serializer_time, _ in timings)
+        compiled_rate = count / min(compiled_time for _, compiled_time in timings)
+        benchmark_logger.info('network_entity serialization: serializer=%.0f objects/s, compiled=%.0f objects/s',
+                              serializer_rate, compiled_rate)
+        self.assertGreater(compiled_rate, serializer_rate)
+
+
+class SyntheticNetworkBenchmarkTest(TestCase):
+    """
+    Набор тестов для генерации синтетической сети и замера производительности на ней.
+    """
+
+    def setUp(self):
+        call_command('generate_network', scale=120, batch_size=50, seed=3, stdout=StringIO(), stderr=StringIO())
+
+    def test_generate_network_builds_consistent_hierarchy(self):
+        """
+        Тест на то, что сгенерированные сущности имеют контакты, а пути и уровни согласованы с поставщиками.
+        """
+        self.assertEqual(NetworkEntity.objects.count(), 120)
+        self.assertEqual(Contact.objects.count(), 120)
+        self.assertEqual(set(NetworkEntity.objects.values_list('level', flat=True)), {0, 1, 2, 3})
+        for entity in NetworkEntity.objects.select_related('supplier').exclude(supplier=None):
+            self.assertEqual(entity.path, f'{entity.supplier.path}{entity.supplier_id}/')
+            self.assertEqual(entity.level, entity.supplier.level + 1)
+        self.assertEqual(DebtSummary.objects.aggregate(total=Sum('entity_count'))['total'], 120)
+        self.assertGreater(NetworkEntity.objects.create(name="After generation").id,
+                           NetworkEntity.objects.exclude(name="After generation").aggregate(Max('id'))['id__max'])
+
+    def test_generate_network_rejects_invalid_options(self):
+        """
+        Тест на отказ генерации при неположительных --scale и --batch-size и отрицательном --max-products.
+        """
+        for options in [{'scale': 0}, {'batch_size': 0}, {'max_products': -1}]:
+            with self.subTest(**options), self.assertRaises(CommandError):
+                call_command('generate_network', stdout=StringIO(), stderr=StringIO(), **options)
+        self.assertEqual(NetworkEntity.objects.count(), 120)
+
+    def test_benchmark_writes_results_and_rolls_back(self):
+        """
+        Тест на запись результатов замера в JSON и откат изменений, сделанных сценариями.
+        """
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as file:
+            self.addCleanup(os.remove, file.name)
+        call_command('benchmark_network', iterations=2, warmup=1, output=file.name, stdout=StringIO())
+
+        with open(file.name, encoding='utf-8') as source:
+            report = json.load(source)
+        self.assertEqual(report['environment']['entities'], 120)
+        self.assertEqual([result['scenario'] for result in report['scenarios']],
+                         ['list', 'list_sparse', 'filter', 'search', 'retrieve', 'create', 'update',
+                          'admin_changelist'])
+        for result in report['scenarios']:
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['max_ms'])
+        self.assertEqual(NetworkEntity.objects.count(), 120)
+        self.assertFalse(User.objects.filter(email__startswith='benchmark-').exists())
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from supply_chain import async_views
 from supply_chain.apps import SupplyChainConfig
 from supply_chain.views import NetworkEntityViewSet
 
@@ -11,4 +12,7 @@ router.register(r'network_entity', NetworkEntityViewSet)
 
 urlpatterns = [
     path('supply_chain/', include(router.urls)),
+    path('supply_chain/async/network_entity/', async_views.network_entity_list, name='async-network-entity-list'),
+    path('supply_chain/async/network_entity/<int:pk>/', async_views.network_entity_detail,
+         name='async-network-entity-detail'),
 ]
@@ -1,28 +1,222 @@
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
-from .models import NetworkEntity
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from config.timing import TimedAuthenticationMixin, timed
+from .caching import CachedReadMixin
+from .exporters import EXPORT_FORMATS, iter_network_rows, render_rows
+from .fast_serializers import CompiledReadMixin
+from .models import DebtSummary, NetworkEntity
+from .paginators import NetworkEntityCursorPagination, NetworkEntitySearchPagination
 from .permissions import IsActiveEmployee
-from .serializers import NetworkEntityListSerializer, NetworkEntityCreateUpdateSerializer
+from .renderers import FastJSONRenderer
+from .serializers import NetworkEntityListSerializer, NetworkEntityCreateUpdateSerializer, \
+    NetworkEntityBulkCreateSerializer, NetworkEntitySearchSerializer, DebtRollupSerializer
+
+DEBT_GROUPINGS = ('level', 'country', 'root')
+# Действия чтения, которые выводят сущности через NetworkEntityListSerializer и поддерживают 'fields' и 'expand'.
+READ_ACTIONS = ('list', 'retrieve', 'ancestors', 'descendants', 'search')
+# Минимальная длина поискового запроса: более короткие строки не содержат ни одной триграммы
+# и не могут быть найдены по триграммным индексам.
+SEARCH_MIN_LENGTH = 3
 
 
-class NetworkEntityViewSet(viewsets.ModelViewSet):
+class NetworkEntityViewSet(TimedAuthenticationMixin, CachedReadMixin, CompiledReadMixin, viewsets.ModelViewSet):
     """
     ViewSet для модели NetworkEntity, обеспечивающий базовые CRUD операции.
+    Ответы 'list' и 'retrieve' кэшируются и снабжаются ETag (см. CachedReadMixin) и строятся
+    скомпилированным планом сериализации из .values() (см. CompiledReadMixin).
     Этот ViewSet использует разные сериализаторы для операций чтения и создания/обновления.
-    Также применяется фильтрация по стране контакта и проверка разрешений для доступа к данным.
+    Также применяется фильтрация по стране контакта, курсорная пагинация и проверка разрешений для доступа к данным.
+    Действия чтения принимают параметры 'fields' и 'expand', сужающие ответ и запросы к базе данных.
+    Время аутентификации и сериализации попадает в заголовок Server-Timing (см. RequestTimingMiddleware),
+    число SQL-запросов каждого действия ограничено бюджетом query_budget.
     """
     queryset = NetworkEntity.objects.all()
     permission_classes = [IsActiveEmployee]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['contact__country']
+    pagination_class = NetworkEntityCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    # Наибольшее число SQL-запросов действий, не зависящее от количества сущностей, контактов и продуктов
+    # (см. QueryBudgetMiddleware). Каждое действие учитывает запрос пользователя при аутентификации по JWT
+    # (JWTAuthentication или промах кэша отзыва StatelessJWTAuthentication), изменения — также запросы
+    # сигналов к сводке задолженности и точки сохранения.
+    query_budget = {
+        'list': 3, 'retrieve': 3, 'ancestors': 4, 'descendants': 4, 'subtree_size': 3, 'search': 4,
+        'debt_summary': 2, 'export': 1, 'create': 13, 'update': 15, 'partial_update': 10, 'bulk': 8, 'destroy': 16,
+    }
 
     def get_serializer_class(self):
         """
         Определяет сериализатор, который должен быть использован в зависимости от типа действия.
 
-        Возвращает сериализатор NetworkEntityListSerializer для операций чтения ('list' и 'retrieve')
+        Возвращает сериализатор NetworkEntityListSerializer для операций чтения ('list', 'retrieve', 'ancestors', 'descendants')
+        NetworkEntityBulkCreateSerializer для пакетного создания ('bulk'),
+        NetworkEntitySearchSerializer для результатов поиска ('search'),
+        DebtRollupSerializer для агрегатов задолженности ('debt_summary')
         и NetworkEntityCreateUpdateSerializer для всех остальных операций.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'ancestors', 'descendants']:
             return NetworkEntityListSerializer
+        if self.action == 'bulk':
+            return NetworkEntityBulkCreateSerializer
+        if self.action == 'search':
+            return NetworkEntitySearchSerializer
+        if self.action == 'debt_summary':
+            return DebtRollupSerializer
         return NetworkEntityCreateUpdateSerializer
+
+    @cached_property
+    def selected_fields(self):
+        """
+        Набор выводимых полей по параметрам 'fields' и 'expand' или None, если они не заданы
+        (см. NetworkEntityListSerializer.get_selected_fields).
+        """
+        if self.action not in READ_ACTIONS or self.request is None:
+            return None
+        return self.get_serializer_class().get_selected_fields(self.request.query_params)
+
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст сериализатора набор выводимых полей.
+        """
+        context = super().get_serializer_context()
+        context['fields'] = self.selected_fields
+        return context
+
+    def get_queryset(self):
+        """
+        Возвращает набор сущностей для текущего действия.
+
+        Для операций чтения ('list' и 'retrieve') связанные контакт, поставщик и продукты загружаются заранее,
+        чтобы сериализация не порождала отдельные запросы для каждой строки. Если заданы 'fields' или 'expand',
+        читаются только выводимые поля и связанные объекты.
+        """
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.for_read(self.selected_fields)
+        return queryset
+
+    @action(detail=True)
+    def ancestors(self, request, pk=None):
+        """
+        Возвращает цепочку поставщиков сущности от завода до непосредственного поставщика.
+        """
+        entity = self.get_object()
+        queryset = NetworkEntity.objects.ancestors_of(entity).for_read(self.selected_fields)
+        serializer = self.get_serializer(queryset, many=True)
+        with timed(request, 'serialize'):
+            data = serializer.data
+        return Response(data)
+
+    @action(detail=True)
+    def descendants(self, request, pk=None):
+        """
+        Возвращает постраничный список всех сущностей, находящихся ниже указанной в иерархии.
+        """
+        entity = self.get_object()
+        queryset = NetworkEntity.objects.descendants_of(entity).for_read(self.selected_fields)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        with timed(request, 'serialize'):
+            data = serializer.data
+        return self.get_paginated_response(data)
+
+    @action(detail=True)
+    def subtree_size(self, request, pk=None):
+        """
+        Возвращает размер поддерева сущности: ее саму и всех ее потомков.
+        """
+        entity = self.get_object()
+        descendants_count = NetworkEntity.objects.descendants_of(entity).count()
+        return Response({'id': entity.id, 'subtree_size': descendants_count + 1})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Создает список сущностей вместе с контактами и продуктами в одной транзакции.
+        Поставщиком может быть существующая сущность ('supplier') или элемент этого же пакета ('supplier_ref').
+        Возвращает результат по каждому элементу в порядке входных данных.
+        """
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False)
+    def export(self, request):
+        """
+        Потоково выгружает сущности с контактами и продуктами с учетом фильтров списка.
+        Формат задается параметром 'output': 'ndjson' (по умолчанию) или 'csv'.
+        Строки формируются по мере чтения из базы данных серверным курсором, ответ не собирается в памяти целиком.
+        """
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'output': f"Допустимые значения: {', '.join(EXPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset())
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(render_rows(iter_network_rows(queryset), export_format),
+                                         content_type=f'{content_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="network.{export_format}"'
+        return response
+
+    @action(detail=False, pagination_class=NetworkEntitySearchPagination)
+    def search(self, request):
+        """
+        Ищет сущности по строке 'q' в названии сущности, названии и модели продуктов и адресе контакта.
+        Результаты упорядочены по релевантности ('rank') и разбиты на страницы параметрами 'page' и 'page_size'.
+        Ответы кэшируются так же, как 'list' (см. CachedReadMixin).
+        """
+        return self.cached_response(self.search_response, request)
+
+    def search_response(self, request):
+        """
+        Выполняет поиск для действия 'search'.
+        """
+        text = request.query_params.get('q', '').strip()
+        if len(text) < SEARCH_MIN_LENGTH:
+            return Response({'q': f'Минимальная длина запроса — {SEARCH_MIN_LENGTH} символа'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        ranking = self.filter_queryset(self.get_queryset()).search_ranking(text)
+        page = self.paginate_queryset(ranking)
+        entities = self.get_queryset().for_read(self.selected_fields).in_bulk([pk for pk, rank in page])
+        results = []
+        for pk, rank in page:
+            if pk in entities:
+                entities[pk].rank = rank
+                results.append(entities[pk])
+        serializer = self.get_serializer(results, many=True)
+        with timed(request, 'serialize'):
+            data = serializer.data
+        return self.get_paginated_response(data)
+
+    @action(detail=False, url_path='debt-summary')
+    def debt_summary(self, request):
+        """
+        Возвращает суммарную задолженность и количество сущностей с группировкой по параметру 'group_by':
+        'level' (по умолчанию), 'country' или 'root' (завод, в поддереве которого находятся сущности).
+        Агрегаты считаются по сводной таблице DebtSummary, а не по всем сущностям.
+        Параметры 'root', 'level' и 'country' дополнительно ограничивают выборку.
+        """
+        group_by = request.query_params.get('group_by', 'level')
+        if group_by not in DEBT_GROUPINGS:
+            return Response({'group_by': f"Допустимые значения: {', '.join(DEBT_GROUPINGS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        summary = DebtSummary.objects.all()
+        try:
+            for param in ('root', 'level'):
+                if param in request.query_params:
+                    summary = summary.filter(**{param: int(request.query_params[param])})
+        except ValueError:
+            return Response({'detail': "Параметры 'root' и 'level' должны быть целыми числами"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if 'country' in request.query_params:
+            summary = summary.filter(country=request.query_params['country'])
+        serializer = self.get_serializer(summary.rollup(group_by), many=True)
+        return Response(serializer.data)
@@ -0,0 +1,128 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class ClaimsTokenUser(TokenUser):
+    """
+    Пользователь без представления в базе данных, построенный по утверждениям (claims) JWT.
+
+    Флаги is_active, is_staff и is_superuser и email берутся из токена,
+    который выпускает MyTokenObtainPairSerializer.
+    """
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', False)
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+
+class RevocationCache:
+    """
+    Короткоживущий кэш состояния пользователей в памяти процесса для проверки отзыва токенов.
+
+    Для каждого пользователя хранится флаг активности и хэш пароля не дольше ttl секунд,
+    поэтому база данных опрашивается не чаще одного раза за ttl на пользователя в каждом процессе.
+    Изменение пользователя в этом процессе сразу сбрасывает запись (см. user.signals), в других
+    процессах деактивация или смена пароля вступает в силу не позже чем через ttl секунд.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Возвращает (is_active, password_hash) пользователя или None, если пользователь не найден.
+
+        Args:
+            user_id: Идентификатор пользователя из токена.
+
+        Returns:
+            tuple | None: Состояние пользователя.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        state = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values_list('is_active', 'password').first()
+        if state is not None:
+            state = (state[0], get_md5_hash_password(state[1]))
+        with self._lock:
+            self._entries[user_id] = (now + settings.JWT_REVOCATION_CACHE_TTL, state)
+        return state
+
+    def discard(self, user_id):
+        """
+        Удаляет запись пользователя из кэша.
+
+        Args:
+            user_id: Идентификатор пользователя.
+        """
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """
+        Очищает кэш.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+revocation_cache = RevocationCache()
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT без загрузки пользователя из базы данных на каждый запрос.
+
+    Пользователь строится из утверждений токена (ClaimsTokenUser), а отзыв токенов — деактивация
+    пользователя, его удаление и, при SIMPLE_JWT['CHECK_REVOKE_TOKEN'], смена пароля — проверяется
+    через revocation_cache. Токены, выпущенные без утверждения is_active, обрабатываются как
+    в JWTAuthentication, с запросом пользователя.
+
+    Включается переменной окружения JWT_STATELESS_AUTH=True.
+    """
+
+    def get_user(self, validated_token):
+        """
+        Возвращает пользователя, построенного по проверенному токену.
+
+        Args:
+            validated_token: Проверенный токен.
+
+        Returns:
+            ClaimsTokenUser | User: Пользователь.
+
+        Raises:
+            AuthenticationFailed: Если пользователь не найден, неактивен или сменил пароль.
+        """
+        if 'is_active' not in validated_token:
+            return super().get_user(validated_token)
+
+        user = ClaimsTokenUser(validated_token)
+        state = revocation_cache.get(user.id)
+        if state is None:
+            raise AuthenticationFailed('Пользователь не найден', code='user_not_found')
+        is_active, password_hash = state
+        if not (is_active and user.is_active):
+            raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+            raise AuthenticationFailed('Пароль пользователя был изменен', code='password_changed')
+        return user
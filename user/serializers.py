@@ -55,6 +55,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         """
         Генерирует токен JWT для пользователя, добавляя дополнительные поля.
+        Флаги is_active, is_staff и is_superuser используются StatelessJWTAuthentication
+        для аутентификации без запроса пользователя из базы данных.
 
         Args:
             user (User): Пользователь, для которого генерируется токен.
@@ -66,5 +68,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         token['username'] = user.username
         token['email'] = user.email
+        token['is_active'] = user.is_active
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
 
         return token
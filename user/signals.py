@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import revocation_cache
+from user.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_revocation_state(sender, instance, **kwargs):
+    """
+    Сбрасывает закэшированное состояние пользователя, чтобы деактивация, удаление или смена пароля
+    сразу учитывались при проверке токенов в этом процессе.
+    """
+    revocation_cache.discard(instance.pk)
@@ -1,10 +1,15 @@
 from django.contrib.auth.hashers import make_password
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
+
+from config.query_budget import QueryBudgetTestMixin
+from user.authentication import StatelessJWTAuthentication, revocation_cache
 from user.models import User
+from user.serializers import MyTokenObtainPairSerializer
 
 
-class UserRegistrationTest(APITestCase):
+class UserRegistrationTest(QueryBudgetTestMixin, APITestCase):
 
     def test_user_registration(self):
         """
@@ -37,7 +42,7 @@ class UserRegistrationTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class UserLoginTest(APITestCase):
+class UserLoginTest(QueryBudgetTestMixin, APITestCase):
 
     def setUp(self):
         hashed_password = make_password('testpass')
@@ -72,11 +77,12 @@ class UserLoginTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class UserLogoutTest(APITestCase):
+class UserLogoutTest(QueryBudgetTestMixin, APITestCase):
 
     def setUp(self):
-        self.user = User.objects.create(email='testuser@example.com', password='testpass')
-        self.client.force_authenticate(user=self.user)
+        self.user = User.objects.create(email='testuser@example.com', password='testpass', is_active=True)
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
 
     def test_logout(self):
         """
@@ -84,3 +90,51 @@ class UserLogoutTest(APITestCase):
         """
         response = self.client.post('/user/logout/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class StatelessJWTAuthenticationTest(APITestCase):
+
+    def setUp(self):
+        revocation_cache.clear()
+        self.user = User.objects.create(email='stateless@example.com', is_staff=True)
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_user_is_built_from_claims(self):
+        """
+        Тестирование аутентификации без запроса пользователя при повторных обращениях
+        """
+        user, _ = StatelessJWTAuthentication().authenticate(self.request)
+        self.assertEqual(user.id, self.user.id)
+        self.assertTrue(user.is_active)
+        self.assertTrue(user.is_staff)
+        self.assertEqual(user.email, 'stateless@example.com')
+
+        with self.assertNumQueries(0):
+            StatelessJWTAuthentication().authenticate(self.request)
+
+    def test_deactivated_user_is_rejected(self):
+        """
+        Тестирование отказа в аутентификации после деактивации пользователя
+        """
+        StatelessJWTAuthentication().authenticate(self.request)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            StatelessJWTAuthentication().authenticate(self.request)
+
+
+class UserTokenTest(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='token@example.com', password=make_password('testpass'),
+                                        is_active=True)
+
+    def test_obtain_token_pair(self):
+        """
+        Тестирование получения пары токенов в пределах бюджета запросов
+        """
+        response = self.client.post('/user/token/', {'email': 'token@example.com', 'password': 'testpass'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertIn('refresh', response.data)
@@ -7,7 +7,10 @@ from user.serializers import UserSerializer, MyTokenObtainPairSerializer
 from django.contrib.auth import authenticate, login as django_login, logout
 from rest_framework import status
 
+from config.query_budget import query_budget
 
+
+@query_budget(2)
 @swagger_auto_schema(
     method='post',
     operation_description="Регистрация нового пользователя",
@@ -42,6 +45,7 @@ def register_view(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(9)
 @swagger_auto_schema(
     method='post',
     operation_description="Авторизация пользователя",
@@ -78,6 +82,7 @@ def login_view(request):
     return Response({'message': 'Неверные учетные данные'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+@query_budget(2)
 @swagger_auto_schema(
     method='post',
     operation_description="Выход пользователя из системы",
@@ -100,6 +105,7 @@ def logout_view(request):
     return Response({"message": "Вы успешно вышли из системы"}, status=status.HTTP_200_OK)
 
 
+@query_budget(1)
 class MyTokenObtainPairView(TokenObtainPairView):
     """
     Представление для получения пары токенов JWT (доступ и обновление) для аутентифицированного пользователя.